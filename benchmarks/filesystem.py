@@ -0,0 +1,90 @@
+"""
+Benchmark for path lookups in the emulated filesystem.
+
+Builds a deep synthetic tree with a honeytoken directory, measures compiling and
+loading its image (time and allocated memory) and runs a storm of `cd`, `ls` and path checks like a bot exploring the
+filesystem would.
+
+Usage: python3 -m benchmarks.filesystem [depth] [fanout] [commands] [honeytokens]
+"""
+from honeygrove.core.FilesystemParser import FilesystemParser
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def synthetic_xml(depth, fanout):
+    lines = ['<!--0-->', '<dir name="/">']
+
+    def add(level, indent):
+        for i in range(fanout):
+            if level < depth:
+                lines.append('{}<dir name="dir{}_{}">'.format(indent, level, i))
+                # Only the first directory of each level is expanded to keep the tree small
+                if i == 0:
+                    add(level + 1, indent + '  ')
+                lines.append('{}</dir>'.format(indent))
+            else:
+                lines.append('{}<file name="file{}"/>'.format(indent, i))
+
+    add(1, '  ')
+    lines.append('</dir>')
+    return '\n'.join(lines)
+
+
+def commands(depth, fanout, count):
+    rnd = random.Random(4711)
+    deepest = '/' + '/'.join('dir{}_0'.format(level) for level in range(1, depth))
+    for _ in range(count):
+        level = rnd.randint(1, depth - 1)
+        path = '/' + '/'.join('dir{}_0'.format(lvl) for lvl in range(1, level))
+        name = 'dir{}_{}'.format(level, rnd.randrange(fanout))
+        yield rnd.choice([
+            ('cd', path + '/' + name),
+            ('cd', '..'),
+            ('cd', deepest),
+            ('ls', path),
+            ('ls', ''),
+            ('valid_file', deepest + '/file{}'.format(rnd.randrange(fanout))),
+            ('valid_directory', './../' + name),
+        ])
+
+
+if __name__ == '__main__':
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    fanout = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 50000
+    honeytokens = int(sys.argv[4]) if len(sys.argv) > 4 else 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xml = os.path.join(tmp, 'fs.xml')
+        with open(xml, 'w') as fp:
+            fp.write(synthetic_xml(depth, fanout))
+        FilesystemParser.honeytoken_directory = os.path.join(tmp, 'tokens')
+        os.mkdir(FilesystemParser.honeytoken_directory)
+        for i in range(honeytokens):
+            open(os.path.join(FilesystemParser.honeytoken_directory, 'token{}.txt'.format(i)), 'w').close()
+
+        # The first load compiles the image, the second one only maps it
+        for label in ("compile", "load"):
+            FilesystemParser.clear_cache()
+            start = time.perf_counter()
+            parser = FilesystemParser(xml)
+            print("{:<10} {:>10.1f} ms".format(label, (time.perf_counter() - start) * 1000))
+
+        FilesystemParser.clear_cache()
+        tracemalloc.start()
+        parser = FilesystemParser(xml)
+        print("{:<10} {:>10.0f} KiB".format("memory", tracemalloc.get_traced_memory()[0] / 1024))
+        tracemalloc.stop()
+
+        storm = list(commands(depth, fanout, count))
+        start = time.perf_counter()
+        for command, argument in storm:
+            getattr(parser, command)(argument)
+        elapsed = time.perf_counter() - start
+        print("{:<10} {:>10.0f} commands/s".format("commands", count / elapsed))
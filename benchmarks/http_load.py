@@ -0,0 +1,97 @@
+"""
+Load benchmark for the HTTP service.
+
+Starts the HTTP service on a local port and runs a load generator (several processes
+with blocking sockets, one request per connection like the service expects) against it,
+first with the former handling (response headers joined and the page read from disk
+for every request), then with the pre-rendered responses.
+
+Usage: python3 -m benchmarks.http_load [seconds] [processes] [page]
+"""
+from honeygrove.config import Config
+from honeygrove.services import HTTPService as http
+from honeygrove.services.HTTPService import HTTPProtocol, HTTPService
+
+from twisted.internet import reactor
+
+import multiprocessing
+import socket
+import sys
+import threading
+import time
+
+
+class NullLog:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class ReadingHTTPProtocol(HTTPProtocol):
+    """
+    Answers GETs of supported pages like the service did before the responses were cached
+    """
+
+    def dataReceived(self, data):
+        data = data.decode('utf-8')
+        self.page = data[data.find("GET ") + 4: data.find(" HTTP/1.1")]
+        if self.page not in HTTPService.html_dictionary:
+            return super().dataReceived(data.encode())
+
+        message = HTTPService.okStatus + "\n"
+        for k in HTTPService.responseHeadersOkStatus.keys():
+            message = message + k + ": " + HTTPService.responseHeadersOkStatus[k] + "\n"
+        with open(str(Config.http.resource_folder / HTTPService.html_dictionary[self.page][0]), encoding='utf8') as file:
+            message = message + "\n" + file.read()
+        self.transport.write(message.encode('UTF-8'))
+        self.transport.loseConnection()
+
+
+def generate_load(args):
+    port, page, seconds = args
+    request = "GET {} HTTP/1.1\r\nHost: localhost\r\n\r\n".format(page).encode()
+    requests = 0
+    received = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        with socket.create_connection(("127.0.0.1", port)) as sock:
+            sock.sendall(request)
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                received += len(chunk)
+        requests += 1
+    return requests, received
+
+
+def run(service, protocol, processes, page, seconds):
+    service._fService.protocol = protocol
+    with multiprocessing.Pool(processes) as pool:
+        start = time.perf_counter()
+        results = pool.map(generate_load, [(service._transport.getHost().port, page, seconds)] * processes)
+        elapsed = time.perf_counter() - start
+    requests = sum(r[0] for r in results)
+    received = sum(r[1] for r in results)
+    return requests / elapsed, received / requests if requests else 0
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    page = sys.argv[3] if len(sys.argv) > 3 else "/"
+
+    http.log = NullLog()
+    Config.http.port = 0
+    Config.http.connections_per_host = 10 ** 6
+    service = HTTPService()
+    service._address = "127.0.0.1"
+    reactor.callFromThread(service.startService)
+    threading.Thread(target=reactor.run, args=(False,), daemon=True).start()
+    while getattr(service, '_transport', None) is None:
+        time.sleep(0.01)
+
+    print("{} processes for {:.0f} s each, GET {}".format(processes, seconds, page))
+    for label, protocol in (("read", ReadingHTTPProtocol), ("cached", HTTPProtocol)):
+        rate, size = run(service, protocol, processes, page, seconds)
+        print("{:<10} {:>10.0f} requests/s {:>10.0f} bytes/response".format(label, rate, size))
+    reactor.callFromThread(reactor.stop)
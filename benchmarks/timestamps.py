@@ -0,0 +1,33 @@
+"""
+Micro-benchmark for log timestamps.
+
+Compares `datetime.utcnow().isoformat()` with the TimestampFormatter, which
+caches the formatted second and only renders the microseconds.
+
+Usage: python3 -m benchmarks.timestamps [count]
+"""
+from honeygrove.core.Timestamp import TimestampFormatter
+
+from datetime import datetime
+import sys
+import time
+
+
+def before(count):
+    for _ in range(count):
+        datetime.utcnow().isoformat()
+
+
+def after(count):
+    formatter = TimestampFormatter()
+    for _ in range(count):
+        formatter.now()
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for name, func in [("utcnow+isoformat", before), ("TimestampFormatter", after)]:
+        start = time.perf_counter()
+        func(count)
+        elapsed = time.perf_counter() - start
+        print("{:<20} {:>10.0f} timestamps/s".format(name, count / elapsed))
@@ -1,18 +1,33 @@
 from honeygrove import log
 from honeygrove.config import Config
+from honeygrove.core.FilesystemParser import FilesystemParser
 from honeygrove.core.HoneyAdapter import BrokerWatcher
 from honeygrove.core.ServiceController import ServiceController
-from honeygrove.services.SSHService import load_database, save_database
+from honeygrove.services.SSHService import SSHProtocol, SSHService
 from honeygrove.services.S7commService import shutdown_s7
 
+from twisted.internet import reactor
+
 import atexit
 import os
+import signal
 import threading
 
+def reload_help_texts(signum, frame):
+    """
+    Loads edited SSH help texts (on SIGHUP)
+    """
+    def reload():
+        if SSHProtocol.help_texts.reload():
+            log.info("Reloaded SSH help texts")
+    reactor.callFromThread(reload)
+
+
 def shutdown():
     log.info("Shutting down")
-    save_database()
+    SSHProtocol.last_logins.close()
     shutdown_s7()
+    log.close()
     quit()
 
 
@@ -26,6 +41,28 @@ if __name__ == '__main__':
     if not os.getuid() == 0:
         print("[-] Honeygrove must be run as root.\n[!] Starting anyway!\n[!] Some functions may not work correctly!")
 
+    # Load the emulated filesystem shared by all sessions
+    stats = FilesystemParser.preload(Config.folder.filesystem)
+    log.info("Loaded filesystem {xml}: {nodes} nodes, {honeytokens} honeytoken files added "
+             "in {total_ms:.1f} ms (parsing {parse_ms:.1f} ms, honeytokens {honeytokens_ms:.1f} ms)".format(**stats))
+
+    # Load the SSH host keys, missing RSA keys are generated in the background
+    stats = SSHService.host_keys.load()
+    log.info("Loaded SSH host keys ({types}) in {load_ms:.1f} ms, generated: {generated}, "
+             "in background: {pending}".format(**stats))
+
+    # Load the SSH help texts, edits are loaded again on SIGHUP
+    stats = SSHProtocol.help_texts.load()
+    log.info("Loaded {topics} SSH help texts in {load_ms:.1f} ms".format(**stats))
+    signal.signal(signal.SIGHUP, reload_help_texts)
+
+    # Load the last logins of SSH users before the service accepts connections
+    stats = SSHProtocol.last_logins.load(Config.ssh.legacy_database_path)
+    log.info("Loaded {entries} SSH last logins in {load_ms:.1f} ms (imported: {imported})".format(**stats))
+
+    # Log the summaries of repeated events when their window ends
+    log.start_aggregate_expiry()
+
     # Initialize Services
     controller = ServiceController()
 
@@ -38,8 +75,5 @@ if __name__ == '__main__':
     for service in Config.general.enabled_services:
         controller.startService(service)
 
-    # XXX: Why is this necessary here?
-    # Load ssh database
-    load_database()
     atexit.register(shutdown)
 
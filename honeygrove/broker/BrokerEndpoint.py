@@ -1,9 +1,10 @@
+from honeygrove.broker.FileForwarder import FileForwarder
 from honeygrove.config import Config
 
 import broker
 
-import base64
-from datetime import datetime
+from datetime import date
+import time
 
 
 class BrokerEndpoint:
@@ -31,6 +32,17 @@ class BrokerEndpoint:
 
     # peering objects. needed for unpeering
     peerings = [0, 0, None]
+    # ids of the connected peers (outgoing and incoming), updated by getStatusMessages
+    connected_peers = set()
+
+    # forwards captured files in the background
+    file_forwarder = FileForwarder(lambda topic, data: BrokerEndpoint.endpoint.publish(topic, data),
+                                   chunk_size=Config.broker.file_chunk_size,
+                                   known_size=Config.broker.file_known_size)
+
+    # name of the log index of the current month and the time it is valid until
+    log_index = None
+    log_index_expires = 0
 
     @staticmethod
     def getStatusMessages():
@@ -40,6 +52,10 @@ class BrokerEndpoint:
                 yield "[Broker Error] {}". format(st)
             # Status
             elif type(st) == broker.Status:
+                if st.code() == broker.SC.PeerAdded:
+                    BrokerEndpoint.connected_peers.add(str(st.context().node))
+                elif st.code() in (broker.SC.PeerLost, broker.SC.PeerRemoved):
+                    BrokerEndpoint.connected_peers.discard(str(st.context().node))
                 yield "[Broker Status] {}". format(st)
             else:
                 raise RuntimeError("Unknown Broker Status Type")
@@ -52,14 +68,43 @@ class BrokerEndpoint:
         """
         return BrokerEndpoint.command_queue.poll()
 
+    @staticmethod
+    def isConnected():
+        """
+        Whether any peer is connected, no matter who initiated the peering
+        """
+        return bool(BrokerEndpoint.connected_peers)
+
+    @staticmethod
+    def getLogIndex():
+        """
+        Name of the log index of the current month, only computed once per month
+        """
+        now = time.time()
+        if now >= BrokerEndpoint.log_index_expires:
+            today = date.today()
+            BrokerEndpoint.log_index = "honeygrove-" + today.strftime('%Y-%m')
+            next_month = date(today.year + today.month // 12, today.month % 12 + 1, 1)
+            BrokerEndpoint.log_index_expires = time.mktime(next_month.timetuple())
+        return BrokerEndpoint.log_index
+
     @staticmethod
     def sendLogs(message):
         """
         Sends a Broker message containing a JSON string.
         :param message: message to publish
         """
-        index = "honeygrove-" + datetime.today().strftime('%Y-%m')
-        BrokerEndpoint.endpoint.publish("logs", {index: message})
+        BrokerEndpoint.endpoint.publish("logs", {BrokerEndpoint.getLogIndex(): message})
+
+    @staticmethod
+    def sendLogBatch(messages):
+        """
+        Sends a single Broker message containing a vector of JSON strings,
+        each one in the same format as in `sendLogs`.
+        :param messages: list of messages to publish
+        """
+        index = BrokerEndpoint.getLogIndex()
+        BrokerEndpoint.endpoint.publish("logs", [{index: message} for message in messages])
 
     @staticmethod
     def listen(ip, port):
@@ -110,11 +155,10 @@ class BrokerEndpoint:
     @staticmethod
     def sendFile(filepath):
         """
-        Sends a file to the file topic
+        Sends a file to the file topic in chunks, see FileForwarder.
+        Returns immediately, the file is read and sent by a worker thread.
         :param filepath: path to the file
+        :return: a future of the SHA-256 hex digest of the file
         """
-        with open(str(filepath), "rb") as file:
-            content = file.read()
-            b64content = base64.b64encode(content)
-            BrokerEndpoint.endpoint.publish("files", b64content.decode(encoding="utf-8"))
+        return BrokerEndpoint.file_forwarder.submit(filepath)
 
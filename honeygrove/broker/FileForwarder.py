@@ -0,0 +1,107 @@
+from honeygrove.core.Cache import LRUCache
+
+import base64
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import sys
+import uuid
+
+
+class FileForwarder:
+    """
+    Forwards captured files to the "files" topic without loading them into memory.
+    A file is sent as base64 encoded chunks with a transfer id and sequence numbers, followed
+    by a manifest (transfer id, name, size, SHA-256, number of chunks). The SHA-256 is computed
+    from the sent chunks, so it matches them even if the file changes while it is forwarded.
+    Files that were already forwarded (same SHA-256) are only announced by their hash.
+    All work is done by a worker thread.
+    """
+
+    def __init__(self, publish, chunk_size=1024 * 1024, known_size=10000, topic="files"):
+        """
+        :param publish: function(topic, data) that publishes a message
+        :param chunk_size: size of the chunks in bytes (before encoding)
+        :param known_size: number of forwarded hashes to remember for deduplication
+        :param topic: topic to publish to
+        """
+        self.publish = publish
+        self.chunk_size = chunk_size
+        self.topic = topic
+        self.known = LRUCache(known_size)
+
+        # Metrics
+        self.forwarded = 0
+        self.deduplicated = 0
+
+        self._executor = None
+
+    def submit(self, path):
+        """
+        Queues a file for forwarding, returns immediately
+        :param path: path to the file
+        :return: a future of the SHA-256 hex digest of the file
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="FileForwarder")
+        return self._executor.submit(self._forward_logged, str(path))
+
+    def forward(self, path):
+        """
+        Forwards a file synchronously
+        :param path: path to the file
+        :return: SHA-256 hex digest of the file
+        """
+        path = str(path)
+        name = os.path.basename(path)
+
+        # Hash first, so known files don't have to be sent at all
+        digest, size = self._hash(path)
+        if self.known.get(digest):
+            self.publish(self.topic, {'type': 'known', 'sha256': digest, 'name': name, 'size': size})
+            self.deduplicated += 1
+            return digest
+
+        # Send the content, the manifest is built from what was actually sent
+        transfer = uuid.uuid4().hex
+        sha256 = hashlib.sha256()
+        size = 0
+        chunks = 0
+        with open(path, 'rb') as fp:
+            for block in iter(lambda: fp.read(self.chunk_size), b''):
+                sha256.update(block)
+                size += len(block)
+                self.publish(self.topic, {'type': 'chunk', 'id': transfer, 'seq': chunks,
+                                          'data': base64.b64encode(block).decode()})
+                chunks += 1
+        digest = sha256.hexdigest()
+        self.publish(self.topic, {'type': 'manifest', 'id': transfer, 'sha256': digest, 'name': name,
+                                  'size': size, 'chunks': chunks, 'chunk_size': self.chunk_size})
+
+        self.known.put(digest, True)
+        self.forwarded += 1
+        return digest
+
+    def close(self):
+        """
+        Waits for all queued files to be forwarded
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _hash(self, path):
+        sha256 = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as fp:
+            for block in iter(lambda: fp.read(self.chunk_size), b''):
+                sha256.update(block)
+                size += len(block)
+        return sha256.hexdigest(), size
+
+    def _forward_logged(self, path):
+        try:
+            return self.forward(path)
+        except Exception as e:
+            print("[-] Unable to forward file {}: {}".format(path, e), file=sys.stderr)
+            raise
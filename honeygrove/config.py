@@ -1,3 +1,4 @@
+from os.path import expanduser
 from pathlib import PurePath
 import pickle
 
@@ -41,6 +42,8 @@ class Config:
     # Set this to False if you do not want to use geoip or no database
     # is available on your machine.
     general.use_geoip = False
+    # Number of addresses whose GeoIP location is kept in memory
+    general.geoip_cache_size = 10000
     # List of service names that should be enabled at startup
     # (defaults to all implemented services if letf empty)
     general.enabled_services = []
@@ -53,6 +56,65 @@ class Config:
     # Alerts: Includes LOGIN-, REQUEST-, FILE-, and SYN-messages
     logging.log_status = True
     logging.log_alerts = True
+    # Every output (logfile, stdout, broker, syslog, unix socket) has its own queue
+    # that is written by a background thread, so a slow output never blocks a service
+    # Maximum number of queued messages per output
+    logging.buffer_size = 100000
+    # Which messages to drop if an output can not keep up: "oldest" or "newest"
+    logging.drop_policy = "oldest"
+    # Write as soon as this many messages are queued ...
+    logging.flush_size = 512
+    # ... but keep no message queued longer than this (in seconds)
+    logging.flush_interval = 1.0
+    # When to fsync the logfile: "never" (leave it to the OS), "batch" (after every
+    # write) or "interval" (at most every `logging.fsync_interval` seconds)
+    logging.fsync = "never"
+    logging.fsync_interval = 5.0
+    # Start a new logfile when the current one reaches `logging.rotate_size` bytes
+    # or is older than `logging.rotate_interval` seconds (None = never).
+    # Rotated logfiles are named `log-<timestamp>.txt` and listed with the time range
+    # they cover in `log.txt.index`.
+    logging.rotate_size = None
+    logging.rotate_interval = None
+    # Compression of rotated logfiles: "gzip", "zstd" (requires `zstandard`) or None
+    logging.compression = "gzip"
+    # Number of rotated logfiles to keep (None = all)
+    logging.retention = None
+    # Aggregation of repeated events (e.g. during mass scans): the first event of a
+    # (action, service, source address, payload) combination is logged as usual, identical
+    # events within the following `logging.aggregate_window` seconds are only counted
+    # and logged as a single summary (with count, first and last occurrence) afterwards.
+    logging.aggregate = False
+    logging.aggregate_window = 60
+    # Maximum number of combinations tracked at once
+    logging.aggregate_max_keys = 100000
+    # Actions that are aggregated, possible values: "request", "response", "scan" and "rate-limited".
+    # Logins and file uploads are always logged individually.
+    logging.aggregate_actions = ["request", "response", "scan", "rate-limited"]
+    # Optional: Forward all events as JSON to a local collector via UDP syslog (RFC 5424) ...
+    logging.syslog = False
+    logging.syslog_address = ('127.0.0.1', 514)
+    logging.syslog_facility = 16  # local0
+    # ... or via a Unix domain socket ("stream": one event per line, "datagram": one event per datagram)
+    logging.unix_socket = False
+    logging.unix_socket_path = '/var/run/honeygrove/events.sock'
+    logging.unix_socket_type = "stream"
+
+    # Reverse DNS lookups for the `domain` field of logged addresses.
+    # Lookups are done in the background: events are logged right away
+    # and only contain the domain once it is cached.
+    reverse_dns = ConfigSection()
+    # Set this to False to disable PTR lookups entirely
+    reverse_dns.enabled = True
+    # Maximum number of cached addresses
+    reverse_dns.cache_size = 10000
+    # Maximum number of running and queued lookups, addresses seen while it is reached are not resolved
+    reverse_dns.max_pending = 1000
+    # Seconds to cache resolved names and failed lookups
+    reverse_dns.ttl = 3600
+    reverse_dns.negative_ttl = 300
+    # Maximum number of concurrent lookups
+    reverse_dns.workers = 4
 
     # Folder configuration
     # All folder are relative to `folder.base`, so it is usually sufficient to only change this
@@ -63,14 +125,26 @@ class Config:
     folder.resources = folder.base / 'resources'
     # Folder for emulated filesystem used by all services
     folder.filesystem = folder.resources / 'filesystem' / 'unix.xml'
+    # Compiled images of the filesystem XML files (created on demand)
+    folder.filesystem_cache = folder.base / 'cache' / 'filesystem'
     folder.honeytoken_files = folder.resources / 'honeytoken_files'
     folder.quarantine = folder.resources / 'quarantine'
+    # Recordings of SSH sessions (export: python3 -m honeygrove.core.SessionRecorder <recording>)
+    folder.recordings = folder.base / 'recordings'
     folder.tls = folder.resources / 'tls'
     if general.use_geoip:
         folder.geo_ip = folder.resources / 'geo_ip.db'
     # Log folder (currently only a single file)
     folder.log = folder.base / 'logs' / 'log.txt'
 
+    # Metadata (`ls -l`) of the emulated filesystem. Size, mtime and mode can be set per
+    # node in the XML file, all other values are derived from a hash of the path.
+    filesystem = ConfigSection()
+    # Secret that makes the generated metadata unique to this installation
+    filesystem.seed = '__honeygrove__'
+    # Newest generated modification time (seconds since the epoch), None: start of the current day
+    filesystem.mtime_anchor = None
+
     # Ports without specific service
     listen = ConfigSection()
     listen.name = "LISTEN"
@@ -124,17 +198,54 @@ class Config:
     # must start with "SSH-2.0-"
     ssh.banner = b'SSH-2.0-' + general.hostname.encode()
     ssh.resource_folder = folder.resources / 'ssh'
-    ssh.database_path = ssh.resource_folder / 'database.json'
+    # Last login times of the users (SQLite), the JSON file of former versions is imported once
+    ssh.database_path = ssh.resource_folder / 'logins.sqlite'
+    ssh.legacy_database_path = ssh.resource_folder / 'database.json'
+    # Maximum number of users whose last login is kept, the least recent ones are dropped
+    ssh.max_logins = 10000
+    # Seconds changed login times are collected before they are written
+    ssh.login_flush_interval = 5
+    # Help texts of the emulated shell, send SIGHUP to load edits
     ssh.helptext_folder = ssh.resource_folder / 'helptexts'
     ssh.gnuhelp_folder = ssh.resource_folder / 'gnuhelp'
+    # Run the commands of attackers in a real shell (in the working directory of honeygrove)
     ssh.real_shell = False
+    # Limits of the real shell: simultaneous and waiting commands, CPU and wall-clock seconds, output bytes
+    ssh.shell_max_processes = 4
+    ssh.shell_max_queue = 100
+    ssh.shell_cpu_time = 10
+    ssh.shell_timeout = 30
+    ssh.shell_max_output = 1024 * 1024
+    # Host keys by type ("ssh-rsa", "ssh-ed25519", "ecdsa-sha2-nistp256/384/521"), missing keys are generated.
+    # RSA keys are generated in the background, until then only the other types are offered.
+    ssh.host_keys = {'ssh-ed25519': PurePath(expanduser('~')) / '.ssh' / 'id_honeygrove_ed25519',
+                     'ecdsa-sha2-nistp256': PurePath(expanduser('~')) / '.ssh' / 'id_honeygrove_ecdsa',
+                     'ssh-rsa': PurePath(expanduser('~')) / '.ssh' / 'id_honeygrove'}
+    ssh.rsa_key_size = 4096
+    # Size of the temporary RSA key used while generating the real one, if RSA is the only type
+    ssh.provisional_rsa_key_size = 2048
     ssh.accept_files = True
+    # Limits of wget downloads (saved in the quarantine folder, named by their SHA-256)
+    ssh.download_max_size = 50 * 1024 * 1024
+    ssh.download_timeout = 60
+    ssh.download_max_concurrent = 4
+    # Seconds until the session is closed after "rm -rf /"
+    ssh.rm_root_delay = 4
+    # Record the terminal input and output of shell sessions (one file per session in folder.recordings).
+    # Only the size of each recording is limited, old recordings have to be removed by the operator.
+    ssh.record_sessions = False
+    # Compress recordings with zstd (requires the zstandard package)
+    ssh.record_compression = False
+    # Bytes of terminal input and output after which the recording of a session stops
+    ssh.record_max_size = 1024 * 1024
 
     # Telnet service configuration
     telnet = ConfigSection()
     telnet.name = "Telnet"
     telnet.port = 23
     telnet.connections_per_host = general.max_connections_per_host
+    # Seconds until a failed login is answered (delays only the connection, not the service)
+    telnet.login_delay = 2.0
     # Currently not implemented
     telnet.real_shell = False
 
@@ -160,6 +271,8 @@ class Config:
     smtp.connections_per_host = general.max_connections_per_host
     # CRAM-MD5 and SCRAM-SHA-1 aren't yet implemented! (using them anyway crashes the connection)
     smtp.authentication_methods = {"PLAIN": True, "LOGIN": True, "CRAM-MD5": False, "SCRAM-SHA-1": False}
+    # Seconds between closing a timed out connection gently and aborting it (also used for SMTPS)
+    smtp.abort_delay = 5
 
     # SMTPS (SMTP + TLS) service configuration
     smtps = ConfigSection()
@@ -172,6 +285,8 @@ class Config:
     pop3.name = "POP3"
     pop3.port = 110
     pop3.connections_per_host = general.max_connections_per_host
+    # Seconds between closing a timed out connection gently and aborting it (also used for POP3S)
+    pop3.abort_delay = 5
 
     # POP3S (POP3 + TLS) service configuration
     pop3s = ConfigSection()
@@ -186,6 +301,8 @@ class Config:
     imap.connections_per_host = general.max_connections_per_host
     # CRAM-MD5 and SCRAM-SHA-1 aren't yet implemented! (using them anyway crashes the connection)
     imap.authentication_methods = smtp.authentication_methods
+    # Seconds between closing a timed out connection gently and aborting it (also used for IMAPS)
+    imap.abort_delay = 5
 
     # IMAPS (IMAP + TLS) service configuration
     imaps = ConfigSection()
@@ -237,6 +354,10 @@ class Config:
     # password length limits
     honeytoken.password_min = 6
     honeytoken.password_max = 24
+    # Memory for caching the content of honeytoken files (served by cat, FTP RETR) in bytes
+    honeytoken.file_cache_size = 32 * 1024 * 1024
+    # Larger honeytoken files are always read from disk
+    honeytoken.file_cache_max_file = 4 * 1024 * 1024
 
     # Optional: Broker configuration
     if (general.use_broker):
@@ -256,3 +377,15 @@ class Config:
         broker.ssl_ca_path = None  # Path to directory with CA files
         broker.ssl_certificate = None  # Own certificate
         broker.ssl_key_file = None  # Own key
+
+        # Events are published in batches (see `logging.flush_size` and `logging.flush_interval`).
+        # While no peer is connected they are appended to this spool file and
+        # published once the connection is (re-)established.
+        broker.spool = folder.base / 'spool' / 'logs.spool'
+        # Maximum size of the spool file in bytes, newer events are dropped if exceeded
+        broker.spool_max_size = 512 * 1024 * 1024
+
+        # Captured files are sent in chunks of this size (bytes) followed by a manifest with their SHA-256
+        broker.file_chunk_size = 1024 * 1024
+        # Number of already sent files to remember, these are only announced by their hash
+        broker.file_known_size = 10000
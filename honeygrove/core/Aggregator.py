@@ -0,0 +1,113 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class Aggregate:
+    """
+    Identical events of one source within a window
+    """
+
+    __slots__ = ('key', 'event', 'count', 'first_seen', 'last_seen', 'expires')
+
+    def __init__(self, key, event, timestamp, expires):
+        """
+        :param key: identity of the events
+        :param event: the first (logged) event, used as template for the summary
+        :param timestamp: formatted timestamp of the first event
+        :param expires: monotonic time at which the window ends
+        """
+        self.key = key
+        self.event = event
+        self.count = 1
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.expires = expires
+
+
+class EventAggregator:
+    """
+    Coalesces identical events (same key, e.g. source, service, action and payload)
+    within a window. The first event of a window is logged as usual, repetitions are
+    only counted. When the window ends, an aggregate with count, first and last
+    occurrence is returned by `expire` if there were repetitions.
+    """
+
+    def __init__(self, window=60.0, max_keys=100000, clock=time.monotonic):
+        """
+        :param window: length of the window in seconds, starting with the first event
+        :param max_keys: maximum number of open windows, the oldest one is closed early if exceeded
+        :param clock: monotonic time source (for tests)
+        """
+        self.window = window
+        self.max_keys = max_keys
+        self.suppressed = 0
+
+        self._clock = clock
+        # Ordered by window start, so expired windows are always at the front
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+
+    def repeated(self, key, timestamp):
+        """
+        Counts an event if a window for key is open
+        :param key: identity of the event
+        :param timestamp: formatted timestamp of the event
+        :return: True if the event is a repetition and must not be logged
+        """
+        with self._lock:
+            aggregate = self._open.get(key)
+            if aggregate is None or aggregate.expires <= self._clock():
+                return False
+            aggregate.count += 1
+            aggregate.last_seen = timestamp
+            self.suppressed += 1
+            return True
+
+    def add(self, key, event, timestamp):
+        """
+        Opens a window for a logged event
+        :param key: identity of the event
+        :param event: the event, template for the summary
+        :param timestamp: formatted timestamp of the event
+        :return: list of aggregates that ended, see `expire`
+        """
+        now = self._clock()
+        with self._lock:
+            ended = self._expire(now)
+            previous = self._open.pop(key, None)
+            if previous is not None and previous.count > 1:
+                ended.append(previous)
+            self._open[key] = Aggregate(key, event, timestamp, now + self.window)
+            while len(self._open) > self.max_keys:
+                aggregate = self._open.popitem(last=False)[1]
+                if aggregate.count > 1:
+                    ended.append(aggregate)
+        return ended
+
+    def expire(self, force=False):
+        """
+        Closes all windows that ended
+        :param force: close all windows
+        :return: list of the closed aggregates with repetitions
+        """
+        with self._lock:
+            if force:
+                ended = [aggregate for aggregate in self._open.values() if aggregate.count > 1]
+                self._open.clear()
+                return ended
+            return self._expire(self._clock())
+
+    def __len__(self):
+        return len(self._open)
+
+    def _expire(self, now):
+        ended = []
+        while self._open:
+            aggregate = next(iter(self._open.values()))
+            if aggregate.expires > now:
+                break
+            self._open.popitem(last=False)
+            if aggregate.count > 1:
+                ended.append(aggregate)
+        return ended
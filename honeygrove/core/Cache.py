@@ -0,0 +1,169 @@
+from collections import OrderedDict
+import io
+import os
+import threading
+import time
+
+
+class LRUCache:
+    """
+    Thread-safe, bounded least-recently-used cache with optional expiry of entries.
+    Keeps hit and miss counters for statistics.
+    """
+
+    def __init__(self, maxsize, ttl=None, clock=time.monotonic):
+        """
+        :param maxsize: maximum number of entries, the least recently used one is evicted if exceeded
+        :param ttl: default time to live of an entry in seconds (None = forever)
+        :param clock: monotonic time source (for tests)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for key or default if it is not cached or expired
+        """
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires <= self._clock():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttl=-1):
+        """
+        Caches value for key
+        :param ttl: time to live for this entry, defaults to the ttl of the cache
+        """
+        if ttl == -1:
+            ttl = self.ttl
+        expires = None if ttl is None else self._clock() + ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class FileCache:
+    """
+    Thread-safe cache for the content of small files, bounded by the total size.
+    An entry is revalidated with os.stat (modification time and size) at most
+    every `revalidate` seconds, the least recently used files are evicted first.
+    """
+
+    def __init__(self, max_bytes, max_file_size=None, revalidate=1.0, clock=time.monotonic):
+        """
+        :param max_bytes: maximum total size of the cached content
+        :param max_file_size: larger files are not cached (default: max_bytes)
+        :param revalidate: seconds after which a cached file is checked for changes
+        :param clock: monotonic time source (for tests)
+        """
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size if max_file_size is not None else max_bytes
+        self.revalidate = revalidate
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._clock = clock
+        # path -> (content, (mtime, size), time of the last check)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, path):
+        """
+        Returns the content of the file as bytes, from the cache if it did not change
+        :param path: path to the file
+        :raise OSError: if the file can't be read
+        """
+        path = str(path)
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(path)
+            if entry is not None and now - entry[2] < self.revalidate:
+                self._data.move_to_end(path)
+                self.hits += 1
+                return entry[0]
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.discard(path)
+            raise
+        version = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._data.get(path)
+            if entry is not None and entry[1] == version:
+                self._data[path] = (entry[0], version, now)
+                self._data.move_to_end(path)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        with open(path, 'rb') as fp:
+            content = fp.read()
+
+        if len(content) <= self.max_file_size:
+            with self._lock:
+                old = self._data.pop(path, None)
+                if old is not None:
+                    self.size -= len(old[0])
+                self._data[path] = (content, version, now)
+                self.size += len(content)
+                while self.size > self.max_bytes:
+                    _, evicted = self._data.popitem(last=False)
+                    self.size -= len(evicted[0])
+        return content
+
+    def open(self, path):
+        """
+        Returns a binary file object with the content of the file. Files that are too large
+        to be cached are opened and streamed instead of read into memory.
+        :param path: path to the file
+        :raise OSError: if the file can't be read
+        """
+        path = str(path)
+        if os.path.getsize(path) > self.max_file_size:
+            self.discard(path)
+            return open(path, 'rb')
+        # BytesIO shares the cached bytes instead of copying them
+        return io.BytesIO(self.read(path))
+
+    def discard(self, path):
+        """
+        Removes a file from the cache
+        """
+        with self._lock:
+            entry = self._data.pop(str(path), None)
+            if entry is not None:
+                self.size -= len(entry[0])
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,194 @@
+from twisted.internet import defer, error, protocol, reactor as default_reactor
+from twisted.web.client import Agent, BrowserLikeRedirectAgent, ResponseDone
+from twisted.web.http_headers import Headers
+from twisted.web.iweb import UNKNOWN_LENGTH
+
+import hashlib
+import os
+import tempfile
+
+
+class DownloadError(Exception):
+    """
+    A download failed, the message is meant for the emulated shell (e.g. "ERROR 404: Not Found.")
+    """
+
+    def __init__(self, message, code=None, phrase=None):
+        """
+        :param message: the error message
+        :param code: HTTP status code if the server responded
+        :param phrase: HTTP status phrase if the server responded
+        """
+        super().__init__(message)
+        self.code = code
+        self.phrase = phrase
+
+
+class Download:
+    """
+    State and result of a download
+    """
+
+    def __init__(self, url):
+        self.url = url
+        # Set when the response arrives
+        self.code = None
+        self.phrase = None
+        self.length = None
+        self.content_type = None
+        # Set while and after receiving the body
+        self.received = 0
+        self.sha256 = None
+        self.path = None
+
+
+class _BodyReceiver(protocol.Protocol):
+    """
+    Streams a response body into a temporary file and hashes it on the way
+    """
+
+    def __init__(self, download, fp, max_size, progress, finished):
+        self.download = download
+        self.fp = fp
+        self.max_size = max_size
+        self.progress = progress
+        self.finished = finished
+        self.hash = hashlib.sha256()
+
+    def dataReceived(self, data):
+        if self.finished.called:
+            return
+        self.download.received += len(data)
+        if self.download.received > self.max_size:
+            self.transport.stopProducing()
+            self.finished.errback(DownloadError("File too large."))
+            return
+        self.fp.write(data)
+        self.hash.update(data)
+        if self.progress:
+            self.progress(self.download)
+
+    def connectionLost(self, reason):
+        if self.finished.called:
+            return
+        if reason.check(ResponseDone):
+            self.download.sha256 = self.hash.hexdigest()
+            self.finished.callback(self.download)
+        else:
+            self.finished.errback(DownloadError("Connection closed."))
+
+
+class _Discard(protocol.Protocol):
+    """
+    Closes the connection instead of receiving an unwanted body
+    """
+
+    def connectionMade(self):
+        self.transport.stopProducing()
+
+
+class Downloader:
+    """
+    Downloads files into the quarantine folder without blocking the reactor.
+    Files are stored by their SHA-256 (content-addressed), so repeated downloads of the
+    same file take no additional space. Downloads are limited in number, size and time.
+    """
+
+    user_agent = b'Wget/1.20.3 (linux-gnu)'
+
+    def __init__(self, directory, max_size=50 * 1024 * 1024, timeout=60, max_concurrent=4,
+                 reactor=default_reactor, agent=None):
+        """
+        :param directory: the quarantine folder
+        :param max_size: maximum size of a file in bytes
+        :param timeout: maximum duration of a download in seconds
+        :param max_concurrent: maximum number of simultaneous downloads, others wait
+        :param reactor: the reactor (for tests)
+        :param agent: the HTTP client (for tests), default: a redirect following Agent
+        """
+        self.directory = str(directory)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.reactor = reactor
+        self.agent = agent or BrowserLikeRedirectAgent(Agent(reactor, connectTimeout=timeout))
+        self._semaphore = defer.DeferredSemaphore(max_concurrent)
+
+    def download(self, url, started=None, progress=None):
+        """
+        Downloads a file
+        :param url: http or https URL
+        :param started: (optional) function(download) called when the response headers arrive
+        :param progress: (optional) function(download) called for every received chunk
+        :return: Deferred that fires with the Download or fails with DownloadError
+        """
+        return self._semaphore.run(self._download, Download(url), started, progress)
+
+    def _download(self, download, started, progress):
+        d = self.agent.request(b'GET', download.url.encode(), Headers({b'User-Agent': [self.user_agent]}))
+        d.addCallback(self._receive, download, started, progress)
+        d.addTimeout(self.timeout, self.reactor, onTimeoutCancel=self._timed_out)
+        d.addErrback(self._failed)
+        return d
+
+    def _timed_out(self, result, timeout):
+        return defer.fail(DownloadError("Read error (Connection timed out)."))
+
+    def _failed(self, failure):
+        """
+        Translates connection errors to the messages of wget
+        """
+        if failure.check(DownloadError):
+            return failure
+        if failure.check(error.DNSLookupError):
+            raise DownloadError("unable to resolve host address")
+        if failure.check(error.ConnectionRefusedError):
+            raise DownloadError("Connection refused.")
+        if failure.check(error.TimeoutError):
+            raise DownloadError("Connection timed out.")
+        raise DownloadError("Connection failed.")
+
+    def _receive(self, response, download, started, progress):
+        download.code = response.code
+        download.phrase = response.phrase.decode(errors='replace')
+        download.length = None if response.length is UNKNOWN_LENGTH else response.length
+        content_type = response.headers.getRawHeaders(b'content-type')
+        download.content_type = content_type[0].decode(errors='replace') if content_type else None
+
+        if response.code != 200 or download.length is not None and download.length > self.max_size:
+            response.deliverBody(_Discard())
+            if response.code != 200:
+                raise DownloadError("ERROR {}: {}.".format(response.code, download.phrase),
+                                    response.code, download.phrase)
+            raise DownloadError("File too large.", response.code, download.phrase)
+        if started:
+            started(download)
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.download-')
+        fp = os.fdopen(fd, 'wb')
+        receiver = None
+
+        def cancel(d):
+            if receiver is not None and receiver.transport is not None:
+                receiver.transport.stopProducing()
+
+        finished = defer.Deferred(cancel)
+        receiver = _BodyReceiver(download, fp, self.max_size, progress, finished)
+        response.deliverBody(receiver)
+        finished.addBoth(self._store, fp, tmp)
+        return finished
+
+    def _store(self, result, fp, tmp):
+        """
+        Moves a complete file to its content address, removes incomplete ones
+        """
+        fp.close()
+        if not isinstance(result, Download):
+            os.remove(tmp)
+            return result
+        path = os.path.join(self.directory, result.sha256)
+        if os.path.exists(path):
+            os.remove(tmp)
+        else:
+            os.replace(tmp, path)
+        result.path = path
+        return result
@@ -0,0 +1,291 @@
+"""
+Compact binary representation of an emulated filesystem.
+
+The XML files in resources/filesystem are the authoring format, they are compiled
+into an image that is memory-mapped at runtime:
+
+    header      magic, version, number of nodes, length of the start path, size of the string table
+    start path  uint32 per entry (child positions from the root)
+    nodes       fixed size records in breadth-first order, so the children of a
+                directory are consecutive: name (offset and length in the string table),
+                parent, first child, number of children, directory flag, mode, size, mtime
+    strings     UTF-8 encoded names
+
+Usage: python3 -m honeygrove.core.FilesystemImage <file.xml> [<image>]
+"""
+from honeygrove.core.FilesystemNode import FilesystemNode, parse_metadata
+
+from collections import deque
+import mmap
+import os
+import struct
+import sys
+import xml.etree.ElementTree as ET
+import zlib
+
+MAGIC = b'HGFS'
+VERSION = 1
+HEADER = struct.Struct('<4sIIII')
+NODE = struct.Struct('<IIIIIBxHqq')
+ENTRY = struct.Struct('<I')
+
+# Owner of image nodes: never equal to the owner of a session or a base tree, so they are always copied on write
+IMAGE_OWNER = object()
+
+
+def read_start_path(xml_path):
+    """
+    Reads the start path from the comment in the first line of an XML file ("<!--4, 0-->")
+    """
+    with open(str(xml_path)) as f:
+        try:
+            start_path = f.readline().split("--")[1].split(",")  # read first line and parse
+            return list(map(int, start_path))  # letters-numbers to list
+        except Exception:
+            return []  # if nothing given, the "/" is the root-/user directory
+
+
+def compile_image(xml_path, image_path):
+    """
+    Compiles an XML filesystem into an image
+    :param xml_path: the XML file
+    :param image_path: the image file to write
+    """
+    root = ET.parse(str(xml_path)).getroot()
+    start_path = read_start_path(xml_path)
+
+    # Breadth-first, so the children of every node get consecutive numbers
+    elements = [root]
+    parents = [0]
+    first_children = []
+    queue = deque([0])
+    while queue:
+        i = queue.popleft()
+        first_children.append(len(elements))
+        for child in elements[i]:
+            parents.append(i)
+            queue.append(len(elements))
+            elements.append(child)
+
+    strings = bytearray()
+    offsets = {}
+    nodes = bytearray()
+    for i, element in enumerate(elements):
+        name = element.attrib['name'].encode()
+        if name not in offsets:
+            offsets[name] = len(strings)
+            strings += name
+        size, mtime, mode = parse_metadata(element.attrib)
+        nodes += NODE.pack(offsets[name], len(name), parents[i], first_children[i], len(element),
+                           element.tag == 'dir', mode or 0, -1 if size is None else size,
+                           -1 if mtime is None else mtime)
+
+    tmp = str(image_path) + '.tmp'
+    with open(tmp, 'wb') as fp:
+        fp.write(HEADER.pack(MAGIC, VERSION, len(elements), len(start_path), len(strings)))
+        for entry in start_path:
+            fp.write(ENTRY.pack(entry))
+        fp.write(nodes)
+        fp.write(strings)
+    os.replace(tmp, str(image_path))
+
+
+class FilesystemImage:
+    """
+    A memory-mapped filesystem image. Nodes are read on demand.
+    """
+
+    def __init__(self, image_path):
+        """
+        :param image_path: the image file
+        :raise ValueError: if the file is no (supported) image
+        """
+        self.path = str(image_path)
+        with open(self.path, 'rb') as fp:
+            # Raises ValueError for empty files
+            self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, self.count, start_length, strings_size = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("{} is no filesystem image (version {})".format(self.path, VERSION))
+            offset = HEADER.size
+            self.start_path = [ENTRY.unpack_from(self._map, offset + i * ENTRY.size)[0]
+                               for i in range(start_length)]
+        except struct.error:
+            self._map.close()
+            raise ValueError("{} is truncated".format(self.path))
+        except ValueError:
+            self._map.close()
+            raise
+        self._nodes = offset + start_length * ENTRY.size
+        self._strings = self._nodes + self.count * NODE.size
+        if self._strings + strings_size != len(self._map):
+            self._map.close()
+            raise ValueError("{} is truncated".format(self.path))
+
+        # Views of the nodes that were used
+        self._views = {}
+
+    @staticmethod
+    def image_path(xml_path, directory):
+        """
+        Returns the path of the compiled image of an XML file
+        :param xml_path: the XML file
+        :param directory: the directory for compiled images
+        """
+        xml_path = os.path.abspath(str(xml_path))
+        name = os.path.splitext(os.path.basename(xml_path))[0]
+        # The path is part of the name, so equally named files in different folders don't collide
+        return os.path.join(str(directory), "{}-{:08x}.img".format(name, zlib.crc32(xml_path.encode())))
+
+    @classmethod
+    def load(cls, xml_path, directory):
+        """
+        Opens the image of an XML file, it is (re-)compiled if it is missing, older than the XML file
+        or can't be read
+        :param xml_path: the XML file
+        :param directory: the directory for compiled images
+        """
+        image_path = cls.image_path(xml_path, directory)
+        if os.path.exists(image_path) and os.path.getmtime(image_path) >= os.path.getmtime(str(xml_path)):
+            try:
+                return cls(image_path)
+            except ValueError as e:
+                print("Compiling the filesystem image again: {}".format(e), file=sys.stderr)
+        os.makedirs(str(directory), exist_ok=True)
+        compile_image(xml_path, image_path)
+        return cls(image_path)
+
+    @property
+    def root(self):
+        return self.node(0)
+
+    def node(self, i):
+        """
+        Returns the node with the given number
+        """
+        view = self._views.get(i)
+        if view is None:
+            view = self._views.setdefault(i, ImageNode(self, i))
+        return view
+
+    def record(self, i):
+        """
+        Returns the raw record of a node
+        """
+        return NODE.unpack_from(self._map, self._nodes + i * NODE.size)
+
+    def name(self, offset, length):
+        start = self._strings + offset
+        return self._map[start:start + length].decode()
+
+    def index(self, first, count):
+        """
+        Returns the name -> position index of count consecutive nodes
+        """
+        index = {}
+        for position in range(count):
+            offset, length = NODE.unpack_from(self._map, self._nodes + (first + position) * NODE.size)[:2]
+            index.setdefault(self.name(offset, length), position)
+        return index
+
+    def names(self):
+        """
+        Returns the names of all nodes except the root, without creating views
+        """
+        strings = self._map[self._strings:]
+        return [strings[offset:offset + length].decode()
+                for offset, length, *_ in NODE.iter_unpack(self._map[self._nodes + NODE.size:self._strings])]
+
+    def close(self):
+        self._map.close()
+
+
+class ImageNode:
+    """
+    Read-only view of a node in a FilesystemImage, compatible with FilesystemNode.
+    The views of the children and the name index are created on first use.
+    """
+
+    __slots__ = ('_image', '_i', 'name', 'tag', 'size', 'mtime', 'mode', '_first', '_count', '_children', '_index',
+                 'stat', 'listings')
+
+    owner = IMAGE_OWNER
+
+    def __init__(self, image, i):
+        name_offset, name_length, _, first, count, is_dir, mode, size, mtime = image.record(i)
+        self._image = image
+        self._i = i
+        self._first = first
+        self._count = count
+        self._children = None
+        self._index = None
+        self.stat = None
+        self.listings = {}
+        self.name = image.name(name_offset, name_length)
+        self.tag = 'dir' if is_dir else 'file'
+        self.size = size if size >= 0 else None
+        self.mtime = mtime if mtime >= 0 else None
+        self.mode = mode or None
+
+    @property
+    def children(self):
+        children = self._children
+        if children is None:
+            node = self._image.node
+            children = tuple(node(i) for i in range(self._first, self._first + self._count))
+            self._children = children
+        return children
+
+    @property
+    def attrib(self):
+        # Compatibility with ElementTree elements
+        return {'name': self.name}
+
+    def child_index(self, name):
+        """
+        Returns the position of the child with the given name or None
+        """
+        index = self._index
+        if index is None:
+            index = self._image.index(self._first, self._count)
+            self._index = index
+        return index.get(name)
+
+    def names(self):
+        """
+        Returns the names of all nodes below this one
+        """
+        if self._i == 0:
+            return self._image.names()
+        return FilesystemNode.names(self)
+
+    def copy(self, owner):
+        """
+        Returns a changeable FilesystemNode (the children stay views) owned by owner
+        """
+        node = FilesystemNode(self.tag, self.name, list(self.children), owner, self.size, self.mtime, self.mode)
+        node.stat = self.stat
+        node.listings = dict(self.listings)
+        node._index = dict(self._index) if self._index is not None else None
+        return node
+
+    def __getitem__(self, index):
+        return self.children[index]
+
+    def __iter__(self):
+        return iter(self.children)
+
+    def __len__(self):
+        return self._count
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+    target = sys.argv[2] if len(sys.argv) == 3 else os.path.splitext(sys.argv[1])[0] + '.img'
+    compile_image(sys.argv[1], target)
+    image = FilesystemImage(target)
+    print("{}: {} nodes, {} bytes".format(target, image.count, os.path.getsize(target)))
@@ -0,0 +1,119 @@
+def parse_metadata(attrib):
+    """
+    Reads the optional metadata attributes of an XML element
+    :return: size, mtime and mode (None if not given)
+    """
+    size = attrib.get('size')
+    mtime = attrib.get('mtime')
+    mode = attrib.get('mode')
+    return (int(size) if size is not None else None,
+            int(mtime) if mtime is not None else None,
+            int(mode, 8) if mode is not None else None)
+
+
+class FilesystemNode:
+    """
+    A file or directory of the emulated filesystem.
+    Nodes are shared between sessions and must only be changed by the session that owns them.
+    """
+
+    __slots__ = ('tag', 'name', 'children', 'owner', 'size', 'mtime', 'mode', 'stat', 'listings', '_index')
+
+    def __init__(self, tag, name, children=None, owner=None, size=None, mtime=None, mode=None):
+        """
+        :param tag: "dir" or "file"
+        :param name: name of the file or directory
+        :param children: list of child nodes
+        :param owner: the session that may change the node (None: the node is part of a base tree)
+        :param size: (optional) size in bytes
+        :param mtime: (optional) modification time (seconds since the epoch)
+        :param mode: (optional) permission bits, e.g. 0o644
+        """
+        self.tag = tag
+        self.name = name
+        self.children = children if children is not None else []
+        self.owner = owner
+        self.size = size
+        self.mtime = mtime
+        self.mode = mode
+        # Generated metadata (see FilesystemStat) and rendered long listings, set by the parser
+        self.stat = None
+        self.listings = {}
+        # Position of the (first) child with a name, built on demand
+        self._index = None
+
+    @classmethod
+    def from_element(cls, element):
+        """
+        Converts an ElementTree element and its children.
+        Besides the name, elements may have the attributes size, mtime and mode (octal).
+        """
+        size, mtime, mode = parse_metadata(element.attrib)
+        return cls(element.tag, element.attrib['name'], [cls.from_element(c) for c in element],
+                   size=size, mtime=mtime, mode=mode)
+
+    @property
+    def attrib(self):
+        # Compatibility with ElementTree elements
+        return {'name': self.name}
+
+    def copy(self, owner):
+        """
+        Returns a shallow copy (the children are shared) owned by owner
+        """
+        node = FilesystemNode(self.tag, self.name, list(self.children), owner, self.size, self.mtime, self.mode)
+        node.stat = self.stat
+        node.listings = dict(self.listings)
+        if self._index is not None:
+            node._index = dict(self._index)
+        return node
+
+    def child_index(self, name):
+        """
+        Returns the position of the child with the given name or None
+        """
+        index = self._index
+        if index is None:
+            index = {}
+            for i, child in enumerate(self.children):
+                index.setdefault(child.name, i)
+            self._index = index
+        return index.get(name)
+
+    def names(self):
+        """
+        Returns the names of all nodes below this one (one entry per node)
+        """
+        names = []
+        stack = list(self.children)
+        while stack:
+            child = stack.pop()
+            names.append(child.name)
+            stack.extend(child.children)
+        return names
+
+    def append(self, child):
+        """
+        Adds a child (only for owned nodes)
+        """
+        self.children.append(child)
+        self.listings = {}
+        if self._index is not None:
+            self._index.setdefault(child.name, len(self.children) - 1)
+
+    def remove(self, name):
+        """
+        Removes all children with the given name (only for owned nodes)
+        """
+        self.children[:] = [child for child in self.children if child.name != name]
+        self.listings = {}
+        self._index = None
+
+    def __getitem__(self, index):
+        return self.children[index]
+
+    def __iter__(self):
+        return iter(self.children)
+
+    def __len__(self):
+        return len(self.children)
@@ -1,40 +1,160 @@
 from honeygrove.config import Config
+from honeygrove.core.Cache import FileCache
+from honeygrove.core.FilesystemImage import FilesystemImage, read_start_path
+from honeygrove.core.FilesystemNode import FilesystemNode
+from honeygrove.core.FilesystemStat import StatGenerator
 
 import os
-import re
+import time
 import xml.etree.ElementTree as ET
 
 
 class FilesystemParser:
+    """
+    The emulated filesystem of a session.
+    The XML file is parsed only once, all sessions start with the same immutable base tree.
+    Changes are copy-on-write: only the directories on the path to a changed node are copied,
+    so the memory of a session only grows with the changes of the attacker.
+    """
+
     honeytoken_directory = str(Config.folder.honeytoken_files)
     cd_pattern = "^cd \S+$"
     mkdir_pattern = "^mkdir \S+$"
     touch_pattern = "^touch \S+$"
     ls_pattern = "^ls \S+$"
 
+    # Base trees (start path, root node) by (xml path, honeytoken directory)
+    _base_trees = {}
+    # Metrics of building the base trees, same keys
+    load_stats = {}
+    # Cached listings of honeytoken directories: directory -> (mtime, names)
+    _listings = {}
+    # Content of honeytoken files, shared with the FTP service
+    content_cache = FileCache(Config.honeytoken.file_cache_size, Config.honeytoken.file_cache_max_file)
+    # Metadata of nodes without explicit attributes
+    stats = StatGenerator(Config.filesystem.seed, Config.filesystem.mtime_anchor)
+
     def __init__(self, xml_path=Config.folder.filesystem):
+        self.xml_path = xml_path
+
+        key = (str(xml_path), self.honeytoken_directory)
+        base = FilesystemParser._base_trees.get(key)
+        if base is None:
+            # Nodes owned by None are changed in place, so the honeytokens are added to the base tree
+            self._owner = None
+            start = time.perf_counter()
+            self.start_path, self.root = self._load(xml_path)
+            parsed = time.perf_counter()
+            self._init_position()
+            names = self.root.names()
+            honeytokens = self.add_honeytoken_files(names)
+            done = time.perf_counter()
+
+            base = (self.start_path, self.root)
+            FilesystemParser._base_trees[key] = base
+            FilesystemParser.load_stats[key] = {'xml': str(xml_path), 'nodes': len(names) + honeytokens,
+                                                'honeytokens': honeytokens,
+                                                'parse_ms': (parsed - start) * 1000,
+                                                'honeytokens_ms': (done - parsed) * 1000,
+                                                'total_ms': (done - start) * 1000}
+
+        # Token of this session for copy-on-write
+        self._owner = object()
+        self.start_path, self.root = base
+        self._init_position()
+
+    @classmethod
+    def clear_cache(cls):
+        """
+        Forgets all base trees, e.g. after the XML file or the honeytoken files changed.
+        Only new sessions are affected.
+        """
+        cls._base_trees = {}
+        cls._listings = {}
+        cls.content_cache.clear()
+
+    @classmethod
+    def preload(cls, xml_path=Config.folder.filesystem):
+        """
+        Builds the base tree before the first session
+        :return: the metrics of loading the tree, see `load_stats`
+        """
+        cls(xml_path)
+        return cls.load_stats[(str(xml_path), cls.honeytoken_directory)]
 
-        with open(str(xml_path)) as f:
-            try:
-                self.start_path = f.readline().split("--")[1].split(",")  # read first line and parse
-                self.start_path = list(map(int, self.start_path))  # letters-numbers to list
-            except Exception:
-                self.start_path = []  # if nothing given, the "/" is the root-/user directory
+    @classmethod
+    def list_honeytoken_files(cls, directory=None):
+        """
+        Returns the names in the honeytoken directory, the listing is cached until the directory changes
+        :param directory: the directory to list (default: `honeytoken_directory`)
+        """
+        directory = directory or cls.honeytoken_directory
+        mtime = os.stat(directory).st_mtime_ns
+        cached = cls._listings.get(directory)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, os.listdir(directory))
+            cls._listings[directory] = cached
+        return cached[1]
+
+    @staticmethod
+    def _load(xml_path):
+        """
+        Loads the compiled image of the XML file (see FilesystemImage), the XML file
+        is parsed directly if the image can't be written or read
+        :return: the start path and the root node
+        """
+        try:
+            image = FilesystemImage.load(xml_path, Config.folder.filesystem_cache)
+            return image.start_path, image.root
+        except (OSError, ValueError):
+            root = FilesystemNode.from_element(ET.parse(str(xml_path)).getroot())
+            return read_start_path(xml_path), root
 
+    def _init_position(self):
         # The current position in the tree as list
-        self.current_pos = self.start_path
-        self.xml_path = xml_path
-        self.tree = ET.parse(str(self.xml_path))
-        self.root = self.tree.getroot()
+        self.current_pos = list(self.start_path)
 
-        if self.root.attrib['name'] != "/":
+        if self.root.name != "/":
             self.mode = "DOS"
         else:
             self.mode = "UNIX"
 
         # Saves the user directory path (to show it as "-")
         self.user_path = self.get_current_path()
-        self.add_honeytoken_files()
+
+    def _writable(self, position):
+        """
+        Returns the element at position after copying all shared nodes on the way to it
+        :param position: Position of the element
+        """
+        if self.root.owner is not self._owner:
+            self.root = self.root.copy(self._owner)
+        current = self.root
+        for i in position:
+            child = current.children[i]
+            if child.owner is not self._owner:
+                child = child.copy(self._owner)
+                current.children[i] = child
+            current = child
+        return current
+
+    def _find(self, path):
+        """
+        Looks up an absolute path
+        :param path: the absolute path
+        :return: the position and the element or (None, None) if the path does not exist
+        """
+        position = []
+        current = self.root
+        if path == "/" or not path:
+            return position, current
+        for name in path[1:].split("/"):
+            i = current.child_index(name)
+            if i is None:
+                return None, None
+            position.append(i)
+            current = current.children[i]
+        return position, current
 
     def get_position(self, path):
         """
@@ -42,15 +162,9 @@ class FilesystemParser:
         :param path: the path which position shall be determined
         :return:
         """
-        path = self.get_absolute_path(path)
-        if not self.valid_path(path):
+        position, _ = self._find(self.get_absolute_path(path))
+        if position is None:
             raise Exception("Invalid path")
-        position = []
-        if path == "/":
-            return position
-        for element in path.split("/")[1:]:  # da wir mit absoluten Pfaden arbeiten, ist das erste Element ""
-            children = [c.attrib['name'] for c in self.get_element(position)]
-            position.append(children.index(element))
         return position
 
     def get_path(self, position):
@@ -64,9 +178,9 @@ class FilesystemParser:
         if position == []:
             return "/"
         for i in position:
-            current = current[i]
-            if current.attrib['name'] != "/":  # "root-/" brauchen wir nicht, ist schon da
-                path += "/" + current.attrib['name']
+            current = current.children[i]
+            if current.name != "/":  # "root-/" brauchen wir nicht, ist schon da
+                path += "/" + current.name
         return path
 
     def get_element(self, position):
@@ -77,7 +191,7 @@ class FilesystemParser:
         """
         current = self.root
         for i in position:
-            current = current[i]
+            current = current.children[i]
         return current
 
     def get_absolute_path(self, rel_path: str):
@@ -91,8 +205,6 @@ class FilesystemParser:
             return ""
 
         if self.mode == "DOS":
-            if re.match(r"\w:\\", rel_path[0:2]):
-                rel_path = rel_path[3:]
             rel_path = rel_path.replace("\\", "/")
 
         if rel_path == "/":
@@ -104,28 +216,14 @@ class FilesystemParser:
         if rel_path[0] != "/":  # if its a absolute path, we don't have to add a prefix
             rel_path = self.get_current_path() + "/" + rel_path
 
-        # Deletes stuff like ///, /./, ./ or /.
-        rel_path = re.sub(r"([^\.]|^)(\./)", r"/",
-                          rel_path)  # "beginning of the line" or " not .", followed by any amount of "./"
-        rel_path = re.sub(r"(/\.)$", r"/", rel_path)  # the same for the end of the line
-        rel_path = re.sub(r"/{2,}", r"/", rel_path)  # ///// goes to /
-
-        folders = rel_path.split("/")
-        folders = list(filter(None, folders))
-
-        i = 0
-        while i < len(folders):
-            f = folders[i]
+        # Resolves ".", ".." and empty parts (///) in a single pass
+        folders = []
+        for f in rel_path.split("/"):
             if f == "..":
-                if i > 0:
-                    folders.pop(i - 1)
-                    folders.pop(i - 1)  # same index because the list slipped by 1
-                else:
-                    folders.pop(i)
-                i = 0
-
-            else:
-                i += 1
+                if folders:
+                    folders.pop()
+            elif f and f != ".":
+                folders.append(f)
         return "/" + "/".join(folders)
 
     def tree_contains(self, file_name):
@@ -134,21 +232,28 @@ class FilesystemParser:
         :param file_name:
         :return:
         """
-        found = False
-        for child in self.root.findall('.//'):
-            if child.attrib['name'] == file_name:
-                found = True
-                break
-        return found
-
-    def add_honeytoken_files(self):
+        stack = list(self.root.children)
+        while stack:
+            child = stack.pop()
+            if child.name == file_name:
+                return True
+            stack.extend(child.children)
+        return False
+
+    def add_honeytoken_files(self, names=None):
         """
         Adds the file names from the honeytokenfiles folder if files with given names not already exist
+        :param names: (optional) the names of all nodes, see `FilesystemNode.names`
+        :return: the number of added files
         """
 
-        for file in os.listdir(self.honeytoken_directory):
-            if not self.tree_contains(str(file)):
-                self.touch(self.user_path + "/" + file)
+        names = set(names if names is not None else self.root.names())
+        new = [file for file in self.list_honeytoken_files() if file not in names]
+        if new:
+            directory = self._writable(self.get_position(self.user_path))
+            for file in new:
+                directory.append(FilesystemNode("file", file, owner=self._owner))
+        return len(new)
 
     def get_current_path(self):
         """returns the current path as String"""
@@ -197,27 +302,88 @@ class FilesystemParser:
         file_path = "/".join(split[:-1])
         file_name = split[-1]
 
-        if file_name in self.ls(file_path) or file_name == ".":
+        file_position = self.get_position(file_path)
+        if self.get_element(file_position).child_index(file_name) is not None or file_name == ".":
             if tag == "dir":
                 return "mkdir: cannot create directory '" + file_name + "': File exists"
             else:
                 return  # hall not be created again
 
-        file_position = self.get_position(file_path)
-        ET.SubElement(self.get_element(file_position), tag, {"name": file_name})
+        self._writable(file_position).append(FilesystemNode(tag, file_name, owner=self._owner, size=0,
+                                                            mtime=int(time.time())))
 
-    def ls(self, path=''):
-        """Lists all children"""
+    def names(self, path=''):
+        """
+        Returns the names of all children
+        :param path: the directory (default: the current one)
+        """
         if path:
-            path = self.get_absolute_path(path)
-            pos = self.get_position(path)
+            element = self.get_element(self.get_position(path))
         else:
-            pos = self.current_pos
-        element = self.get_element(pos)
-        response = ""
-        for child in element:
-            response += child.attrib['name'] + '\n'
-        return response
+            element = self.get_element(self.current_pos)
+        return [child.name for child in element.children]
+
+    def ls(self, path=''):
+        """Lists all children"""
+        return "".join(name + '\n' for name in self.names(path))
+
+    def stat(self, path, node):
+        """
+        Returns the metadata of a node, it is generated once and kept with the node
+        :param path: the absolute path of the node
+        :param node: the node
+        :return: a FilesystemStat.Stat
+        """
+        stat = node.stat
+        if stat is None:
+            size = None
+            if node.tag == "file" and node.name in self.list_honeytoken_files():
+                # Must match the output of cat
+                size = os.path.getsize(os.path.join(self.honeytoken_directory, node.name))
+            stat = self.stats.stat(path, node, size)
+            node.stat = stat
+        return stat
+
+    def entries(self, path=''):
+        """
+        Lists all children with their metadata
+        :param path: the directory (default: the current one)
+        :return: list of (name, Stat)
+        """
+        path = self.get_absolute_path(path) if path else self.get_current_path()
+        _, element = self._find(path)
+        if element is None:
+            raise Exception("Invalid path")
+        prefix = path.rstrip("/")
+        return [(child.name, self.stat(prefix + "/" + child.name, child)) for child in element.children]
+
+    def ls_long(self, path='', all=False):
+        """
+        Lists all children like `ls -l`. The listing of a directory is rendered once and
+        kept until the directory changes.
+        :param path: a directory or file (default: the current directory)
+        :param all: include hidden files, "." and ".." (`ls -la`)
+        :return: list of lines
+        """
+        absolute = self.get_absolute_path(path) if path else self.get_current_path()
+        _, element = self._find(absolute)
+        if element is None:
+            raise Exception("Invalid path")
+        if element.tag == "file":
+            return self.stats.render([(path, self.stat(absolute, element))])[1:]
+
+        lines = element.listings.get(all)
+        if lines is None:
+            entries = self.entries(absolute)
+            if all:
+                parent = absolute.rsplit("/", 1)[0] or "/"
+                entries = [(".", self.stat(absolute, element)),
+                           ("..", self.stat(parent, self._find(parent)[1]))] + entries
+            else:
+                entries = [entry for entry in entries if not entry[0].startswith(".")]
+            lines = self.stats.render(entries)
+            element.listings[all] = lines
+        return lines
 
     def cd(self, path):
         """
@@ -228,13 +394,11 @@ class FilesystemParser:
         if not path:
             return
 
-        input = path
-        path = self.get_absolute_path(path)
+        position, _ = self._find(self.get_absolute_path(path))
+        if position is None:
+            return path + ": No such file or directory"
 
-        if not self.valid_path(path):
-            return input + ": No such file or directory"
-
-        self.current_pos = self.get_position(path)
+        self.current_pos = position
         return
 
     def valid_path(self, path, tag=''):
@@ -244,24 +408,10 @@ class FilesystemParser:
         :param path: the path to be checked
         :param tag: if tag is given, it'll be checked if the tag of the element is at the position path =tag
         """
-        path = self.get_absolute_path(path)  # just in case
-
-        if tag != 'file' and path == "/":
-            return True
-
-        pos = []
-
-        res = True
-        for p in path.split("/")[1:]:
-            children = [c.attrib['name'] for c in self.get_element(pos)]
-            if p in children:
-                pos.append(children.index(p))
-            else:
-                res = False
-        if not (tag == '' or self.get_element(pos).tag == tag):  # not valid if the tag is not the desired
-            res = False
-
-        return res
+        _, element = self._find(self.get_absolute_path(path))
+        if element is None:
+            return False
+        return tag == '' or element.tag == tag  # not valid if the tag is not the desired
 
     def valid_directory(self, path):
         """Determines if the given path of current_pos leads to a folder"""
@@ -287,10 +437,7 @@ class FilesystemParser:
         child_name = path.split("/")[-1]
         parent_path = "/".join(path.split("/")[:-1])
 
-        parent = self.get_element(self.get_position(parent_path))
-        for child in parent:
-            if child.attrib.get('name') == child_name:
-                parent.remove(child)
+        self._writable(self.get_position(parent_path)).remove(child_name)
 
     def rename(self, from_path, to_name):
         """
@@ -326,11 +473,13 @@ class FilesystemParser:
                 if targettype != sourcetype:
                     return "Not possible"
 
-        parent = self.get_element(self.get_position(parentpath))
+        parent = self._writable(self.get_position(parentpath))
 
         self.delete(sourcepath)
 
-        element.attrib['name'] = targetpath.split("/")[-1]
+        # The moved node keeps its (shared) children
+        element = element.copy(self._owner)
+        element.name = targetpath.split("/")[-1]
         parent.append(element)
 
     def cat(self, path):
@@ -345,8 +494,9 @@ class FilesystemParser:
         if not self.valid_file(path):
             raise Exception("Is a directory")
         filename = path.split("/")[-1]
-        for f in os.listdir(self.honeytoken_directory):
-            if f == filename:
-                with open(self.honeytoken_directory + "/" + f, "r") as fp:
-                    data = fp.read()
-                return data
+        if filename in self.list_honeytoken_files():
+            data = self.content_cache.read(self.honeytoken_directory + "/" + filename).decode()
+            # Like reading in text mode
+            if "\r" in data:
+                data = data.replace("\r\n", "\n").replace("\r", "\n")
+            return data
@@ -0,0 +1,132 @@
+from collections import namedtuple
+import hashlib
+import time
+
+# Metadata of a file or directory as shown by `ls -l`
+Stat = namedtuple('Stat', ['mode', 'nlink', 'owner', 'group', 'size', 'mtime'])
+
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+# Files in these directories are executables
+BIN_DIRECTORIES = {'bin', 'sbin'}
+# Files that are private to their owner
+PRIVATE_FILES = {'id_rsa', 'id_dsa', 'id_ecdsa', 'id_ed25519', 'shadow', 'gshadow', '.bash_history'}
+PRIVATE_DIRECTORIES = {'.ssh', '.gnupg'}
+
+
+class StatGenerator:
+    """
+    Generates plausible metadata for nodes without explicit size, mtime or mode.
+    All values are derived from a hash of the path, so a path always shows the same
+    metadata, in all sessions and after a restart. The seed makes them differ between
+    installations.
+    """
+
+    def __init__(self, seed, anchor=None, max_age=2 * 365 * 86400, clock=time.time, localtime=time.localtime):
+        """
+        :param seed: secret of the installation
+        :param anchor: newest generated mtime (seconds since the epoch), defaults to the start of the current day
+        :param max_age: maximum age of generated mtimes in seconds (relative to anchor)
+        :param clock: wall clock (for tests)
+        :param localtime: converts seconds since the epoch to a struct_time (for tests)
+        """
+        self.seed = seed
+        self.max_age = max_age
+        self.anchor = anchor if anchor is not None else int(clock()) // 86400 * 86400
+        self._clock = clock
+        self._localtime = localtime
+
+    def stat(self, path, node, size=None):
+        """
+        Returns the metadata of a node, explicit values of the node take precedence
+        :param path: absolute path of the node
+        :param node: the FilesystemNode
+        :param size: (optional) known size, e.g. of a honeytoken file
+        """
+        digest = hashlib.sha1((self.seed + path).encode()).digest()
+        h = int.from_bytes(digest[:8], 'little')
+
+        parts = path.split('/')
+        parent = parts[-2] if len(parts) > 2 else '/'
+        owner = parts[2] if len(parts) > 2 and parts[1] == 'home' and parts[2] else 'root'
+
+        if node.tag == 'dir':
+            mode = node.mode
+            if mode is None:
+                if path == '/tmp':
+                    mode = 0o1777
+                elif path == '/root' or node.name in PRIVATE_DIRECTORIES:
+                    mode = 0o700
+                else:
+                    mode = 0o755
+            mode |= 0o40000
+            nlink = 2 + sum(1 for child in node.children if child.tag == 'dir')
+            size = 4096
+        else:
+            mode = node.mode
+            if mode is None:
+                if node.name in PRIVATE_FILES or parent == '.ssh' and not node.name.endswith('.pub'):
+                    mode = 0o600
+                elif parent in BIN_DIRECTORIES:
+                    mode = 0o755
+                else:
+                    mode = 0o644
+            mode |= 0o100000
+            nlink = 1
+            if size is None:
+                size = node.size
+            if size is None:
+                # Log-uniformly distributed, executables are larger
+                exponent = 13 if parent in BIN_DIRECTORIES else 6
+                size = int(2 ** (exponent + (h & 0xffff) / 0xffff * 8))
+
+        mtime = node.mtime
+        if mtime is None:
+            mtime = self.anchor - (h >> 16) % self.max_age
+
+        return Stat(mode, nlink, owner, owner, size, mtime)
+
+    def render(self, entries):
+        """
+        Renders a long listing like `ls -l` with aligned columns
+        :param entries: list of (name, Stat)
+        :return: list of lines, starting with the total number of blocks
+        """
+        if not entries:
+            return ["total 0"]
+        now = self._clock()
+        columns = [(format_mode(stat.mode), str(stat.nlink), stat.owner, stat.group, str(stat.size),
+                    self.format_mtime(stat.mtime, now), name) for name, stat in entries]
+        widths = [max(len(column[i]) for column in columns) for i in range(5)]
+
+        # Blocks of 1 KiB, files occupy full 4 KiB blocks
+        total = sum((stat.size + 4095) // 4096 * 4 for _, stat in entries)
+        lines = ["total {}".format(total)]
+        for mode, nlink, owner, group, size, mtime, name in columns:
+            lines.append("{} {} {} {} {} {} {}".format(mode.ljust(widths[0]), nlink.rjust(widths[1]),
+                                                      owner.ljust(widths[2]), group.ljust(widths[3]),
+                                                      size.rjust(widths[4]), mtime, name))
+        return lines
+
+    def format_mtime(self, mtime, now):
+        """
+        Formats an mtime like ls: with the time if it is less than six months old, otherwise with the year
+        """
+        t = self._localtime(mtime)
+        if now - 180 * 86400 < mtime <= now:
+            return "{} {:2d} {:02d}:{:02d}".format(MONTHS[t.tm_mon - 1], t.tm_mday, t.tm_hour, t.tm_min)
+        return "{} {:2d}  {}".format(MONTHS[t.tm_mon - 1], t.tm_mday, t.tm_year)
+
+
+def format_mode(mode):
+    """
+    Formats a mode like ls, e.g. 0o40755 -> "drwxr-xr-x"
+    """
+    chars = ['d' if mode & 0o40000 else '-']
+    for shift in (6, 3, 0):
+        bits = mode >> shift
+        chars.append('r' if bits & 4 else '-')
+        chars.append('w' if bits & 2 else '-')
+        chars.append('x' if bits & 1 else '-')
+    if mode & 0o1000:
+        chars[9] = 't' if mode & 1 else 'T'
+    return ''.join(chars)
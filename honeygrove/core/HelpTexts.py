@@ -0,0 +1,87 @@
+import os
+import time
+
+
+class HelpTexts:
+    """
+    The help texts of the emulated shell, parsed once and kept as text (for the log) and as
+    encoded terminal output. reload() picks up edits of the files without a restart.
+    """
+
+    def __init__(self, helptext_path, gnuhelp_path):
+        """
+        :param helptext_path: file with the help texts of the commands, every text starts with "<command>: "
+                              at the beginning of a line, its other lines are indented
+        :param gnuhelp_path: file with the general help text (help without arguments)
+        """
+        self.helptext_path = str(helptext_path)
+        self.gnuhelp_path = str(gnuhelp_path)
+        self.topics = {}
+        self.overview = (b"", "")
+        self._versions = None
+
+    def load(self):
+        """
+        Parses the files
+        :return: dict with the number of topics and the duration in ms
+        """
+        start = time.perf_counter()
+        versions = self._file_versions()
+
+        topics = {}
+        with open(self.helptext_path) as fp:
+            lines = []
+            for line in fp:
+                if line[:1].strip():
+                    lines = [line]
+                    topics.setdefault(line.split(":", 1)[0], lines)
+                elif lines:
+                    lines.append(line)
+        with open(self.gnuhelp_path) as fp:
+            overview = fp.read()
+
+        # Replaced as a whole, so sessions never see a half loaded state
+        self.topics = {cmd: self._entry("".join(lines)) for cmd, lines in topics.items()}
+        self.overview = self._entry(overview)
+        self._versions = versions
+        return {'topics': len(self.topics), 'load_ms': (time.perf_counter() - start) * 1000}
+
+    def reload(self):
+        """
+        Loads the files again if they have changed since the last load
+        :return: True if the files were loaded again
+        """
+        if self._versions is not None and self._versions == self._file_versions():
+            return False
+        self.load()
+        return True
+
+    def topic(self, cmd):
+        """
+        Returns the help text for a command
+        :param cmd: the command
+        :return: (terminal output, text) or None if there is no help text
+        """
+        if self._versions is None:
+            self.load()
+        return self.topics.get(cmd)
+
+    def general(self):
+        """
+        Returns the general help text
+        :return: (terminal output, text)
+        """
+        if self._versions is None:
+            self.load()
+        return self.overview
+
+    def _entry(self, text):
+        text = text.rstrip("\n")
+        return text.encode(), text
+
+    def _file_versions(self):
+        versions = []
+        for path in (self.helptext_path, self.gnuhelp_path):
+            st = os.stat(path)
+            versions.append((st.st_mtime_ns, st.st_size))
+        return versions
@@ -1,5 +1,6 @@
 from honeygrove import log
 from honeygrove.config import Config
+from honeygrove.core.FilesystemParser import FilesystemParser
 
 import json
 import os
@@ -255,6 +256,7 @@ class ManagementHandler:
                         myfile.write(jsonDict["file"])
 
                     Config.folder.filesystem = new_path
+                    FilesystemParser.clear_cache()
 
                 answer = json.dumps({"type": "update", "from": hp_id, "to": jsonDict["from"],
                                      "response": "set_filesystem_xml", "successful": valid}, sort_keys=True)
@@ -289,6 +291,7 @@ class ManagementHandler:
                         file.write(content)
                 except EnvironmentError:
                     succ = 'false'
+                FilesystemParser.clear_cache()
 
                 answer = json.dumps(
                     {"type": "update", "from": hp_id, "to": jsonDict["from"], "successful": succ,
@@ -318,6 +321,7 @@ class ManagementHandler:
                                 os.remove(path)
                     except EnvironmentError:
                         succ = 'false'
+                FilesystemParser.clear_cache()
 
                 answer = json.dumps(
                     {"type": "update", "from": hp_id, "to": jsonDict["from"], "successful": succ,
@@ -328,16 +332,16 @@ class ManagementHandler:
                 print("get html pages")
                 data = []
                 sites = []
-                for key in Config.http.html_dictionary:
+                for key in Config.http.html_dictionary_content:
                     sites.append(key)
                 for i in range(0, sites.__len__()):
-                    login = Config.http.html_dictionary[sites[i]][0]
+                    login = Config.http.html_dictionary_content[sites[i]][0]
                     content = "None"
-                    if Config.http.html_dictionary[sites[i]].__len__() > 1:
-                        content = Config.http.html_dictionary[sites[i]][1]
-                        with open(str(Config.http.resource_folder / content, encoding='utf8')) as fp:
+                    if Config.http.html_dictionary_content[sites[i]].__len__() > 1:
+                        content = Config.http.html_dictionary_content[sites[i]][1]
+                        with open(str(Config.http.resource_folder / content), encoding='utf8') as fp:
                             content = fp.read()
-                    with open(str(Config.http.resource_folder / login, encoding='utf8')) as fp:
+                    with open(str(Config.http.resource_folder / login), encoding='utf8') as fp:
                         login = fp.read()
                     data.append({"url": sites[i],
                                  "html": login,
@@ -351,11 +355,11 @@ class ManagementHandler:
                 pages = jsonDict["urls"]
                 data = False
                 sites = []
-                for key in Config.http.html_dictionary:
+                for key in Config.http.html_dictionary_content:
                     sites.append(key)
                 if pages == ["ALL"]:
-                    Config.http.html_dictionary.clear()
-                    Config.http.html_dictionary["404"] = ["404_login.html"]
+                    Config.http.html_dictionary_content.clear()
+                    Config.http.html_dictionary_content["404"] = ["404_login.html"]
 
                     for currentFile in os.listdir(Config.http.resource_folder):
                         ext = ('.html')
@@ -365,14 +369,15 @@ class ManagementHandler:
                     data = True  # data = "Removing of all pages was succesful!"
                 else:
                     for page in pages:
-                        if page in Config.http.html_dictionary:
-                            if len(Config.http.html_dictionary[page]) > 1:
-                                os.remove(Config.http.resource_folder / Config.http.html_dictionary[page][1])
-                            os.remove(Config.http.resource_folder / Config.http.html_dictionary[page][0])
-                            del Config.http.html_dictionary[page]
+                        if page in Config.http.html_dictionary_content:
+                            if len(Config.http.html_dictionary_content[page]) > 1:
+                                os.remove(Config.http.resource_folder / Config.http.html_dictionary_content[page][1])
+                            os.remove(Config.http.resource_folder / Config.http.html_dictionary_content[page][0])
+                            del Config.http.html_dictionary_content[page]
                             Config.save_html_dictionary()
 
                     data = len(set(pages)) < len(set(sites))
+                controller.serviceDict[Config.http.name].reload_pages()
 
                 answer = json.dumps(
                     {"type": "update", "from": hp_id, "to": jsonDict["from"],
@@ -385,22 +390,21 @@ class ManagementHandler:
                 page2 = jsonDict["page"]["dashboard"]
                 data = False  # data = "Something went wrong!"
                 sites = []
-                for key in Config.http.html_dictionary:
+                for key in Config.http.html_dictionary_content:
                     sites.append(key)
                 if path in sites:
                     data = False  # data = "Page does exist already!"
                 else:
                     data = True  # data = "Adding of " + path + " was succesful!"
-                    with open(str(Config.http.resource_folder / path / "_login.html"), "a+") as f:
+                    with open(str(Config.http.resource_folder / (path[1:] + "_login.html")), "a+") as f:
                         f.write(page)
                     if page2:
-                        with open(str(Config.http.resource_folder / path / "_content.html"), "a+") as f:
+                        with open(str(Config.http.resource_folder / (path[1:] + "_content.html")), "a+") as f:
                             f.write(page2)
-                        Config.http.html_dictionary[path] = [path[1:] + "_login.html", path[1:] + "_content.html"]
+                        Config.http.html_dictionary_content[path] = [path[1:] + "_login.html", path[1:] + "_content.html"]
                     else:
-                        Config.http.html_dictionary[path] = [path[1:] + "_login.html"]
-                    controller.stopService(Config.http.name)
-                    controller.startService(Config.http.name)
+                        Config.http.html_dictionary_content[path] = [path[1:] + "_login.html"]
+                    controller.serviceDict[Config.http.name].reload_pages()
                 Config.save_html_dictionary()
                 answer = json.dumps(
                     {"type": "update", "from": hp_id, "to": jsonDict["from"],
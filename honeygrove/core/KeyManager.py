@@ -0,0 +1,146 @@
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from twisted.conch.ssh import keys
+from twisted.internet import reactor as default_reactor
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import time
+
+
+def _generate_rsa(size):
+    return rsa.generate_private_key(public_exponent=65537, key_size=size, backend=default_backend())
+
+
+# Key generators by SSH key type, the argument is the key size (only used for RSA)
+GENERATORS = {
+    'ssh-rsa': _generate_rsa,
+    'ssh-ed25519': lambda size: ed25519.Ed25519PrivateKey.generate(),
+    'ecdsa-sha2-nistp256': lambda size: ec.generate_private_key(ec.SECP256R1(), default_backend()),
+    'ecdsa-sha2-nistp384': lambda size: ec.generate_private_key(ec.SECP384R1(), default_backend()),
+    'ecdsa-sha2-nistp521': lambda size: ec.generate_private_key(ec.SECP521R1(), default_backend()),
+}
+# Key types that are too slow to generate at startup
+SLOW_TYPES = {'ssh-rsa'}
+
+
+class KeyManager:
+    """
+    Host keys of the SSH service.
+    Key files are parsed once per process. Missing keys are generated and saved:
+    ed25519 and ECDSA keys right away (this takes milliseconds), RSA keys in a worker thread.
+    Until an RSA key is ready only the other types are offered. If RSA is the only type,
+    a smaller provisional key is used in the meantime, it is not saved.
+    """
+
+    # Loaded keys: path -> (mtime, private key)
+    _cache = {}
+
+    def __init__(self, paths, rsa_key_size=4096, provisional_rsa_key_size=2048, reactor=default_reactor):
+        """
+        :param paths: dict of SSH key type (e.g. "ssh-ed25519") -> path of the private key,
+                      the public key is saved next to it with the suffix ".pub"
+        :param rsa_key_size: size of generated RSA keys in bits
+        :param provisional_rsa_key_size: size of the provisional RSA key in bits
+        :param reactor: the reactor, keys generated in the background are added on its thread (for tests)
+        """
+        self.paths = {key_type: str(path) for key_type, path in paths.items()}
+        self.rsa_key_size = rsa_key_size
+        self.provisional_rsa_key_size = provisional_rsa_key_size
+        self.reactor = reactor
+
+        # Dicts as expected by twisted.conch.ssh.factory.SSHFactory, keys that become ready later are added
+        self.private_keys = {}
+        self.public_keys = {}
+        # Metrics of `load`
+        self.load_stats = None
+        # Future of the background generation (None if nothing is generated)
+        self.pending = None
+
+        self._executor = None
+
+    def load(self):
+        """
+        Loads or generates all keys, only the first call has an effect
+        :return: the metrics (types, generated, pending, load_ms)
+        """
+        if self.load_stats is not None:
+            return self.load_stats
+
+        start = time.perf_counter()
+        generated = []
+        missing = []
+        for key_type, path in self.paths.items():
+            if key_type not in GENERATORS:
+                raise ValueError("Unsupported host key type: " + key_type)
+            key = self._read(path)
+            if key is None and key_type in SLOW_TYPES:
+                missing.append(key_type)
+                continue
+            if key is None:
+                key = self._generate(key_type, path)
+                generated.append(key_type)
+            self._add(key)
+
+        if missing:
+            if not self.private_keys:
+                # Nothing else to offer
+                self._add(keys.Key(GENERATORS[missing[0]](self.provisional_rsa_key_size)))
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="KeyManager")
+            self.pending = self._executor.submit(self._generate_missing, missing)
+            self._executor.shutdown(wait=False)
+
+        self.load_stats = {'types': ", ".join(key.sshType().decode() for key in self.private_keys.values()),
+                           'generated': ", ".join(generated) or "none",
+                           'pending': ", ".join(missing) or "none",
+                           'load_ms': (time.perf_counter() - start) * 1000}
+        return self.load_stats
+
+    def _add(self, key):
+        # Only called on the reactor thread, SSHFactory iterates the dicts there for every connection
+        key_type = key.sshType()
+        self.private_keys[key_type] = key
+        self.public_keys[key_type] = key.public()
+
+    def _generate_missing(self, key_types):
+        for key_type in key_types:
+            try:
+                self.reactor.callFromThread(self._add, self._generate(key_type, self.paths[key_type]))
+            except Exception as e:
+                print("[-] Unable to generate {} host key: {}".format(key_type, e), file=sys.stderr)
+                raise
+
+    def _generate(self, key_type, path):
+        """
+        Generates a key and saves it (private key readable only by the owner)
+        """
+        key = keys.Key(GENERATORS[key_type](self.rsa_key_size))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        tmp = path + ".tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key.toString('openssh'))
+        with open(path + ".pub", 'wb') as f:
+            f.write(key.public().toString('openssh') + b"\n")
+        os.replace(tmp, path)
+
+        KeyManager._cache[path] = (os.stat(path).st_mtime_ns, key)
+        return key
+
+    @classmethod
+    def _read(cls, path):
+        """
+        Returns the private key at path (parsed only once unless the file changes) or None if it doesn't exist
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = cls._cache.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, keys.Key.fromFile(path))
+            cls._cache[path] = cached
+        return cached[1]
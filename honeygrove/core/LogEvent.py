@@ -0,0 +1,50 @@
+from json import dumps
+
+
+class LogEvent:
+    """
+    A single ECS event.
+    The event is serialized at most once and the resulting JSON string is shared
+    by all log outputs. The constant `service` part is passed in pre-encoded.
+    The encoding is identical to `json.dumps` of the equivalent dict.
+    """
+
+    __slots__ = ('timestamp', 'service', 'category', 'action',
+                 'source', 'destination', 'honeygrove', '_json')
+
+    def __init__(self, timestamp, service, category, action, source=None, destination=None, honeygrove=None):
+        """
+        :param timestamp: formatted timestamp of the event
+        :param service: JSON encoded ECS service dict
+        :param category: ECS event category
+        :param action: ECS event action
+        :param source: (optional) ECS source address dict
+        :param destination: (optional) ECS destination address dict
+        :param honeygrove: (optional) honeygrove specific event details
+        """
+        self.timestamp = timestamp
+        self.service = service
+        self.category = category
+        self.action = action
+        self.source = source
+        self.destination = destination
+        self.honeygrove = honeygrove
+        self._json = None
+
+    def to_json(self):
+        """
+        Returns the event as JSON string
+        """
+        if self._json is None:
+            parts = ['{"@timestamp": ', dumps(self.timestamp),
+                     ', "service": ', self.service,
+                     ', "event": {"category": ', dumps(self.category), ', "action": ', dumps(self.action), '}']
+            if self.source is not None:
+                parts += [', "source": ', dumps(self.source)]
+            if self.destination is not None:
+                parts += [', "destination": ', dumps(self.destination)]
+            if self.honeygrove is not None:
+                parts += [', "honeygrove": ', dumps(self.honeygrove)]
+            parts.append('}')
+            self._json = ''.join(parts)
+        return self._json
@@ -0,0 +1,549 @@
+from honeygrove.config import Config
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import gzip
+import json
+import os
+import shutil
+import socket
+import sys
+import threading
+import time
+
+if Config.general.use_broker:
+    from honeygrove.broker.BrokerEndpoint import BrokerEndpoint
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Kinds of messages a sink can subscribe to
+STATUS = 'status'  # administrative messages (plain text)
+ALERT = 'alert'  # attack related messages (plain text or JSON, see `Config.general.output_json`)
+EVENT = 'event'  # every ECS event as JSON
+
+DROP_OLDEST = 'oldest'
+DROP_NEWEST = 'newest'
+
+
+class LogSink:
+    """
+    Base class for log outputs.
+    Every sink has its own bounded in-memory queue that is filled by the caller and
+    written by a background thread in batches, either when `flush_size` messages
+    are queued or when `flush_interval` seconds have passed since the last write.
+    So a slow output never blocks the caller, it only drops messages.
+    """
+
+    def __init__(self, name, kinds=(STATUS, ALERT), buffer_size=100000, flush_size=512, flush_interval=1.0,
+                 drop_policy=DROP_OLDEST):
+        """
+        :param name: name of the sink
+        :param kinds: the kinds of messages this sink receives
+        :param buffer_size: maximum number of queued messages
+        :param flush_size: number of queued messages that triggers a write
+        :param flush_interval: maximum time in seconds a message stays in the queue
+        :param drop_policy: which messages to drop if the queue is full ("oldest" or "newest")
+        """
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError("Unknown drop policy: {}".format(drop_policy))
+        self.name = name
+        self.kinds = frozenset(kinds)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+
+        # Metrics
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+
+        self._buffer = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        # Serializes writes of the background thread and explicit flushes
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._stop = False
+
+    def put(self, message):
+        """
+        Queue a message, never blocks on I/O
+        :param message: the message (a single line without line break)
+        """
+        with self._cond:
+            closed = self._stop
+            if not closed:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.dropped += 1
+                    if self.drop_policy == DROP_NEWEST:
+                        return
+                self._buffer.append(message)
+                if self._thread is None:
+                    self._start()
+                elif len(self._buffer) >= self.flush_size:
+                    self._cond.notify()
+
+        # Late messages (e.g. during shutdown) are written synchronously,
+        # resources opened for them are released again
+        if closed:
+            with self._write_lock:
+                self._write_batch([message])
+                self._close()
+
+    def flush(self):
+        """
+        Synchronously write everything that is currently queued
+        """
+        with self._write_lock:
+            with self._cond:
+                batch = list(self._buffer)
+                self._buffer.clear()
+            if batch:
+                self._write_batch(batch)
+
+    def close(self):
+        """
+        Stop the writer thread, write all remaining messages and release resources
+        """
+        with self._cond:
+            self._stop = True
+            thread = self._thread
+            self._cond.notify()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.flush()
+        with self._write_lock:
+            self._close()
+
+    def stats(self):
+        """
+        Returns the metrics of this sink
+        """
+        return {'queued': len(self._buffer), 'written': self.written, 'dropped': self.dropped,
+                'batches': self.batches, 'errors': self.errors}
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="LogSink-" + self.name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            deadline = time.monotonic() + self.flush_interval
+            with self._cond:
+                while not self._stop and len(self._buffer) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                stop = self._stop
+            self.flush()
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        try:
+            self._write(batch)
+        except Exception as e:
+            self.errors += 1
+            self.dropped += len(batch)
+            print("[-] Log output {} failed: {}".format(self.name, e), file=sys.stderr)
+        else:
+            self.batches += 1
+            self.written += len(batch)
+
+    def _write(self, batch):
+        """
+        Write a batch of messages. Always called with the write lock held.
+        Exceptions are counted and the batch is dropped.
+        :param batch: list of messages
+        """
+        raise NotImplementedError
+
+    def _close(self):
+        """
+        Release resources held by the sink
+        """
+        pass
+
+
+class FileSink(LogSink):
+    """
+    Appends messages to a single, long-lived file handle.
+    """
+
+    def __init__(self, path, fsync="never", fsync_interval=5.0, name="file", **kwargs):
+        """
+        :param path: the logfile
+        :param fsync: "never" (leave it to the OS), "batch" (after every write)
+                      or "interval" (at most every `fsync_interval` seconds)
+        :param fsync_interval: see `fsync`
+        """
+        super(FileSink, self).__init__(name, **kwargs)
+        if fsync not in ("never", "batch", "interval"):
+            raise ValueError("Unknown fsync policy: {}".format(fsync))
+        self.path = str(path)
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+
+        self._fp = None
+        self._last_fsync = time.monotonic()
+
+    def _write(self, batch):
+        if self._fp is None:
+            self._fp = open(self.path, 'a')
+        self._fp.write('\n'.join(batch) + '\n')
+        self._fp.flush()
+
+        if self.fsync == "batch" or \
+                (self.fsync == "interval" and time.monotonic() - self._last_fsync >= self.fsync_interval):
+            os.fsync(self._fp.fileno())
+            self._last_fsync = time.monotonic()
+
+    def _close(self):
+        if self._fp is not None:
+            if self.fsync != "never":
+                os.fsync(self._fp.fileno())
+            self._fp.close()
+            self._fp = None
+
+
+class RotatingFileSink(FileSink):
+    """
+    FileSink that starts a new logfile when the current one exceeds a size or age.
+    Rotated segments are compressed by a separate thread, only the newest `retention`
+    segments are kept. An index file (`<logfile>.index`, JSON) lists all segments
+    with the timestamps of their first and last write, so tools can find the
+    segments of a time range without decompressing them.
+    """
+
+    def __init__(self, path, max_size=None, interval=None, compression="gzip", retention=None,
+                 clock=None, **kwargs):
+        """
+        :param path: the logfile
+        :param max_size: rotate when the logfile exceeds this size in bytes (None = never)
+        :param interval: rotate after this many seconds (None = never)
+        :param compression: "gzip", "zstd" or None
+        :param retention: maximum number of rotated segments to keep (None = all)
+        :param clock: returns the current time as formatted timestamp (for the index)
+        """
+        super(RotatingFileSink, self).__init__(path, **kwargs)
+        if compression not in ("gzip", "zstd", None):
+            raise ValueError("Unknown compression: {}".format(compression))
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        self.max_size = max_size
+        self.interval = interval
+        self.compression = compression
+        self.retention = retention
+        self.index_path = self.path + ".index"
+
+        self._clock = clock or (lambda: datetime.now().isoformat())
+        # Started with the first rotation (again after close, for late messages)
+        self._compressor = None
+        self._index_lock = threading.Lock()
+        self._index = self._load_index()
+
+        self._size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self._opened = time.monotonic()
+        self._first = self._clock() if self._size else None
+        self._last = self._first
+
+    def rotate(self):
+        """
+        Closes the current logfile and moves it into a new segment
+        """
+        with self._write_lock:
+            self._rotate()
+
+    def segments(self):
+        """
+        Returns the index: a list of {"file", "first", "last", "size"} dicts, oldest first
+        """
+        with self._index_lock:
+            return [dict(entry) for entry in self._index]
+
+    def _write(self, batch):
+        if self.interval is not None and time.monotonic() - self._opened >= self.interval:
+            self._rotate()
+
+        super(RotatingFileSink, self)._write(batch)
+
+        self._last = self._clock()
+        if self._first is None:
+            self._first = self._last
+        self._size = self._fp.tell()
+        if self.max_size is not None and self._size >= self.max_size:
+            self._rotate()
+
+    def _rotate(self):
+        self._opened = time.monotonic()
+        if not self._size:
+            return
+        FileSink._close(self)
+
+        base, ext = os.path.splitext(self.path)
+        name = "{}-{}{}".format(base, datetime.now().strftime('%Y%m%dT%H%M%S'), ext)
+        i = 1
+        while os.path.exists(name) or os.path.exists(name + ".gz") or os.path.exists(name + ".zst"):
+            name = "{}-{}-{}{}".format(base, datetime.now().strftime('%Y%m%dT%H%M%S'), i, ext)
+            i += 1
+        os.rename(self.path, name)
+
+        entry = {'file': os.path.basename(name), 'first': self._first, 'last': self._last, 'size': self._size}
+        with self._index_lock:
+            self._index.append(entry)
+            expired = self._index[:-self.retention] if self.retention else []
+            if expired:
+                del self._index[:-self.retention]
+            self._save_index()
+
+        self._size = 0
+        self._first = None
+        self._last = None
+
+        for old in expired:
+            try:
+                os.remove(os.path.join(os.path.dirname(self.path), old['file']))
+            except FileNotFoundError:
+                pass
+        if self.compression:
+            if self._compressor is None:
+                self._compressor = ThreadPoolExecutor(max_workers=1)
+            self._compressor.submit(self._compress, entry)
+
+    def _compress(self, entry):
+        directory = os.path.dirname(self.path)
+        source = os.path.join(directory, entry['file'])
+        target = source + (".gz" if self.compression == "gzip" else ".zst")
+        try:
+            with open(source, 'rb') as src:
+                if self.compression == "gzip":
+                    with gzip.open(target, 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                else:
+                    with open(target, 'wb') as dst:
+                        zstandard.ZstdCompressor().copy_stream(src, dst)
+        except Exception as e:
+            print("[-] Unable to compress logfile {}: {}".format(source, e), file=sys.stderr)
+            return
+
+        with self._index_lock:
+            if entry not in self._index:
+                # Expired while it was compressed
+                os.remove(target)
+            else:
+                entry['file'] = os.path.basename(target)
+                self._save_index()
+        try:
+            os.remove(source)
+        except FileNotFoundError:
+            # Expired and deleted while it was compressed
+            pass
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            return []
+        except ValueError:
+            print("[-] Ignoring damaged logfile index {}".format(self.index_path), file=sys.stderr)
+            return []
+
+    def _save_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, 'w') as fp:
+            json.dump(self._index, fp, indent=1)
+        os.replace(tmp, self.index_path)
+
+    def _close(self):
+        super(RotatingFileSink, self)._close()
+        if self._compressor is not None:
+            self._compressor.shutdown(wait=True)
+            self._compressor = None
+
+
+class StdoutSink(LogSink):
+    """
+    Prints messages to stdout.
+    """
+
+    def __init__(self, name="stdout", **kwargs):
+        super(StdoutSink, self).__init__(name, **kwargs)
+
+    def _write(self, batch):
+        sys.stdout.write('\n'.join(batch) + '\n')
+        sys.stdout.flush()
+
+
+class BrokerSink(LogSink):
+    """
+    Publishes ECS events to the "logs" topic of the broker endpoint.
+    Every batch is sent as a single vector message. While no peer is connected,
+    events are appended to a spool file that is replayed once the connection
+    is back, so the broker API is only ever used by the writer thread.
+    """
+
+    def __init__(self, spool=None, spool_max_size=None, endpoint=None, name="broker", kinds=(EVENT,), **kwargs):
+        """
+        :param spool: path of the spool file (None = drop events while disconnected)
+        :param spool_max_size: maximum size of the spool file in bytes (None = unlimited)
+        :param endpoint: the endpoint to publish with (default: BrokerEndpoint)
+        """
+        super(BrokerSink, self).__init__(name, kinds=kinds, **kwargs)
+        self.spool = str(spool) if spool is not None else None
+        self.spool_max_size = spool_max_size
+        self.endpoint = endpoint if endpoint is not None else BrokerEndpoint
+        self.spooled = 0
+
+        self._spool_fp = None
+        self._spool_size = 0
+        # Bytes of the spool file that were replayed already, so a failed replay continues there
+        self._replay_offset = 0
+        if self.spool is not None and os.path.exists(self.spool):
+            # Left over from a previous run
+            self._spool_size = os.path.getsize(self.spool)
+
+    def flush(self):
+        super(BrokerSink, self).flush()
+        # Also called periodically by the writer thread, so the spool is replayed without new events
+        if self._spool_size and self.endpoint.isConnected():
+            with self._write_lock:
+                try:
+                    self._replay()
+                except Exception as e:
+                    self.errors += 1
+                    print("[-] Log output {} failed to replay spool: {}".format(self.name, e), file=sys.stderr)
+
+    def stats(self):
+        stats = super(BrokerSink, self).stats()
+        stats['spooled'] = self.spooled
+        return stats
+
+    def _write(self, batch):
+        if not self.endpoint.isConnected():
+            self._write_spool(batch)
+            return
+        if self._spool_size:
+            # Keep the order: older events first
+            self._replay()
+        self.endpoint.sendLogBatch(batch)
+
+    def _write_spool(self, batch):
+        if self.spool is None:
+            raise ConnectionError("not connected")
+        data = ('\n'.join(batch) + '\n').encode()
+        if self.spool_max_size is not None and self._spool_size + len(data) > self.spool_max_size:
+            raise ConnectionError("not connected and spool file is full")
+        if self._spool_fp is None:
+            os.makedirs(os.path.dirname(self.spool), exist_ok=True)
+            self._spool_fp = open(self.spool, 'ab')
+        self._spool_fp.write(data)
+        self._spool_fp.flush()
+        self._spool_size += len(data)
+        self.spooled += len(batch)
+
+    def _replay(self):
+        if self._spool_fp is not None:
+            self._spool_fp.close()
+            self._spool_fp = None
+
+        with open(self.spool, 'rb') as fp:
+            fp.seek(self._replay_offset)
+            batch = []
+            size = 0
+            for line in fp:
+                batch.append(line.decode().rstrip('\n'))
+                size += len(line)
+                if len(batch) >= self.flush_size:
+                    self.endpoint.sendLogBatch(batch)
+                    self._replay_offset += size
+                    batch = []
+                    size = 0
+            if batch:
+                self.endpoint.sendLogBatch(batch)
+        os.remove(self.spool)
+        self._spool_size = 0
+        self._replay_offset = 0
+
+    def _close(self):
+        if self._spool_fp is not None:
+            self._spool_fp.close()
+            self._spool_fp = None
+
+
+class SyslogSink(LogSink):
+    """
+    Sends messages as RFC 5424 syslog datagrams via UDP.
+    """
+
+    def __init__(self, address, facility=16, severity=6, appname="honeygrove", name="syslog", kinds=(EVENT,),
+                 **kwargs):
+        """
+        :param address: (host, port) of the syslog collector
+        :param facility: syslog facility (default: local0)
+        :param severity: syslog severity (default: informational)
+        :param appname: APP-NAME of the syslog messages
+        """
+        super(SyslogSink, self).__init__(name, kinds=kinds, **kwargs)
+        self.address = tuple(address)
+        self._header = "<{}>1 - {} {} {} - - ".format(facility * 8 + severity, socket.gethostname(),
+                                                      appname, os.getpid()).encode()
+        self._sock = None
+
+    def _write(self, batch):
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_INET6 if ':' in self.address[0] else socket.AF_INET,
+                                       socket.SOCK_DGRAM)
+        for message in batch:
+            self._sock.sendto(self._header + message.encode('utf-8', 'replace'), self.address)
+
+    def _close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class UnixSocketSink(LogSink):
+    """
+    Sends messages to a local collector via a Unix domain socket, either as
+    newline-delimited stream or one datagram per message.
+    The connection is (re-)established on demand, messages are dropped while
+    the collector is unavailable.
+    """
+
+    def __init__(self, path, socket_type="stream", name="unix", kinds=(EVENT,), **kwargs):
+        """
+        :param path: path of the socket
+        :param socket_type: "stream" or "datagram"
+        """
+        super(UnixSocketSink, self).__init__(name, kinds=kinds, **kwargs)
+        if socket_type not in ("stream", "datagram"):
+            raise ValueError("Unknown socket type: {}".format(socket_type))
+        self.path = str(path)
+        self.socket_type = socket_type
+        self._sock = None
+
+    def _write(self, batch):
+        try:
+            if self._sock is None:
+                sock_type = socket.SOCK_STREAM if self.socket_type == "stream" else socket.SOCK_DGRAM
+                self._sock = socket.socket(socket.AF_UNIX, sock_type)
+                self._sock.connect(self.path)
+
+            if self.socket_type == "stream":
+                self._sock.sendall(('\n'.join(batch) + '\n').encode('utf-8', 'replace'))
+            else:
+                for message in batch:
+                    self._sock.send(message.encode('utf-8', 'replace'))
+        except OSError:
+            self._close()
+            raise
+
+    def _close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
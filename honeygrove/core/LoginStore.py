@@ -0,0 +1,156 @@
+from twisted.internet import reactor as default_reactor
+
+from collections import OrderedDict
+import json
+import os
+import sqlite3
+import sys
+import time
+
+
+class LoginStore:
+    """
+    Last login times of the users of a service, persisted in SQLite.
+    All entries are kept in memory, changes are written behind in batches. At most
+    max_entries users are kept, the ones that logged in least recently are evicted.
+    """
+
+    def __init__(self, path, max_entries=10000, flush_interval=5, reactor=default_reactor):
+        """
+        :param path: the SQLite database (created if it doesn't exist)
+        :param max_entries: maximum number of users
+        :param flush_interval: seconds changes are collected before they are written
+        :param reactor: the reactor (for tests)
+        """
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.reactor = reactor
+
+        # Metrics
+        self.evicted = 0
+        self.flushes = 0
+        self.failures = 0
+
+        self._entries = OrderedDict()
+        # Usernames changed since the last flush with their position in the order of recency,
+        # None for evicted ones
+        self._changed = {}
+        self._seq = 0
+        self._flush_call = None
+        self._db = None
+
+    def load(self, legacy_path=None):
+        """
+        Opens the database and loads the entries
+        :param legacy_path: (optional) JSON file of former versions, imported if the database is new
+        :return: dict with the number of entries, the number of imported entries and the duration in ms
+        """
+        start = time.perf_counter()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # The connection is opened before the reactor runs and closed at exit
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        new = not self._db.execute("SELECT name FROM sqlite_master WHERE name = 'logins'").fetchone()
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS logins "
+                             "(username TEXT PRIMARY KEY, last_login TEXT NOT NULL, seq INTEGER NOT NULL)")
+
+        imported = 0
+        if new and legacy_path and os.path.exists(str(legacy_path)):
+            try:
+                with open(str(legacy_path)) as fp:
+                    legacy = json.load(fp)
+                for username, last_login in legacy.items():
+                    self.put(username, last_login)
+                imported = len(legacy)
+            except (OSError, ValueError, AttributeError) as e:
+                print("Failed to import last logins from {}: {}".format(legacy_path, e), file=sys.stderr)
+        else:
+            self._entries = OrderedDict(self._db.execute("SELECT username, last_login FROM logins ORDER BY seq"))
+            self._seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM logins").fetchone()[0]
+            while len(self._entries) > self.max_entries:
+                self._evict()
+        self.flush()
+        return {'entries': len(self._entries), 'imported': imported, 'load_ms': (time.perf_counter() - start) * 1000}
+
+    def get(self, username):
+        """
+        Returns the last login of a user or None
+        """
+        return self._entries.get(username)
+
+    def put(self, username, last_login):
+        """
+        Sets the last login of a user, the change is written with the next flush
+        """
+        self._entries[username] = last_login
+        self._entries.move_to_end(username)
+        self._seq += 1
+        self._changed[username] = self._seq
+        if len(self._entries) > self.max_entries:
+            self._evict()
+        if self._flush_call is None and self._db is not None:
+            self._flush_call = self.reactor.callLater(self.flush_interval, self.flush)
+
+    def flush(self):
+        """
+        Writes the changes since the last flush in one transaction, they are kept and
+        written again later if that fails
+        """
+        if self._flush_call is not None:
+            if self._flush_call.active():
+                self._flush_call.cancel()
+            self._flush_call = None
+        if not self._changed or self._db is None:
+            return
+
+        # The position is stored, so the order of recency survives a restart
+        rows = []
+        deletes = []
+        for username, seq in self._changed.items():
+            if seq is None:
+                deletes.append((username,))
+            else:
+                rows.append((username, self._entries[username], seq))
+        try:
+            with self._db:
+                self._db.executemany("DELETE FROM logins WHERE username = ?", deletes)
+                self._db.executemany("INSERT OR REPLACE INTO logins (username, last_login, seq) VALUES (?, ?, ?)",
+                                     rows)
+        except sqlite3.Error as e:
+            self.failures += 1
+            print("Failed to write last logins to {}, retrying in {} s: {}".format(self.path, self.flush_interval, e),
+                  file=sys.stderr)
+            self._flush_call = self.reactor.callLater(self.flush_interval, self.flush)
+            return
+        self._changed.clear()
+        self.flushes += 1
+
+    def close(self):
+        """
+        Writes the remaining changes and closes the database
+        """
+        self.flush()
+        if self._flush_call is not None:
+            self._flush_call.cancel()
+            self._flush_call = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self):
+        """
+        Returns the metrics
+        """
+        return {'entries': len(self._entries), 'pending': len(self._changed), 'evicted': self.evicted,
+                'flushes': self.flushes, 'failures': self.failures}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self):
+        username, _ = self._entries.popitem(last=False)
+        self._changed[username] = None
+        self.evicted += 1
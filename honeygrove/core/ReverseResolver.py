@@ -0,0 +1,102 @@
+from honeygrove.core.Cache import LRUCache
+
+from concurrent.futures import ThreadPoolExecutor
+from socket import getfqdn
+import threading
+
+
+def resolve_ptr(ip):
+    """
+    Blocking PTR lookup
+    :param ip: the address to be resolved
+    :return: the hostname or None
+    """
+    name = getfqdn(ip)
+    return name if name != ip else None
+
+
+class ReverseResolver:
+    """
+    Non-blocking reverse DNS lookups.
+    Names are served from a bounded cache, unknown addresses are resolved by a small
+    thread pool in the background. Until the lookup finished, no name is returned
+    so the caller never waits for DNS. Failed lookups are cached, too. If too many
+    lookups are pending (e.g. during a scan from many addresses), new addresses are
+    not resolved.
+    """
+
+    def __init__(self, resolve=resolve_ptr, cache_size=10000, ttl=3600, negative_ttl=300, workers=4,
+                 max_pending=1000):
+        """
+        :param resolve: blocking function mapping an address to a hostname or None
+        :param cache_size: maximum number of cached addresses
+        :param ttl: seconds to cache a resolved name
+        :param negative_ttl: seconds to cache a failed lookup
+        :param workers: maximum number of concurrent lookups
+        :param max_pending: maximum number of running and queued lookups
+        """
+        self.cache = LRUCache(cache_size, ttl)
+        self.negative_ttl = negative_ttl
+
+        self._resolve = resolve
+        self._workers = workers
+        self.max_pending = max_pending
+        # Metrics
+        self.dropped = 0
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def lookup(self, ip):
+        """
+        Returns the hostname of ip if it is known already and
+        schedules a background lookup otherwise
+        :param ip: the address to be resolved
+        :return: the hostname or None
+        """
+        # Cached entries are (hostname, ) so that failed lookups can be cached as (None, )
+        entry = self.cache.get(ip)
+        if entry is not None:
+            return entry[0]
+
+        with self._lock:
+            if ip in self._pending:
+                return None
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return None
+            self._pending.add(ip)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers)
+            self._executor.submit(self._lookup, ip)
+        return None
+
+    def _lookup(self, ip):
+        try:
+            name = self._resolve(ip)
+        except Exception:
+            name = None
+
+        if name:
+            self.cache.put(ip, (name,))
+        else:
+            self.cache.put(ip, (None,), self.negative_ttl)
+
+        with self._lock:
+            self._pending.discard(ip)
+
+    def stats(self):
+        """
+        Returns the metrics
+        """
+        return {'cached': len(self.cache), 'pending': len(self._pending), 'dropped': self.dropped,
+                'hits': self.cache.hits, 'misses': self.cache.misses}
+
+    def close(self):
+        """
+        Stops the background lookups (pending ones are abandoned)
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
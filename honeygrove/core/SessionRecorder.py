@@ -0,0 +1,273 @@
+"""
+Compact binary recordings of terminal sessions.
+
+A recording is a header followed by blocks of frames:
+
+    header   magic, version, compression (0: none, 1: zstd), length of the metadata,
+             metadata (JSON: terminal size, start time, title)
+    blocks   length (varint) and payload, the payload is zstd compressed if set in the header
+    frames   (in the payloads) milliseconds since the previous frame (varint), kind (o: output,
+             i: input, r: resize to "<width>x<height>"), length of the data (varint), data
+
+Frames are collected in memory and appended as a block when enough data has accumulated,
+some time has passed (checked with the next frame, or by a timer if a reactor is given)
+or the session ends, so sessions don't hold open files.
+
+Usage: python3 -m honeygrove.core.SessionRecorder <recording> [<file.cast>]
+       (exports a recording to asciicast v2)
+"""
+import codecs
+import json
+import os
+import struct
+import sys
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b'HGCAST'
+VERSION = 1
+HEADER = struct.Struct('<6sBBI')
+COMPRESSION_NONE = 0
+COMPRESSION_ZSTD = 1
+
+OUTPUT = b'o'
+INPUT = b'i'
+RESIZE = b'r'
+
+# Varints of small numbers (most time deltas and lengths), so they aren't encoded again and again
+_SMALL_VARINTS = [bytes((i,)) for i in range(128)]
+
+# Blocks are compressed independently, so one compressor (and its memory) is shared by all recordings
+_compressor = None
+
+
+def _varint(n):
+    if n < 128:
+        return _SMALL_VARINTS[n]
+    out = bytearray()
+    while n >= 128:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _read_varint(data, pos):
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 128:
+            return n, pos
+        shift += 7
+
+
+class SessionRecorder:
+    """
+    Records the terminal input and output of a session
+    """
+
+    def __init__(self, path, width=80, height=24, title=None, compress=False, block_size=64 * 1024,
+                 flush_interval=10, max_size=None, clock=time.monotonic, reactor=None):
+        """
+        :param path: the recording file (created)
+        :param width: terminal width in columns
+        :param height: terminal height in rows
+        :param title: (optional) title of the recording
+        :param compress: compress the blocks with zstd (if the zstandard package is installed)
+        :param block_size: bytes of frames that are collected before they are written
+        :param flush_interval: seconds after which collected frames are written with the next frame
+        :param max_size: (optional) bytes of frames after which the recording stops
+        :param clock: time source (for tests)
+        :param reactor: (optional) reactor, frames of idle sessions are written flush_interval seconds
+                        after they were recorded instead of with the next frame
+        """
+        self.path = str(path)
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self.clock = clock
+        self.reactor = reactor
+        self._flush_call = None
+
+        # Metrics
+        self.size = 0
+        self.frames = 0
+        self.written = 0
+
+        self.compress = compress and zstandard is not None
+        if compress and zstandard is None:
+            print("Session recordings are not compressed: the zstandard package is not installed", file=sys.stderr)
+
+        metadata = {'width': width, 'height': height, 'timestamp': int(time.time())}
+        if title:
+            metadata['title'] = title
+        metadata = json.dumps(metadata).encode()
+        compression = COMPRESSION_ZSTD if self.compress else COMPRESSION_NONE
+
+        self._buffer = bytearray()
+        self._start = self._last = self._last_flush = clock()
+        self._last_ms = 0
+        self.closed = False
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'wb') as fp:
+                fp.write(HEADER.pack(MAGIC, VERSION, compression, len(metadata)))
+                fp.write(metadata)
+        except OSError as e:
+            self._failed(e)
+
+    def output(self, data):
+        """
+        Records output sent to the terminal
+        """
+        self._frame(OUTPUT, data)
+
+    def input(self, data):
+        """
+        Records input received from the terminal
+        """
+        self._frame(INPUT, data)
+
+    def resize(self, width, height):
+        """
+        Records a new terminal size
+        """
+        self._frame(RESIZE, '{}x{}'.format(width, height).encode())
+
+    def flush(self):
+        """
+        Appends the collected frames to the file
+        """
+        self._last_flush = self.clock()
+        if self._flush_call is not None:
+            if self._flush_call.active():
+                self._flush_call.cancel()
+            self._flush_call = None
+        if not self._buffer or self.closed:
+            return
+        payload = bytes(self._buffer)
+        self._buffer.clear()
+        if self.compress:
+            payload = self._compressor().compress(payload)
+        try:
+            with open(self.path, 'ab') as fp:
+                fp.write(_varint(len(payload)))
+                fp.write(payload)
+            self.written += len(payload)
+        except OSError as e:
+            self._failed(e)
+
+    def close(self):
+        """
+        Writes the remaining frames, nothing is recorded afterwards
+        """
+        self.flush()
+        self.closed = True
+
+    def _frame(self, kind, data):
+        if self.closed or not data:
+            return
+        if self.max_size is not None and self.size + len(data) > self.max_size:
+            self.close()
+            return
+
+        now = self.clock()
+        ms = int((now - self._start) * 1000)
+        buffer = self._buffer
+        buffer += _varint(ms - self._last_ms)
+        buffer += kind
+        buffer += _varint(len(data))
+        buffer += data
+        self._last_ms = ms
+        self.size += len(data)
+        self.frames += 1
+        if len(buffer) >= self.block_size or now - self._last_flush >= self.flush_interval:
+            self.flush()
+        elif self.reactor is not None and self._flush_call is None:
+            self._flush_call = self.reactor.callLater(self.flush_interval, self.flush)
+
+    def _compressor(self):
+        global _compressor
+        if _compressor is None:
+            _compressor = zstandard.ZstdCompressor(level=3)
+        return _compressor
+
+    def _failed(self, error):
+        print("Session recording {} stopped: {}".format(self.path, error), file=sys.stderr)
+        self._buffer.clear()
+        self.closed = True
+
+
+def read(path):
+    """
+    Reads a recording
+    :param path: the recording file
+    :return: metadata dict and list of (seconds since the start, kind, data)
+    """
+    with open(str(path), 'rb') as fp:
+        data = fp.read()
+    magic, version, compression, length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("{} is not a session recording".format(path))
+    if compression == COMPRESSION_ZSTD and zstandard is None:
+        raise ValueError("{} is compressed, reading it requires the zstandard package".format(path))
+    pos = HEADER.size + length
+    metadata = json.loads(data[HEADER.size:pos].decode())
+
+    frames = []
+    ms = 0
+    decompressor = zstandard.ZstdDecompressor() if compression == COMPRESSION_ZSTD else None
+    while pos < len(data):
+        size, pos = _read_varint(data, pos)
+        block = data[pos:pos + size]
+        pos += size
+        if decompressor:
+            block = decompressor.decompress(block)
+        i = 0
+        while i < len(block):
+            delta, i = _read_varint(block, i)
+            kind = block[i:i + 1].decode()
+            size, i = _read_varint(block, i + 1)
+            ms += delta
+            frames.append((ms / 1000, kind, block[i:i + size]))
+            i += size
+    return metadata, frames
+
+
+def to_asciicast(path, fp):
+    """
+    Exports a recording to asciicast v2 (https://docs.asciinema.org/manual/asciicast/v2/)
+    :param path: the recording file
+    :param fp: text file the asciicast is written to
+    """
+    metadata, frames = read(path)
+    header = {'version': 2, 'width': metadata['width'], 'height': metadata['height'],
+              'timestamp': metadata['timestamp']}
+    if 'title' in metadata:
+        header['title'] = metadata['title']
+    fp.write(json.dumps(header) + '\n')
+
+    # Characters can be split across frames
+    decoders = {'o': codecs.getincrementaldecoder('utf-8')('replace'),
+                'i': codecs.getincrementaldecoder('utf-8')('replace')}
+    for seconds, kind, data in frames:
+        text = decoders[kind].decode(data) if kind in decoders else data.decode()
+        if text:
+            fp.write(json.dumps([round(seconds, 3), kind, text]) + '\n')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        print(__doc__.strip().splitlines()[-2])
+        sys.exit(1)
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], 'w') as out:
+            to_asciicast(sys.argv[1], out)
+    else:
+        to_asciicast(sys.argv[1], sys.stdout)
@@ -0,0 +1,104 @@
+from collections import namedtuple
+import re
+
+# A simple command of a command line.
+# connector: the operator before the command (None, ";", "&", "&&", "||" or "|")
+# argv: the command name and its arguments, with quotes removed
+# redirects: list of (operator, target), target is None for duplications like "2>&1"
+Command = namedtuple('Command', 'connector argv redirects')
+
+# Operators that send the standard output to a file
+OUTPUT_REDIRECTS = frozenset(('>', '>>', '>|', '1>', '1>>', '1>|', '&>', '&>>'))
+
+_WORD_PART = r"""[^\s'"\\;&|<>\#]+|\\.|\\$|'[^']*'|"(?:[^"\\]+|\\.)*\""""
+# Whitespace is skipped in the same match, the most frequent tokens are tried first
+_TOKENS = re.compile(r"""\s*(?:
+    (?P<word>(?![0-9][<>])(?:{part})(?:{part}|\#+)*)
+  | (?P<control>&&|\|\||;|\||&(?!>))
+  | (?P<duplicate>[0-9]?[<>]&(?:[0-9]|-))
+  | (?P<redirect>&>>?|[0-9]?>>|[0-9]?>\|?|[0-9]?<)
+  | (?P<comment>\#.*)
+  | (?P<unmatched>['"])
+)""".format(part=_WORD_PART), re.VERBOSE | re.DOTALL)
+_QUOTED = re.compile(r"""'([^']*)'|"((?:[^"\\]|\\.)*)"|\\(.?)""", re.DOTALL)
+_DOUBLE_QUOTED_ESCAPE = re.compile(r'\\([$`"\\\n])')
+
+
+class ShellSyntaxError(Exception):
+    """
+    A command line can't be parsed, the message is the one of bash (without "-bash: ")
+    """
+
+
+def _unquote_part(match):
+    single, double, escaped = match.groups()
+    if single is not None:
+        return single
+    if double is not None:
+        return _DOUBLE_QUOTED_ESCAPE.sub(r'\1', double)
+    return escaped
+
+
+def tokenize(line):
+    """
+    Splits a command line into words and operators like a POSIX shell,
+    but without expansions (variables, globs, command substitution)
+    :param line: the command line
+    :return: list of (kind, text), kind is "word", "control", "redirect" or "duplicate"
+    """
+    tokens = []
+    for match in _TOKENS.finditer(line):
+        kind = match.lastgroup
+        if kind == 'comment':
+            break
+        text = match.group(kind)
+        if kind == 'word':
+            # Most words contain no quotes, they are used as they are
+            if '\\' in text or "'" in text or '"' in text:
+                text = _QUOTED.sub(_unquote_part, text)
+        elif kind == 'unmatched':
+            raise ShellSyntaxError("unexpected EOF while looking for matching `{}'".format(text))
+        tokens.append((kind, text))
+    return tokens
+
+
+def parse(line):
+    """
+    Parses a command line into simple commands.
+    Lists (;, &, &&, ||), pipelines (|) and redirections are supported, compound commands are not.
+    :param line: the command line
+    :return: list of Command
+    """
+    commands = []
+    connector = None
+    argv = []
+    redirects = []
+    redirect = None
+    for kind, text in tokenize(line):
+        if redirect is not None and kind != 'word':
+            raise ShellSyntaxError("syntax error near unexpected token `{}'".format(text))
+        if kind == 'word':
+            if redirect is None:
+                argv.append(text)
+            else:
+                redirects.append((redirect, text))
+                redirect = None
+        elif kind == 'redirect':
+            redirect = text
+        elif kind == 'duplicate':
+            redirects.append((text, None))
+        else:
+            if not argv and not redirects:
+                raise ShellSyntaxError("syntax error near unexpected token `{}'".format(text))
+            commands.append(Command(connector, argv, redirects))
+            connector = text
+            argv = []
+            redirects = []
+
+    if redirect is not None:
+        raise ShellSyntaxError("syntax error near unexpected token `newline'")
+    if argv or redirects:
+        commands.append(Command(connector, argv, redirects))
+    elif connector in ('&&', '||', '|'):
+        raise ShellSyntaxError("syntax error: unexpected end of file")
+    return commands
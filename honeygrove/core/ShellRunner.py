@@ -0,0 +1,162 @@
+from twisted.internet import defer, error, protocol, reactor as default_reactor
+
+from collections import deque
+import os
+import shutil
+import signal
+
+# Output is merged like on a terminal. The final working directory is reported on fd 3,
+# so `cd` works across commands.
+SCRIPT = 'exec 2>&1\nulimit -t {cpu_time} 2>/dev/null\n{command}\nstatus=$?\npwd >&3\nexit $status'
+
+
+class QueueFull(Exception):
+    """
+    Too many commands are waiting
+    """
+
+
+class _CommandProtocol(protocol.ProcessProtocol):
+    """
+    Passes the output of a command on and reports the final working directory (written to fd 3)
+    """
+
+    def __init__(self, runner, output, max_output, finished):
+        self.runner = runner
+        self.output = output
+        self.max_output = max_output
+        self.finished = finished
+        self.written = 0
+        self.cwd = b''
+        self.killed = None
+        self.timer = None
+
+    def childDataReceived(self, fd, data):
+        if fd == 3:
+            self.cwd += data
+            return
+        if self.killed:
+            return
+        data = data[:self.max_output - self.written]
+        self.written += len(data)
+        if data:
+            self.output(data)
+        if self.written >= self.max_output:
+            self.kill("output limit")
+
+    def kill(self, reason):
+        if self.killed is None:
+            self.killed = reason
+            self.runner.killed += 1
+            self.runner._kill(self.transport)
+
+    def processEnded(self, reason):
+        if self.timer is not None and self.timer.active():
+            self.timer.cancel()
+        code = reason.value.exitCode if isinstance(reason.value, (error.ProcessDone, error.ProcessTerminated)) else None
+        cwd = self.cwd.decode(errors='replace').strip() or None
+        self.finished.callback((code, cwd, self.killed))
+
+
+class ShellRunner:
+    """
+    Runs the commands of the real shell mode in child processes without blocking the reactor.
+    At most max_processes commands run at the same time, further commands wait in a queue.
+    Every command is limited in CPU time, wall-clock time and output, gets a minimal
+    environment and runs in its own session, so the whole process group can be killed.
+    """
+
+    def __init__(self, shell='/bin/sh', max_processes=4, max_queue=100, cpu_time=10, timeout=30,
+                 max_output=1024 * 1024, reactor=default_reactor):
+        """
+        :param shell: the shell that runs the commands (with -c)
+        :param max_processes: maximum number of commands running at the same time
+        :param max_queue: maximum number of waiting commands, more are rejected with QueueFull
+        :param cpu_time: CPU time limit of a command in seconds
+        :param timeout: wall-clock time limit of a command in seconds
+        :param max_output: output limit of a command in bytes
+        :param reactor: the reactor (for tests)
+        """
+        self.shell = shell
+        self.max_processes = max_processes
+        self.max_queue = max_queue
+        self.cpu_time = cpu_time
+        self.timeout = timeout
+        self.max_output = max_output
+        self.reactor = reactor
+
+        # Metrics
+        self.running = 0
+        self.peak_queued = 0
+        self.rejected = 0
+        self.killed = 0
+
+        self._queue = deque()
+        self._setsid = shutil.which('setsid')
+
+    def run(self, command, cwd, output):
+        """
+        Runs a command
+        :param command: the command line
+        :param cwd: the working directory
+        :param output: function(bytes) called with the output (stdout and stderr) as it arrives
+        :return: Deferred of (exit code (None if killed), final working directory, reason of a kill or None),
+                 fails with QueueFull if too many commands are waiting
+        """
+        if self.running >= self.max_processes and len(self._queue) >= self.max_queue:
+            self.rejected += 1
+            return defer.fail(QueueFull(command))
+
+        d = defer.Deferred()
+        self._queue.append((command, cwd, output, d))
+        self.peak_queued = max(self.peak_queued, len(self._queue))
+        self._next()
+        return d
+
+    def stats(self):
+        """
+        Returns the metrics, "queued" > 0 means that the runner is saturated
+        """
+        return {'running': self.running, 'queued': len(self._queue), 'peak_queued': self.peak_queued,
+                'rejected': self.rejected, 'killed': self.killed}
+
+    def _next(self):
+        while self._queue and self.running < self.max_processes:
+            command, cwd, output, d = self._queue.popleft()
+            self.running += 1
+            finished = defer.Deferred()
+            finished.addBoth(self._done)
+            finished.chainDeferred(d)
+            try:
+                self._spawn(command, cwd, output, finished)
+            except Exception as e:
+                finished.errback(e)
+
+    def _done(self, result):
+        self.running -= 1
+        self._next()
+        return result
+
+    def _spawn(self, command, cwd, output, finished):
+        args = [self.shell, '-c', SCRIPT.format(cpu_time=self.cpu_time, command=command)]
+        if self._setsid:
+            args.insert(0, self._setsid)
+        env = {'PATH': '/usr/local/bin:/usr/bin:/bin', 'HOME': cwd, 'TERM': 'xterm', 'LANG': 'C.UTF-8'}
+
+        process = _CommandProtocol(self, output, self.max_output, finished)
+        self.reactor.spawnProcess(process, args[0], args, env=env, path=cwd,
+                                  childFDs={0: 'w', 1: 'r', 2: 'r', 3: 'r'})
+        process.transport.closeStdin()
+        process.timer = self.reactor.callLater(self.timeout, process.kill, "timeout")
+
+    def _kill(self, transport):
+        """
+        Kills the process group of a command (or only the shell if setsid is not available)
+        """
+        try:
+            if self._setsid and transport.pid:
+                os.killpg(transport.pid, signal.SIGKILL)
+            else:
+                transport.signalProcess('KILL')
+        except (OSError, error.ProcessExitedAlready):
+            pass
@@ -0,0 +1,48 @@
+from twisted.internet import defer, reactor as default_reactor, task
+
+
+class Tarpit:
+    """
+    Delays responses without blocking the reactor.
+    A delayed response only holds back the connection it belongs to, so any number of
+    delays can run at the same time and other connections and services stay responsive.
+    """
+
+    def __init__(self, delay, reactor=default_reactor):
+        """
+        :param delay: the delay in seconds (0 or less: no delay)
+        :param reactor: the reactor (for tests)
+        """
+        self.delay = delay
+        self.reactor = reactor
+
+        # Metrics
+        self.pending = 0
+        self.peak_pending = 0
+        self.delayed = 0
+
+    def call(self, f, *args, **kwargs):
+        """
+        Calls a function after the delay
+        :param f: the function
+        :return: Deferred that fires with the result of f
+        """
+        if self.delay <= 0:
+            return defer.maybeDeferred(f, *args, **kwargs)
+
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        self.delayed += 1
+        d = task.deferLater(self.reactor, self.delay, f, *args, **kwargs)
+        d.addBoth(self._done)
+        return d
+
+    def stats(self):
+        """
+        Returns the metrics
+        """
+        return {'pending': self.pending, 'peak_pending': self.peak_pending, 'delayed': self.delayed}
+
+    def _done(self, result):
+        self.pending -= 1
+        return result
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+import math
+import time
+
+
+class TimestampFormatter:
+    """
+    Produces ISO 8601 timestamps (like `datetime.isoformat`) for the log.
+    The formatted date and time up to the second is cached, so only the
+    microseconds have to be rendered for events within the same second.
+    Timestamps are derived from a monotonic clock anchored to the wall clock,
+    so they don't go backwards between two realignments. If the wall clock was set
+    back by at most max_skew, timestamps keep their order until it caught up,
+    larger steps are followed.
+    """
+
+    def __init__(self, utc=True, clock=time.time, monotonic=time.monotonic, resync_interval=60.0, max_skew=1.0):
+        """
+        :param utc: whether to use UTC or local time
+        :param clock: wall clock in seconds since the epoch (for tests)
+        :param monotonic: monotonic clock in seconds (for tests)
+        :param resync_interval: seconds after which the anchor is realigned to the wall clock
+        :param max_skew: seconds the wall clock may be set back without timestamps going backwards
+        """
+        self.utc = utc
+        self.resync_interval = resync_interval
+        self.max_skew = max_skew
+
+        self._clock = clock
+        self._monotonic = monotonic
+        self._to_struct = time.gmtime if utc else time.localtime
+        self._offset = 0.0
+        self._next_sync = -math.inf
+        self._last = -math.inf
+        # (second, prefix, prefix without the decimal point) of the last rendered second.
+        # The instance is shared by threads, so it is replaced as a whole and read once.
+        self._rendered = (None, None, None)
+        # (fields, prefix) of the last formatted datetime
+        self._fields = (None, None)
+
+    def time(self):
+        """
+        Returns the current time in seconds since the epoch, not less than the previous
+        result unless the wall clock was set back by more than max_skew
+        """
+        mono = self._monotonic()
+        if mono >= self._next_sync:
+            self._sync(mono)
+        now = mono + self._offset
+        last = self._last
+        if last - self.max_skew <= now < last:
+            # The wall clock was set back a little, keep the order until it caught up
+            now = last
+        self._last = now
+        return now
+
+    def now(self):
+        """
+        Returns the current time as formatted timestamp
+        """
+        return self.format_epoch(self.time())
+
+    def datetime(self):
+        """
+        Returns the current time as naive `datetime` (see `utc`)
+        """
+        if self.utc:
+            return datetime(1970, 1, 1) + timedelta(seconds=self.time())
+        return datetime.fromtimestamp(self.time())
+
+    def format_epoch(self, t):
+        """
+        Formats seconds since the epoch, rounded to the nearest microsecond
+        :param t: seconds since the epoch
+        """
+        second, microsecond = divmod(int(t * 1e6 + 0.5), 1000000)
+        rendered = self._rendered
+        if second != rendered[0]:
+            rendered = self._render(second)
+        if microsecond:
+            return rendered[1] + '%06d' % microsecond
+        return rendered[2]
+
+    def _sync(self, mono):
+        self._offset = self._clock() - mono
+        self._next_sync = mono + self.resync_interval
+
+    def _render(self, second):
+        prefix_whole = time.strftime('%Y-%m-%dT%H:%M:%S', self._to_struct(second))
+        self._rendered = rendered = (second, prefix_whole + '.', prefix_whole)
+        return rendered
+
+    def format(self, intime):
+        """
+        Formats a `datetime`, equivalent to `intime.isoformat()`
+        :param intime: the datetime
+        """
+        if intime.tzinfo is not None:
+            return intime.isoformat()
+
+        fields = (intime.second, intime.minute, intime.hour, intime.day, intime.month, intime.year)
+        cached_fields, prefix = self._fields
+        if cached_fields != fields:
+            prefix = '%04d-%02d-%02dT%02d:%02d:%02d' % fields[::-1]
+            self._fields = (fields, prefix)
+
+        if intime.microsecond:
+            return '%s.%06d' % (prefix, intime.microsecond)
+        return prefix
@@ -1,60 +1,200 @@
 from honeygrove.config import Config
+from honeygrove.core.Aggregator import EventAggregator
+from honeygrove.core.Cache import LRUCache
+from honeygrove.core.LogEvent import LogEvent
+from honeygrove.core import LogSink
+from honeygrove.core.ReverseResolver import ReverseResolver
+from honeygrove.core.Timestamp import TimestampFormatter
 
-from datetime import datetime
+from twisted.internet import task
+
+import atexit
 from hashlib import sha256
 import json
-from socket import getfqdn
 
 if Config.general.use_broker:
     from honeygrove.broker import BrokerEndpoint
 if Config.general.use_geoip:
     from geoip2.errors import AddressNotFoundError
     import geoip2.database
+    from maxminddb import MODE_MMAP
 
 ECS_SERVICE = {'id': sha256(str(Config.general.id).encode('utf-8')).hexdigest(),
                'name': str(Config.general.id).lower(),
                'type': 'honeygrove',
                'version': '0.6.0'
                }
+# The service is the same for every event, so it is encoded only once
+ECS_SERVICE_JSON = json.dumps(ECS_SERVICE)
 
 if Config.general.use_geoip:
     try:
-        GEO_READER = geoip2.database.Reader(str(Config.folder.geo_ip))
+        # Memory-mapped, so the database is shared with the page cache instead of read into the heap
+        GEO_READER = geoip2.database.Reader(str(Config.folder.geo_ip), mode=MODE_MMAP)
     except FileNotFoundError:
         print("\nGeoIP database file not found: {}\n".format(str(Config.folder.geo_ip)))
         print("\nDisabling GeoIP support!\n")
         Config.general.use_geoip = False
 
+# Coordinates of recently seen addresses. The database does not change at runtime, so entries never expire.
+GEO_CACHE = LRUCache(Config.general.geoip_cache_size)
+
 PLACEHOLDER_STRING = '--'
 
+# Shared by all log functions, caches the formatted second of the last timestamp
+TIMESTAMPS = TimestampFormatter(utc=Config.general.use_utc)
+
+RESOLVER = ReverseResolver(cache_size=Config.reverse_dns.cache_size,
+                           ttl=Config.reverse_dns.ttl,
+                           negative_ttl=Config.reverse_dns.negative_ttl,
+                           workers=Config.reverse_dns.workers,
+                           max_pending=Config.reverse_dns.max_pending)
+
+# Repeated events, see `Config.logging.aggregate`
+if Config.logging.aggregate:
+    AGGREGATOR = EventAggregator(window=Config.logging.aggregate_window,
+                                 max_keys=Config.logging.aggregate_max_keys)
+    AGGREGATE_ACTIONS = frozenset(Config.logging.aggregate_actions)
+else:
+    AGGREGATOR = None
+    AGGREGATE_ACTIONS = frozenset()
+
+# Registered log outputs, see `register_sink`
+SINKS = ()
+
+
+def register_sink(sink: LogSink.LogSink):
+    """
+    Adds an output that receives all messages of the kinds it subscribed to
+
+    :param sink: the output
+    """
+
+    global SINKS
+    SINKS = SINKS + (sink,)
+    return sink
+
+
+def unregister_sink(sink: LogSink.LogSink):
+    """
+    Removes an output and closes it
+
+    :param sink: the output
+    """
+
+    global SINKS
+    SINKS = tuple(s for s in SINKS if s is not sink)
+    sink.close()
+
+
+def get_sink_stats():
+    """
+    Returns the metrics of all outputs by name
+    """
+
+    return dict((sink.name, sink.stats()) for sink in SINKS)
+
+
+def _register_default_sinks():
+    options = {'buffer_size': Config.logging.buffer_size,
+               'flush_size': Config.logging.flush_size,
+               'flush_interval': Config.logging.flush_interval,
+               'drop_policy': Config.logging.drop_policy}
+
+    file_kinds = [kind for kind, enabled in [(LogSink.STATUS, Config.logging.log_status),
+                                             (LogSink.ALERT, Config.logging.log_alerts)] if enabled]
+    if file_kinds:
+        options_file = dict(options, fsync=Config.logging.fsync, fsync_interval=Config.logging.fsync_interval,
+                            kinds=file_kinds)
+        if Config.logging.rotate_size is None and Config.logging.rotate_interval is None:
+            register_sink(LogSink.FileSink(Config.folder.log, **options_file))
+        else:
+            register_sink(LogSink.RotatingFileSink(Config.folder.log, max_size=Config.logging.rotate_size,
+                                                   interval=Config.logging.rotate_interval,
+                                                   compression=Config.logging.compression,
+                                                   retention=Config.logging.retention,
+                                                   clock=TIMESTAMPS.now, **options_file))
+
+    print_kinds = [kind for kind, enabled in [(LogSink.STATUS, Config.logging.print_status),
+                                              (LogSink.ALERT, Config.logging.print_alerts)] if enabled]
+    if print_kinds:
+        register_sink(LogSink.StdoutSink(kinds=print_kinds, **options))
+
+    if Config.general.use_broker:
+        register_sink(LogSink.BrokerSink(spool=Config.broker.spool, spool_max_size=Config.broker.spool_max_size,
+                                         **options))
+
+    if Config.logging.syslog:
+        register_sink(LogSink.SyslogSink(Config.logging.syslog_address, facility=Config.logging.syslog_facility,
+                                         **options))
+
+    if Config.logging.unix_socket:
+        register_sink(LogSink.UnixSocketSink(Config.logging.unix_socket_path,
+                                             socket_type=Config.logging.unix_socket_type, **options))
+
+
+_register_default_sinks()
+
+
+def _dispatch(kind, message):
+    for sink in SINKS:
+        if kind in sink.kinds:
+            sink.put(message)
+
 
 def _log_status(message):
-    if Config.logging.log_status:
-        write(message + '\n')
-    if Config.logging.print_status:
-        print(message)
+    _dispatch(LogSink.STATUS, message)
 
 
 def _log_alert(message):
-    if Config.logging.log_alerts:
-        write(message + '\n')
-    if Config.logging.print_alerts:
-        print(message)
+    _dispatch(LogSink.ALERT, message)
+
+
+def _log_event(ecs_event: LogEvent):
+    # Only serialize the event if someone is interested
+    for sink in SINKS:
+        if LogSink.EVENT in sink.kinds:
+            sink.put(ecs_event.to_json())
+
 
+def flush():
+    """
+    Write all buffered messages to all outputs
+    """
+
+    _expire_aggregates()
+    for sink in SINKS:
+        sink.flush()
 
-def write(message):
+
+def close():
     """
-    Simplify writing to logfile
-    :param message: the message to be written
+    Write all buffered messages and close all outputs
     """
 
-    with open(str(Config.folder.log), 'a') as fp:
-        fp.write(message)
+    _expire_aggregates(force=True)
+    for sink in SINKS:
+        sink.close()
+    RESOLVER.close()
+    if Config.general.use_broker:
+        BrokerEndpoint.BrokerEndpoint.file_forwarder.close()
+
+
+atexit.register(close)
 
 
 def get_reverse_hostname(ip: str):
-    name = getfqdn(ip)
-    return name if name != ip else None
+    """
+    Gets the hostname for ip without blocking. Unknown addresses are
+    resolved in the background, so None is returned until the lookup
+    finished (or if it failed).
+
+    :param ip: the address out of a log entry
+    """
+
+    if not Config.reverse_dns.enabled:
+        return None
+    return RESOLVER.lookup(ip)
 
 
 def get_ecs_address_dict(ip: str, port: int = None):
@@ -70,34 +210,149 @@ def get_ecs_address_dict(ip: str, port: int = None):
 def get_coordinates(ip: str):
     """
     Gets the Location Information for given IP Address
-    from Location Database. Returns False if location
-    lookup is disabled
+    from Location Database. Returns None if location
+    lookup is disabled or the address is unknown.
+    Results are cached, see `get_geoip_stats`.
 
     :param ip: the address out of a log entry
     """
 
     if Config.general.use_geoip:
-        try:
-            resp = GEO_READER.city(ip)
-        except AddressNotFoundError:
-            return None
-
-        lat = float(resp.location.latitude)
-        lon = float(resp.location.longitude)
-        return [lat, lon]
+        # Cached as (coordinates, ) so that unknown addresses can be cached as (None, )
+        entry = GEO_CACHE.get(ip)
+        if entry is None:
+            try:
+                resp = GEO_READER.city(ip)
+                entry = ((float(resp.location.latitude), float(resp.location.longitude)),)
+            except AddressNotFoundError:
+                entry = (None,)
+            GEO_CACHE.put(ip, entry)
+        return entry[0]
     else:
         return None
 
 
-def get_time():
-    if Config.general.use_utc:
-        return datetime.utcnow()
+def get_geoip_stats():
+    """
+    Returns the hit and miss counters of the GeoIP cache
+    """
+
+    return {'hits': GEO_CACHE.hits, 'misses': GEO_CACHE.misses, 'size': len(GEO_CACHE)}
+
+
+def _get_location(ip: str):
+    """
+    Formats the coordinates of ip once for all outputs
+
+    :param ip: the address out of a log entry
+    :return: latitude, longitude (or placeholders) and the ECS location string (or None)
+    """
+
+    coordinates = get_coordinates(ip)
+    if not coordinates:
+        return PLACEHOLDER_STRING, PLACEHOLDER_STRING, None
+    lat = '{:.4f}'.format(coordinates[0])
+    lon = '{:.4f}'.format(coordinates[1])
+    return lat, lon, lat + ',' + lon
+
+
+def _emit(ecs_event: LogEvent, text: str, *args):
+    """
+    Hands an event to all outputs. The event is serialized at most once,
+    the plain text message is only formatted if it is needed.
+
+    :param ecs_event: the event
+    :param text: format string of the plain text message
+    :param args: arguments of the plain text message
+    """
+
+    _log_event(ecs_event)
+
+    if Config.general.output_json:
+        message = ecs_event.to_json()
     else:
-        return datetime.now()
+        message = text.format(*args)
+    _log_alert(message)
+
+
+def _repeated(key, timestamp):
+    """
+    Checks if an event only has to be counted, see `Config.logging.aggregate`
+
+    :param key: (action, service, address, payload) of the event
+    :param timestamp: formatted timestamp of the event
+    """
+
+    return key[0] in AGGREGATE_ACTIONS and AGGREGATOR.repeated(key, timestamp)
+
+
+def _aggregate(key, ecs_event: LogEvent):
+    """
+    Counts identical events following the logged ecs_event
+
+    :param key: (action, service, address, payload) of the event
+    :param ecs_event: the event
+    """
+
+    if key[0] in AGGREGATE_ACTIONS:
+        for aggregate in AGGREGATOR.add(key, ecs_event, ecs_event.timestamp):
+            _emit_aggregate(aggregate)
+
+
+def _expire_aggregates(force=False):
+    """
+    Logs the summaries of all aggregation windows that ended
+
+    :param force: end all windows
+    """
+
+    if AGGREGATOR is not None:
+        for aggregate in AGGREGATOR.expire(force):
+            _emit_aggregate(aggregate)
+
+
+def start_aggregate_expiry(clock=None):
+    """
+    Logs the summaries of ended aggregation windows every `Config.logging.aggregate_window`
+    seconds, so they don't wait for further events or a heartbeat of the broker
+
+    :param clock: (optional) the reactor (for tests)
+    :return: the LoopingCall or None if aggregation is disabled
+    """
+
+    if AGGREGATOR is None:
+        return None
+    loop = task.LoopingCall(_expire_aggregates)
+    if clock is not None:
+        loop.clock = clock
+    loop.start(Config.logging.aggregate_window, now=False)
+    return loop
+
+
+def _emit_aggregate(aggregate):
+    """
+    Logs the summary of repeated events: the first event extended by count, first and last occurrence
+    """
+
+    event = aggregate.event
+    ecs_hg = dict(event.honeygrove)
+    ecs_hg['aggregate'] = {'count': aggregate.count, 'first_seen': aggregate.first_seen,
+                           'last_seen': aggregate.last_seen}
+    summary = LogEvent(aggregate.last_seen, ECS_SERVICE_JSON, event.category, event.action,
+                       event.source, event.destination, ecs_hg)
+
+    action, service, ip, payload = aggregate.key
+    _emit(summary, '{} [AGGREGATED] {}, {}, {}, {}, Count: {}, First: {}, Last: {}',
+          aggregate.last_seen, action, service, ip, payload, aggregate.count,
+          aggregate.first_seen, aggregate.last_seen)
+
+
+def get_time():
+    return TIMESTAMPS.datetime()
 
 
 def format_time(intime):
-    return intime.isoformat()
+    return TIMESTAMPS.format(intime)
 
 
 def dont(message: str):
@@ -116,7 +371,7 @@ def info(message: str):
     :param message: the message text
     """
 
-    timestamp = format_time(get_time())
+    timestamp = TIMESTAMPS.now()
     message = '{} [INFO] {}'.format(timestamp, message)
     _log_status(message)
 
@@ -128,7 +383,7 @@ def undefined(message: str):
     :param message: the message text
     """
 
-    timestamp = format_time(get_time())
+    timestamp = TIMESTAMPS.now()
     message = '{} [UNDEFINED] {}'.format(timestamp, message)
     _log_status(message)
 
@@ -140,7 +395,7 @@ def event(message: str):
     :param message: the message text
     """
 
-    timestamp = format_time(get_time())
+    timestamp = TIMESTAMPS.now()
     message = '{} [EVENT] {}'.format(timestamp, message)
     _log_status(message)
 
@@ -152,7 +407,7 @@ def connect(message: str):
     :param message: the message text
     """
 
-    timestamp = format_time(get_time())
+    timestamp = TIMESTAMPS.now()
     message = '{} [CONNECTED] {}'.format(timestamp, message)
     _log_status(message)
 
@@ -164,7 +419,7 @@ def disconnect(message: str):
     :param message: the message text
     """
 
-    timestamp = format_time(get_time())
+    timestamp = TIMESTAMPS.now()
     message = '{} [DISCONNECTED] {}'.format(timestamp, message)
     _log_status(message)
 
@@ -176,7 +431,7 @@ def err(message: str):
     :param message: the exception message
     """
 
-    timestamp = format_time(get_time())
+    timestamp = TIMESTAMPS.now()
     message = '{} [ERROR] {}'.format(timestamp, message)
     _log_status(message)
 
@@ -209,46 +464,29 @@ def login(service: str, local_port: int, remote_ip: str, remote_port: int,
     :param honeytoken: (optional) the honeytoken that matched the login attempt
     """
 
-    timestamp = format_time(get_time())
-    coordinates = get_coordinates(remote_ip)
+    timestamp = TIMESTAMPS.now()
+    lat, lon, location = _get_location(remote_ip)
 
     if not secret:
         secret = PLACEHOLDER_STRING
     if not honeytoken:
         honeytoken = PLACEHOLDER_STRING
 
-    ecs_event = {'category': 'alert', 'action': 'login'}
     ecs_hg_login = {'service': service, 'secret_type': secret_type, 'successful': successful,
                     'username': user, 'secret': secret}
     ecs_hg = {'login': ecs_hg_login}
 
-    values = {'@timestamp': timestamp,
-              'service': ECS_SERVICE,
-              'event': ecs_event,
-              # XXX: we don't know the source port currently..
-              'source': get_ecs_address_dict(remote_ip, port=remote_port),
-              'destination': get_ecs_address_dict(Config.general.address, local_port),
-              'honeygrove': ecs_hg}
-
+    # XXX: we don't know the source port currently..
+    source = get_ecs_address_dict(remote_ip, port=remote_port)
     # Append geo coordinates of source, if available
-    if coordinates:
-        values['source']['geo'] = {'location': '{:.4f},{:.4f}'.format(coordinates[0], coordinates[1])}
+    if location:
+        source['geo'] = {'location': location}
 
-    if Config.general.use_broker:
-        BrokerEndpoint.BrokerEndpoint.sendLogs(json.dumps(values))
+    ecs_event = LogEvent(timestamp, ECS_SERVICE_JSON, 'alert', 'login', source,
+                         get_ecs_address_dict(Config.general.address, local_port), ecs_hg)
 
-    lat = PLACEHOLDER_STRING
-    lon = PLACEHOLDER_STRING
-    if coordinates:
-        lat = '{:.4f}'.format(coordinates[0])
-        lon = '{:.4f}'.format(coordinates[1])
-
-    if Config.general.output_json:
-      message = json.dumps(values)
-    else:
-      message = ('{} [LOGIN] {}, {}:{}, Lat: {}, Lon: {}, {}, {}, {}, {}'
-               '').format(timestamp, service, remote_ip, remote_port, lat, lon, successful, user, secret, honeytoken)
-    _log_alert(message)
+    _emit(ecs_event, '{} [LOGIN] {}, {}:{}, Lat: {}, Lon: {}, {}, {}, {}, {}',
+          timestamp, service, remote_ip, remote_port, lat, lon, successful, user, secret, honeytoken)
 
 
 def request(service: str, remote_ip: str, remote_port: int, local_ip: str, local_port: int,
@@ -266,10 +504,12 @@ def request(service: str, remote_ip: str, remote_port: int, local_ip: str, local
     :param request_type: for HTTP if the request is a GET or a POST request
     """
 
-    timestamp = format_time(get_time())
-    coordinates = get_coordinates(remote_ip)
+    timestamp = TIMESTAMPS.now()
+    key = ('request', service, remote_ip, req)
+    if _repeated(key, timestamp):
+        return
+    lat, lon, location = _get_location(remote_ip)
 
-    ecs_event = {'category': 'warning', 'action': 'request'}
     ecs_hg_request = {'service': service, 'original': req}
     if user:
         ecs_hg_request['user'] = user
@@ -278,33 +518,17 @@ def request(service: str, remote_ip: str, remote_port: int, local_ip: str, local
 
     ecs_hg = {'request': ecs_hg_request}
 
-    values = {'@timestamp': timestamp,
-              'service': ECS_SERVICE,
-              'event': ecs_event,
-              'source': get_ecs_address_dict(remote_ip, remote_port),
-              'destination': get_ecs_address_dict(local_ip, local_port),
-              'honeygrove': ecs_hg}
-
+    source = get_ecs_address_dict(remote_ip, remote_port)
     # Append geo coordinates of source, if available
-    if coordinates:
-        values['source']['geo'] = {'location': '{:.4f},{:.4f}'.format(coordinates[0], coordinates[1])}
+    if location:
+        source['geo'] = {'location': location}
 
-    if Config.general.use_broker:
-        BrokerEndpoint.BrokerEndpoint.sendLogs(json.dumps(values))
+    ecs_event = LogEvent(timestamp, ECS_SERVICE_JSON, 'warning', 'request', source,
+                         get_ecs_address_dict(local_ip, local_port), ecs_hg)
 
-    lat = PLACEHOLDER_STRING
-    lon = PLACEHOLDER_STRING
-    if coordinates:
-        lat = '{:.4f}'.format(coordinates[0])
-        lon = '{:.4f}'.format(coordinates[1])
-
-    if Config.general.output_json:
-      message = json.dumps(values)
-    else:
-      message = ('{} [REQUEST] {}, {}:{}->{}:{}, Lat: {}, Lon: {}, {}, {}, {}'
-                 '').format(timestamp, service, remote_ip, remote_port, local_ip, local_port, lat, lon, req, user, request_type)
-
-    _log_alert(message)
+    _emit(ecs_event, '{} [REQUEST] {}, {}:{}->{}:{}, Lat: {}, Lon: {}, {}, {}, {}',
+          timestamp, service, remote_ip, remote_port, local_ip, local_port, lat, lon, req, user, request_type)
+    _aggregate(key, ecs_event)
 
 
 def response(service: str, remote_ip: str, remote_port: int, local_ip: str, local_port: int,
@@ -322,10 +546,12 @@ def response(service: str, remote_ip: str, remote_port: int, local_ip: str, loca
     :param status_code: the status code sent
     """
 
-    timestamp = format_time(get_time())
-    coordinates = get_coordinates(remote_ip)
+    timestamp = TIMESTAMPS.now()
+    key = ('response', service, remote_ip, resp)
+    if _repeated(key, timestamp):
+        return
+    lat, lon, location = _get_location(remote_ip)
 
-    ecs_event = {'category': 'warning', 'action': 'response'}
     ecs_hg_request = {'service': service, 'original': resp}
     if user:
         ecs_hg_request['user'] = user
@@ -334,36 +560,20 @@ def response(service: str, remote_ip: str, remote_port: int, local_ip: str, loca
 
     ecs_hg = {'response': ecs_hg_request}
 
-    values = {'@timestamp': timestamp,
-              'service': ECS_SERVICE,
-              'event': ecs_event,
-              'source': get_ecs_address_dict(local_ip, local_port),
-              'destination': get_ecs_address_dict(remote_ip, remote_port),
-              'honeygrove': ecs_hg}
+    destination = get_ecs_address_dict(remote_ip, remote_port)
+    # Append geo coordinates of destination, if available
+    if location:
+        destination['geo'] = {'location': location}
 
-    # Append geo coordinates of source, if available
-    if coordinates:
-        values['destination']['geo'] = {'location': '{:.4f},{:.4f}'.format(coordinates[0], coordinates[1])}
-
-    if Config.general.use_broker:
-        BrokerEndpoint.BrokerEndpoint.sendLogs(json.dumps(values))
+    ecs_event = LogEvent(timestamp, ECS_SERVICE_JSON, 'warning', 'response',
+                         get_ecs_address_dict(local_ip, local_port), destination, ecs_hg)
 
-    lat = PLACEHOLDER_STRING
-    lon = PLACEHOLDER_STRING
-    if coordinates:
-        lat = '{:.4f}'.format(coordinates[0])
-        lon = '{:.4f}'.format(coordinates[1])
+    _emit(ecs_event, '{} [RESPONSE] {}, {}:{}->{}:{}, Lat: {}, Lon: {}, {}, {}, {}',
+          timestamp, service, local_ip, local_port, remote_ip, remote_port, lat, lon, resp, user, status_code)
+    _aggregate(key, ecs_event)
 
-    if Config.general.output_json:
-      message = json.dumps(values)
-    else:
-      message = ('{} [RESPONSE] {}, {}:{}->{}:{}, Lat: {}, Lon: {}, {}, {}, {}'
-                 '').format(timestamp, service, local_ip, local_port, remote_ip, remote_port, lat, lon, resp, user, status_code)
 
-    _log_alert(message)
-
-
-def file(service: str, ip: str, file_name: str, file_path: str = None, user: str = None):
+def file(service: str, ip: str, file_name: str, file_path: str = None, user: str = None, file_hash: str = None):
     """
     Log function to be called when receiving a file
 
@@ -372,50 +582,36 @@ def file(service: str, ip: str, file_name: str, file_path: str = None, user: str
     :param file_name: name of the received file
     :param file_path: the path where the file was saved
     :param user: the user whose session invoked the alert
+    :param file_hash: SHA-256 of the file (hex)
     """
 
-    timestamp = format_time(get_time())
-    coordinates = get_coordinates(ip)
+    timestamp = TIMESTAMPS.now()
+    lat, lon, location = _get_location(ip)
 
-    ecs_event = {'category': 'alert', 'action': 'file-upload'}
     ecs_hg_file = {'service': service, 'name': file_name}
     if file_path:
         ecs_hg_file['path'] = file_path
     if user:
         ecs_hg_file['user'] = user
+    if file_hash:
+        ecs_hg_file['hash'] = {'sha256': file_hash}
 
     ecs_hg = {'file-upload': ecs_hg_file}
 
-    values = {'@timestamp': timestamp,
-              'service': ECS_SERVICE,
-              'event': ecs_event,
-              # XXX: we don't know the source port currently..
-              'source': get_ecs_address_dict(ip),
-              'destination': get_ecs_address_dict(Config.general.address),
-              'honeygrove': ecs_hg}
-
+    # XXX: we don't know the source port currently..
+    source = get_ecs_address_dict(ip)
     # Append geo coordinates of source, if available
-    if coordinates:
-        values['source']['geo'] = {'location': '{:.4f},{:.4f}'.format(coordinates[0], coordinates[1])}
+    if location:
+        source['geo'] = {'location': location}
 
-    if Config.general.use_broker:
-        BrokerEndpoint.BrokerEndpoint.sendLogs(json.dumps(values))
-        if file_path:
-            BrokerEndpoint.BrokerEndpoint.sendFile(file_path)
+    ecs_event = LogEvent(timestamp, ECS_SERVICE_JSON, 'alert', 'file-upload', source,
+                         get_ecs_address_dict(Config.general.address), ecs_hg)
 
-    lat = PLACEHOLDER_STRING
-    lon = PLACEHOLDER_STRING
-    if coordinates:
-        lat = '{:.4f}'.format(coordinates[0])
-        lon = '{:.4f}'.format(coordinates[1])
+    _emit(ecs_event, '{} [FILE] {}, {}, Lat: {}, Lon: {}, {}, {}',
+          timestamp, service, ip, lat, lon, file_name, user)
 
-    if Config.general.output_json:
-      message = json.dumps(values)
-    else:
-      message = ('{} [FILE] {}, {}, Lat: {}, Lon: {}, {}, {}'
-                 '').format(timestamp, service, ip, lat, lon, file_name, user)
-
-    _log_alert(message)
+    if Config.general.use_broker and file_path:
+        BrokerEndpoint.BrokerEndpoint.sendFile(file_path)
 
 
 def scan(ip, port, time, scan_type):
@@ -429,40 +625,26 @@ def scan(ip, port, time, scan_type):
     """
 
     timestamp = format_time(time)
-    coordinates = get_coordinates(ip)
+    key = ('scan', scan_type, ip, port)
+    if _repeated(key, timestamp):
+        return
+    lat, lon, location = _get_location(ip)
 
-    ecs_event = {'category': 'warning', 'action': 'scan'}
     ecs_hg_scan = {'port': port, 'type': scan_type}
     ecs_hg = {'scan': ecs_hg_scan}
 
-    values = {'@timestamp': timestamp,
-              'service': ECS_SERVICE,
-              'event': ecs_event,
-              # XXX: we don't know the source port currently..
-              'source': get_ecs_address_dict(ip),
-              'destination': get_ecs_address_dict(Config.general.address, port),
-              'honeygrove': ecs_hg}
-
+    # XXX: we don't know the source port currently..
+    source = get_ecs_address_dict(ip)
     # Append geo coordinates of source, if available
-    if coordinates:
-        values['source']['geo'] = {'location': '{:.4f},{:.4f}'.format(coordinates[0], coordinates[1])}
-
-    if Config.general.use_broker:
-        BrokerEndpoint.BrokerEndpoint.sendLogs(json.dumps(values))
+    if location:
+        source['geo'] = {'location': location}
 
-    lat = PLACEHOLDER_STRING
-    lon = PLACEHOLDER_STRING
-    if coordinates:
-        lat = '{:.4f}'.format(coordinates[0])
-        lon = '{:.4f}'.format(coordinates[1])
+    ecs_event = LogEvent(timestamp, ECS_SERVICE_JSON, 'warning', 'scan', source,
+                         get_ecs_address_dict(Config.general.address, port), ecs_hg)
 
-    if Config.general.output_json:
-      message = json.dumps(values)
-    else:
-      message = ('{} [{}-SCAN] {}:{}, Lat: {}, Lon: {}'
-                 '').format(timestamp, scan_type, ip, port, lat, lon)
-
-    _log_alert(message)
+    _emit(ecs_event, '{} [{}-SCAN] {}:{}, Lat: {}, Lon: {}',
+          timestamp, scan_type, ip, port, lat, lon)
+    _aggregate(key, ecs_event)
 
 
 def limit_reached(service: str, ip: str):
@@ -473,40 +655,27 @@ def limit_reached(service: str, ip: str):
     :param ip: attacker's IP-Address
     """
 
-    timestamp = format_time(get_time())
-    coordinates = get_coordinates(ip)
+    timestamp = TIMESTAMPS.now()
+    key = ('rate-limited', service, ip, None)
+    if _repeated(key, timestamp):
+        return
+    lat, lon, location = _get_location(ip)
 
-    ecs_event = {'category': 'warning', 'action': 'rate-limited'}
     ecs_hg_limit = {'service': service, 'ip': ip}
     ecs_hg = {'rate-limited': ecs_hg_limit}
 
-    values = {'@timestamp': timestamp,
-              'service': ECS_SERVICE,
-              'event': ecs_event,
-              # XXX: we don't know the source port currently..
-              'source': get_ecs_address_dict(ip),
-              'destination': get_ecs_address_dict(Config.general.address),
-              'honeygrove': ecs_hg}
-
+    # XXX: we don't know the source port currently..
+    source = get_ecs_address_dict(ip)
     # Append geo coordinates of source, if available
-    if coordinates:
-        values['source']['geo'] = {'location': '{:.4f},{:.4f}'.format(coordinates[0], coordinates[1])}
+    if location:
+        source['geo'] = {'location': location}
 
-    if Config.general.use_broker:
-        BrokerEndpoint.BrokerEndpoint.sendLogs(json.dumps(values))
+    ecs_event = LogEvent(timestamp, ECS_SERVICE_JSON, 'warning', 'rate-limited', source,
+                         get_ecs_address_dict(Config.general.address), ecs_hg)
 
-    lat = PLACEHOLDER_STRING
-    lon = PLACEHOLDER_STRING
-    if coordinates:
-        lat = '{:.4f}'.format(coordinates[0])
-        lon = '{:.4f}'.format(coordinates[1])
-
-    if Config.general.output_json:
-      message = json.dumps(values)
-    else:
-      message = '{} [LIMIT REACHED] {}, {}, Lat: {}, Lon: {}'.format(timestamp, service, ip, lat, lon)
-
-    _log_alert(message)
+    _emit(ecs_event, '{} [LIMIT REACHED] {}, {}, Lat: {}, Lon: {}',
+          timestamp, service, ip, lat, lon)
+    _aggregate(key, ecs_event)
 
 
 def heartbeat():
@@ -514,14 +683,10 @@ def heartbeat():
     Log function to be called when sending a heartbeat
     """
 
-    timestamp = format_time(get_time())
+    timestamp = TIMESTAMPS.now()
+    _expire_aggregates()
 
-    if Config.general.use_broker:
-        ecs_event = {'category': 'info', 'action': 'heartbeat'}
-        values = {'@timestamp': timestamp,
-                  'service': ECS_SERVICE,
-                  'event': ecs_event}
-        BrokerEndpoint.BrokerEndpoint.sendLogs(values)
+    _log_event(LogEvent(timestamp, ECS_SERVICE_JSON, 'info', 'heartbeat'))
 
     message = ('{} [Heartbeat]'.format(timestamp))
     _log_status(message)
@@ -130,7 +130,7 @@ class FTPProtocol(FTP):
             path = ''
 
         if self._parser.valid_directory(path):
-            files = self._parser.ls(path).split()
+            files = self._parser.ls_long(path, all=True)[3:]  # Without total, "." and ".."
             self.reply(DATA_CNX_ALREADY_OPEN_START_XFR)
             [self.dtpInstance.sendLine(file.encode(self._encoding)) for file in files]
             self.dtpInstance.transport.loseConnection()
@@ -357,7 +357,7 @@ class FTPProtocol(FTP):
 
         self.l.request(FTPService._name, self.transport.getPeer().host, FTPService._port, "RETR " + path, self.user, "RETR")
 
-        honeytoken_filenames = os.listdir(self.honeytokenDirectory)
+        honeytoken_filenames = FilesystemParser.list_honeytoken_files(self.honeytokenDirectory)
 
         if not (self._parser.valid_file(path) and path in honeytoken_filenames):
             self.l.response(FTPService._name, self.transport.getPeer().host, FTPService._port, FILE_NOT_FOUND, self.user,
@@ -407,7 +407,8 @@ class FTPProtocol(FTP):
             self.l.response(FTPService._name, self.transport.getPeer().host, FTPService._port, FILE_NOT_FOUND, self.user, "RETR")
             return FILE_NOT_FOUND, path
 
-        fObj = open(self.honeytokenDirectory + '/' + path, 'rb')
+        # Small files are served from memory
+        fObj = FilesystemParser.content_cache.open(self.honeytokenDirectory + '/' + path)
         d = defer.succeed(FR(fObj))
         d.addCallbacks(cbOpened, ebOpened)
         d.addBoth(enableTimeout)
@@ -15,6 +15,85 @@ import time
 from wsgiref.handlers import format_date_time
 
 
+def render_response(status, headers, body=None):
+    """
+    Renders a complete response
+    :param status: the status line
+    :param headers: dict of headers
+    :param body: (optional) the body
+    :return: the response as bytes
+    """
+    message = status + "\n" + "".join(k + ": " + v + "\n" for k, v in headers.items())
+    if body is not None:
+        message = message + "\n" + body
+    return message.encode('UTF-8')
+
+
+class ResponseCache:
+    """
+    Complete responses (status line, headers and body) for the pages of the HTML dictionary,
+    rendered once, so a request is answered with a single write of prepared bytes.
+    load() has to be called again when pages are added or removed.
+    """
+
+    def __init__(self, folder, pages):
+        """
+        :param folder: the folder of the HTML files
+        :param pages: the HTML dictionary: path -> [login page, (optional) content page], "404" -> [404 page]
+        """
+        self.folder = folder
+        self.pages = pages
+        # path -> response
+        self.login = {}
+        self.success = {}
+        self.forbidden = {}
+        self.not_found = b""
+        self.not_found_asset = b""
+
+    def load(self):
+        """
+        Reads the pages and renders the responses
+        :return: dict with the number of pages, the size of the responses and the duration in ms
+        """
+        start = time.perf_counter()
+        bodies = {}
+
+        def body(name):
+            if name not in bodies:
+                with open(str(self.folder / name), encoding='utf8') as file:
+                    bodies[name] = file.read()
+            return bodies[name]
+
+        not_found = ""
+        try:
+            not_found = body(self.pages['404'][0])
+        except (KeyError, OSError) as e:
+            log.err("HTTP: Failed to load the 404 page: {}".format(e))
+
+        login = {}
+        success = {}
+        forbidden = {}
+        for path, files in list(self.pages.items()):
+            try:
+                page = body(files[0])
+                content = body(files[1]) if len(files) > 1 else not_found
+            except OSError as e:
+                log.err("HTTP: Failed to load the page {}: {}".format(path, e))
+                continue
+            login[path] = render_response(HTTPService.okStatus, HTTPService.responseHeadersOkStatus, page)
+            success[path] = render_response(HTTPService.okStatus, HTTPService.responseHeadersOkStatus, content)
+            forbidden[path] = render_response(HTTPService.forbiddenStatus, HTTPService.responseHeadersForbidden, page)
+
+        # Replaced as a whole, so requests never see a half loaded state
+        self.login, self.success, self.forbidden = login, success, forbidden
+        self.not_found = render_response(HTTPService.notFoundStatus, HTTPService.responseHeadersNotFound, not_found)
+        # Missing images, fonts etc. are answered without a body
+        self.not_found_asset = render_response(HTTPService.notFoundStatus, HTTPService.responseHeadersNotFound)
+        size = sum(map(len, login.values())) + sum(map(len, success.values())) + sum(map(len, forbidden.values()))
+        return {'pages': len(login), 'bytes': size + len(self.not_found),
+                'load_ms': (time.perf_counter() - start) * 1000}
+
+
 class HTTPService(ServiceBaseModel):
     now = datetime.now()
     timeNow = time.mktime(now.timetuple())
@@ -28,7 +107,7 @@ class HTTPService(ServiceBaseModel):
     notFoundStatus = "HTTP/1.1 404 Not Found"
     htdb = HoneytokenDatabase("HTTP")
     html_dictionary = Config.http.html_dictionary_content
-    supportedSites = []
+    responses = ResponseCache(Config.http.resource_folder, html_dictionary)
 
     def __init__(self):
         super(HTTPService, self).__init__()
@@ -43,13 +122,9 @@ class HTTPService(ServiceBaseModel):
     def startService(self):
         try:
             self._stop = False
+            self.reload_pages()
             self._transport = reactor.listenTCP(self._port, self._fService, interface=self._address)
 
-            sites = []
-            for key in HTTPService.html_dictionary:
-                sites.append(key)
-            HTTPService.supportedSites = sites
-
         except Exception as e:
             self._stop = True
 
@@ -63,6 +138,13 @@ class HTTPService(ServiceBaseModel):
         except AttributeError as err:
             log.err("HTTPService.connectionLost threw AttributeError: " + err)
 
+    def reload_pages(self):
+        """
+        Renders the responses of the HTML dictionary again, e.g. after pages were added or removed
+        """
+        stats = HTTPService.responses.load()
+        log.info("HTTP: Loaded {pages} pages ({bytes} bytes of responses) in {load_ms:.1f} ms".format(**stats))
+
     def parseHeaderLine(self, line):
         pdata = line.split(':', 1)[0]
         if (pdata == "Host"):
@@ -77,10 +159,6 @@ class HTTPProtocol(Protocol):
         self.state = None
 
         self.page = ""
-        self.path = Config.http.resource_folder
-        self.attackingSite = ""
-        self.loginSuccessfulSite = ""
-        self.notFoundSite = ""
         self.requestType = ""
         self.short = ""
 
@@ -102,50 +180,23 @@ class HTTPProtocol(Protocol):
         elif self.requestType == "POST":
             self.page = data[data.find("POST ") + 5: data.find(" HTTP/1.1")]
 
-        pageNotFound = True
-
-        for serviceLink in HTTPService.supportedSites:
-            if self.page == serviceLink:
-                pageNotFound = False
-                self.attackingSite = str(self.path / HTTPService.html_dictionary[serviceLink][0])
-                if len(HTTPService.html_dictionary[serviceLink]) > 1:
-                    self.loginSuccessfulSite = str(self.path / HTTPService.html_dictionary[serviceLink][1])
-                else:
-                    self.loginSuccessfulSite = str(self.path / HTTPService.html_dictionary['404'][0])
-                self.short = serviceLink
-                break
-
-        if pageNotFound:
-            self.notFoundSite = str(self.path / HTTPService.html_dictionary['404'][0])
+        responses = HTTPService.responses
 
         # Handle GETs
         if self.requestType == "GET" and ('.gif' in self.page or '.png' in self.page or '/dashboard_files/' in self.page or '.jpg' in self.page or '.woff' in self.page or '.ttf' in self.page or '.svg' in self.page):
-            message = HTTPService.notFoundStatus + "\n"
-            for k in HTTPService.responseHeadersNotFound.keys():
-                message = message + k + ": " + HTTPService.responseHeadersNotFound[k] + "\n"
-            self.transport.write(message.encode('UTF-8'))
+            self.transport.write(responses.not_found_asset)
             self.transport.loseConnection()
 
-        elif self.requestType == "GET" and self.page in HTTPService.supportedSites:
+        elif self.requestType == "GET" and self.page in responses.login:
 
             log.request("HTTP", remote.host, remote.port, local.host, local.port, self.page, "", "GET")
-
-            message = HTTPService.okStatus + "\n"
-            for k in HTTPService.responseHeadersOkStatus.keys():
-                message = message + k + ": " + HTTPService.responseHeadersOkStatus[k] + "\n"
-
-            with open(self.attackingSite, encoding='utf8') as file:
-                message = message + "\n" + file.read()
-
-            self.transport.write(message.encode('UTF-8'))
-            if self.page in HTTPService.supportedSites:
-                log.response("HTTP", remote.host, remote.port, local.host, local.port, self.page, "", "200 OK")
-
+            self.transport.write(responses.login[self.page])
+            log.response("HTTP", remote.host, remote.port, local.host, local.port, self.page, "", "200 OK")
             self.transport.loseConnection()
 
         # Handle POSTs
-        elif (self.requestType == "POST" and self.page in HTTPService.supportedSites):
-            self.page = data[data.find("POST ") + 5: data.find(" HTTP/1.1")]
+        elif (self.requestType == "POST" and self.page in responses.login):
+            self.short = self.page
             login_string = ""
             password_string = ""
             login_index = data.find("log=") + 4
@@ -169,14 +220,7 @@ class HTTPProtocol(Protocol):
                     log.login("HTTP", remote.host, local.port, False, login_string, password_string,
                               str(HTTPService.htdb.try_get_tokens(login_string, password_string)))
                 else:  # Success
-                    message = HTTPService.okStatus + "\n"
-                    for k in HTTPService.responseHeadersOkStatus.keys():
-                        message = message + k + ": " + HTTPService.responseHeadersOkStatus[k] + "\n"
-
-                    with open(self.loginSuccessfulSite, encoding='utf8') as file:
-                        message = message + "\n" + file.read()
-
-                    self.transport.write(message.encode('UTF-8'))
+                    self.transport.write(responses.success[self.short])
                     self.page = "wp-admin_content.html"
                     log.response("HTTP", remote.host, remote.port, local.host, local.port, self.page, login_string, "200 OK")
                     # FIXME: Add remote port and local host
@@ -184,17 +228,10 @@ class HTTPProtocol(Protocol):
                               str(HTTPService.htdb.try_get_tokens(login_string, password_string)))
                     self.transport.loseConnection()
         else:
-            message = HTTPService.notFoundStatus + "\n"
-            for k in HTTPService.responseHeadersNotFound.keys():
-                message = message + k + ": " + HTTPService.responseHeadersNotFound[k] + "\n"
-
-            with open(self.notFoundSite, encoding='utf8') as file:
-                message = message + "\n" + file.read()
-
-            self.transport.write(message.encode('UTF-8'))
+            self.transport.write(responses.not_found)
             log.request("HTTP", remote.host, remote.port, local.host, local.port, self.page, "", "GET")
             self.page = "404_login.html"
-            log.response("HTTP", remote.host, remote.port, local.host, local.port, self.page, login_string, "404 NOT FOUND")
+            log.response("HTTP", remote.host, remote.port, local.host, local.port, self.page, "", "404 NOT FOUND")
             self.transport.loseConnection()
 
     def connectionLost(self, reason):
@@ -204,14 +241,7 @@ class HTTPProtocol(Protocol):
     def errorBack(self, f):
         f.trap(error.UnauthorizedLogin)
 
-        message = HTTPService.forbiddenStatus + "\n"
-        for k in HTTPService.responseHeadersForbidden.keys():
-            message = message + k + ": " + HTTPService.responseHeadersForbidden[k] + "\n"
-
-        with open(self.attackingSite, encoding='utf8') as file:
-            message = message + "\n" + file.read()
-
-        self.transport.write(message.encode('UTF-8'))
+        self.transport.write(HTTPService.responses.forbidden[self.short])
         self.transport.loseConnection()
 
 
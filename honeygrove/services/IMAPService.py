@@ -1,5 +1,6 @@
 from honeygrove import log
 from honeygrove.config import Config
+from honeygrove.core.Tarpit import Tarpit
 from honeygrove.services.ServiceBaseModel import Limiter, ServiceBaseModel
 
 from twisted.internet import reactor
@@ -7,7 +8,7 @@ from twisted.internet.protocol import Protocol
 from twisted.protocols import policies
 
 from enum import Enum
-import base64, re, time, random
+import base64, re, random
 
 
 class IMAPService(ServiceBaseModel):
@@ -31,6 +32,8 @@ class IMAPState(Enum):
 
 
 class IMAPProtocol(Protocol, policies.TimeoutMixin):
+    tarpit = Tarpit(Config.imap.abort_delay)
+
     def __init__(self):
         # buffer for email body
         self.msg = ""
@@ -195,9 +198,8 @@ class IMAPProtocol(Protocol, policies.TimeoutMixin):
         self.transport.write(response.encode("UTF-8"))
         # close connection gently (nonblocking, send buffers before closing, client is able to receive error message)
         self.transport.loseConnection()
-        # time.sleep(5)
         # force close connection after waiting duration
-        # self.transport.abortConnection()
+        self.tarpit.call(self.transport.abortConnection)
         # connectionLost() gets called automatically
 
     def dataReceived(self, rawData):
@@ -1,12 +1,13 @@
 from honeygrove import log
 from honeygrove.config import Config
+from honeygrove.core.Tarpit import Tarpit
 from honeygrove.services.ServiceBaseModel import Limiter, ServiceBaseModel
 
 from twisted.internet import reactor
 from twisted.internet.protocol import Protocol
 from twisted.protocols import policies
 
-import re, hashlib, time
+import re, hashlib
 
 
 class POP3Service(ServiceBaseModel):
@@ -22,6 +23,8 @@ class POP3Service(ServiceBaseModel):
 
 
 class POP3Protocol(Protocol, policies.TimeoutMixin):
+    tarpit = Tarpit(Config.pop3.abort_delay)
+
     def savedMails(self):
         self.mailcount = 0
         self.mailsize = 0
@@ -95,9 +98,8 @@ class POP3Protocol(Protocol, policies.TimeoutMixin):
         self.transport.write(response.encode("UTF-8"))
         # close connection gently (nonblocking, send buffers before closing, client is able to receive error message)
         self.transport.loseConnection()
-        time.sleep(5)
         # force close connection after waiting duration
-        self.transport.abortConnection()
+        self.tarpit.call(self.transport.abortConnection)
         # connectionLost() gets called automatically
 
     def dataReceived(self, rawData):
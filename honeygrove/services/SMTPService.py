@@ -1,11 +1,12 @@
 from honeygrove import log
 from honeygrove.config import Config
+from honeygrove.core.Tarpit import Tarpit
 from honeygrove.services.ServiceBaseModel import Limiter, ServiceBaseModel
 
 from twisted.internet.protocol import Protocol
 from twisted.protocols import policies
 
-import base64, re, time
+import base64, re
 
 
 class SMTPService(ServiceBaseModel):
@@ -21,6 +22,8 @@ class SMTPService(ServiceBaseModel):
 
 
 class SMTPProtocol(Protocol, policies.TimeoutMixin):
+    tarpit = Tarpit(Config.smtp.abort_delay)
+
     def __init__(self):
         # buffer for email body
         self.msg = ""
@@ -83,9 +86,8 @@ class SMTPProtocol(Protocol, policies.TimeoutMixin):
         self.transport.write(response.encode("UTF-8"))
         # close connection gently (nonblocking, send buffers before closing, client is able to receive error message)
         self.transport.loseConnection()
-        time.sleep(5)
         # force close connection after waiting duration
-        self.transport.abortConnection()
+        self.tarpit.call(self.transport.abortConnection)
         # connectionLost() gets called automatically
 
     def dataReceived(self, rawData):
@@ -1,57 +1,83 @@
 from honeygrove import log
 from honeygrove.config import Config
 from honeygrove.core.Credential import Credential
+from honeygrove.core.Downloader import Downloader, DownloadError
 from honeygrove.core.FilesystemParser import FilesystemParser
+from honeygrove.core.HelpTexts import HelpTexts
 from honeygrove.core.HoneytokenDatabase import HoneytokenDatabase
+from honeygrove.core.KeyManager import KeyManager
+from honeygrove.core.LoginStore import LoginStore
+from honeygrove.core.SessionRecorder import SessionRecorder
+from honeygrove.core import ShellParser
+from honeygrove.core.ShellParser import ShellSyntaxError
+from honeygrove.core.ShellRunner import QueueFull, ShellRunner
+from honeygrove.core.Tarpit import Tarpit
 from honeygrove.services.ServiceBaseModel import Limiter, ServiceBaseModel
 
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
-
 from twisted.conch import avatar, error, insults, interfaces, recvline
-from twisted.conch.ssh import factory, keys, session, userauth, common, transport
+from twisted.conch.ssh import factory, session, userauth, common, transport
 from twisted.cred.portal import Portal
-from twisted.internet import defer
+from twisted.internet import defer, reactor
 from twisted.python import components
 
 from datetime import datetime, timedelta
-import json
-import os
-from os.path import expanduser, exists, dirname
+from os.path import expanduser
 from random import randint
 import re
-import subprocess
 import time
-from urllib import request
+from urllib.parse import urlparse
 
 transport.SSHTransportBase.ourVersionString = Config.ssh.banner
 
-lastLoginTime = dict()
-
-
-def load_database():
-    global lastLoginTime
-    try:
-        with open(str(Config.ssh.database_path), 'r') as fp:
-            lastLoginTime = json.loads(fp.read())
-    except FileNotFoundError:
-        pass
-    except Exception:
-        # e.g. damaged json encoding
-        log.err("Failed to load lastLoginTime from existing file \""+str(Config.ssh.database_path)+"\"")
-
-
-def save_database():
-    try:
-        with open(str(Config.ssh.database_path), 'w') as fp:
-            fp.write(json.dumps(lastLoginTime))
-    except Exception:
-        # e.g. insufficient write permissions, io error etc.
-        log.err("Failed to write lastLoginTime to file \""+str(Config.ssh.database_path)+"\"")
 
+# Options of wget that take a value: short ones and long ones (the value can follow after "=" or as next argument)
+WGET_SHORT_VALUE_OPTIONS = frozenset("aeiABDIlOoPQRtTUwX")
+WGET_LONG_VALUE_OPTIONS = frozenset(("--output-document", "--output-file", "--append-output", "--directory-prefix",
+                                     "--user-agent", "--header", "--tries", "--timeout", "--wait", "--input-file",
+                                     "--base", "--user", "--password", "--post-data", "--referer", "--level"))
+
+
+def wget_arguments(args):
+    """
+    Parses the arguments of wget
+    :param args: the arguments
+    :return: the URL (the first argument that is no option) or "" and the value of -O or None
+    """
+    url = ""
+    output = None
+    args = iter(args)
+    for arg in args:
+        if arg.startswith("--"):
+            name, equals, value = arg.partition("=")
+            if not equals and name in WGET_LONG_VALUE_OPTIONS:
+                value = next(args, "")
+            if name == "--output-document":
+                output = value
+        elif arg.startswith("-") and len(arg) > 1:
+            for i, char in enumerate(arg[1:], 2):
+                if char in WGET_SHORT_VALUE_OPTIONS:
+                    # The value is the rest of the argument or the next argument
+                    value = arg[i:] or next(args, "")
+                    if char == "O":
+                        output = value
+                    break
+        elif not url:
+            url = arg
+    return url, output
+
+
+def failed(output, status=1):
+    """
+    Result of a command that failed
+    :param output: a line or list of lines to be printed
+    :param status: the (non-zero) exit status
+    :return: (output, log text, exit status)
+    """
+    return output, None, status
 
 class SSHService(ServiceBaseModel):
     honeytokendb = HoneytokenDatabase(servicename=Config.ssh.name)
+    host_keys = KeyManager(Config.ssh.host_keys, Config.ssh.rsa_key_size, Config.ssh.provisional_rsa_key_size)
 
     def __init__(self):
         super(SSHService, self).__init__()
@@ -70,36 +96,26 @@ class SSHService(ServiceBaseModel):
 
         self._fService.portal = p
 
-        # self.protocol = SSHProtocol
-        # self._fService.protocol = self.protocol
-        home = expanduser('~')
-
-        # XXX: These paths should be configurable
-        privateKeyPath = home + '/.ssh/id_honeygrove'
-        publicKeyPath = home + '/.ssh/id_honeygrove.pub'
-
-        # Generate RSA keys if they don't exist
-        if not (exists(privateKeyPath) and exists(publicKeyPath)):
-            key = keys.rsa.generate_private_key(public_exponent=65537, key_size=4096, backend=default_backend())
-            private_key = key.private_bytes(serialization.Encoding.PEM,
-                                            serialization.PrivateFormat.TraditionalOpenSSL,
-                                            serialization.NoEncryption())
-            public_key = key.public_key().public_bytes(serialization.Encoding.OpenSSH,
-                                                       serialization.PublicFormat.OpenSSH)
-
-            # make .ssh directory, if it doesn't exist
-            os.makedirs(dirname(publicKeyPath), exist_ok=True)
-
-            with open(privateKeyPath, 'w') as f:
-                f.write(private_key.decode())
-            with open(publicKeyPath, 'w') as f:
-                f.write(public_key.decode())
-
-        self._fService.privateKeys = {b'ssh-rsa': keys.Key.fromFile(privateKeyPath)}
-        self._fService.publicKeys = {b'ssh-rsa': keys.Key.fromFile(publicKeyPath)}
+        # Keys that are generated in the background are added to these dicts when ready
+        self.host_keys.load()
+        self._fService.privateKeys = self.host_keys.private_keys
+        self._fService.publicKeys = self.host_keys.public_keys
 
 
 class SSHProtocol(recvline.HistoricRecvLine):
+    shell_runner = ShellRunner(max_processes=Config.ssh.shell_max_processes, max_queue=Config.ssh.shell_max_queue,
+                               cpu_time=Config.ssh.shell_cpu_time, timeout=Config.ssh.shell_timeout,
+                               max_output=Config.ssh.shell_max_output)
+    downloader = Downloader(Config.folder.quarantine, Config.ssh.download_max_size, Config.ssh.download_timeout,
+                            Config.ssh.download_max_concurrent)
+    rm_tarpit = Tarpit(Config.ssh.rm_root_delay)
+    help_texts = HelpTexts(Config.ssh.helptext_folder, Config.ssh.gnuhelp_folder)
+    last_logins = LoginStore(Config.ssh.database_path, Config.ssh.max_logins, Config.ssh.login_flush_interval)
+
+    def __init__(self):
+        super(SSHProtocol, self).__init__()
+        # The commands of this session, bound once instead of looked up for every line
+        self._commands = {name: func.__get__(self) for name, func in self.commands.items()}
 
     def connectionMade(self):
         """
@@ -137,19 +153,14 @@ class SSHProtocol(recvline.HistoricRecvLine):
         self.showPrompt()
 
     def saveLoginTime(self, username):
-        global lastLoginTime
-        # limits number of saved "user profiles" to keep an attacker from filling the memory
-        if len(lastLoginTime) <= 10000:
-            if Config.general.use_utc:
-                lastLoginTime[username] = str(datetime.utcnow().ctime())
-            else:
-                lastLoginTime[username] = str(datetime.now().ctime())
+        # The number of saved "user profiles" is limited to keep an attacker from filling the memory
+        if Config.general.use_utc:
+            self.last_logins.put(username, str(datetime.utcnow().ctime()))
+        else:
+            self.last_logins.put(username, str(datetime.now().ctime()))
 
     def loadLoginTime(self, username):
-        if username in lastLoginTime:
-            return lastLoginTime[username]
-        else:
-            return False
+        return self.last_logins.get(username) or False
 
     def print(self, lines, log=None):
         """
@@ -179,7 +190,7 @@ class SSHProtocol(recvline.HistoricRecvLine):
         :param cmd: the command to search for
         :return: the corresponding "ssh_" function
         """
-        return getattr(self, 'ssh_' + cmd, None)
+        return self._commands.get(cmd)
 
     def get_help(self, cmd):
         """
@@ -187,17 +198,8 @@ class SSHProtocol(recvline.HistoricRecvLine):
         :param cmd:
         :return: the corresponding text
         """
-        helptext = ""
-        append = False
-        with open(str(Config.ssh.helptext_folder)) as helps:
-            for line in helps:
-                if append and re.match("^\S", line):
-                    return helptext
-                if re.match("^" + cmd, line):
-                    append = True
-                if append:
-                    helptext = helptext + line
-        return helptext
+        topic = self.help_texts.topic(cmd)
+        return topic[1] if topic else ""
 
     def handle_arguments(self, args):
         """
@@ -234,41 +236,20 @@ class SSHProtocol(recvline.HistoricRecvLine):
 
             if Config.ssh.real_shell:
                 # Forwarding commands to the real shell
-
-                if "cd" in line:
-                    try:
-                        self.current_dir = subprocess.check_output(line + " && pwd",
-                                                                   stderr=subprocess.STDOUT,
-                                                                   shell=True,
-                                                                   cwd=self.current_dir).decode().strip()
-                    except subprocess.CalledProcessError as e:
-                        res = e.output
-                        res = res.decode()
-                        res = res.split("\n")[:-1]
-                if "exit" in line:
+                if line.split()[0] == "exit":
                     self.ssh_exit()
                 else:
-                    try:
-                        res = subprocess.check_output(line, stderr=subprocess.STDOUT, shell=True, cwd=self.current_dir)
-                    except subprocess.CalledProcessError as e:
-                        res = e.output
-                    res = res.decode()
-                    res = res.split("\n")[:-1]
+                    res = self.run_real_shell(line)
 
             else:
                 # faking an ssh session
+                res = self.run_command_line(line)
 
-                cmdAndArgs = line.split()
-                cmd = cmdAndArgs[0]
-                args = cmdAndArgs[1:]
-                func = self.getCommandFunc(cmd)
-                if func:
-                    try:
-                        res = func(*args)
-                    except Exception as e:
-                        self.log.err(str(e))
-                else:
-                    res = cmd + ": command not found"
+            if isinstance(res, defer.Deferred):
+                # The command writes its output itself, the prompt is shown when it is done
+                res.addErrback(lambda failure: self.log.err(str(failure.value)))
+                res.addBoth(lambda _: self.showPrompt())
+                return
 
             if res:
                 if not isinstance(res, tuple):  # If only response and no log text
@@ -276,6 +257,142 @@ class SSHProtocol(recvline.HistoricRecvLine):
                 self.print(*res)
         self.showPrompt()
 
+    def run_command_line(self, line):
+        """
+        Runs a command line in the emulated shell, the output of every command is printed when it is done
+        :param line: the command line
+        :return: None or a Deferred that fires when the last command is done
+        """
+        try:
+            commands = ShellParser.parse(line)
+        except ShellSyntaxError as e:
+            self.print("-bash: " + str(e))
+            return
+        return self._run_commands(commands, 0, 0, False)
+
+    def _run_commands(self, commands, index, status, skipped):
+        """
+        Runs the commands of a command line from index on, waits for commands running in the background
+        :param commands: the parsed commands
+        :param index: the first command to run
+        :param status: exit status of the previous command
+        :param skipped: True if the previous command was skipped
+        """
+        while index < len(commands):
+            command = commands[index]
+            index += 1
+            # A pipeline runs as a whole or not at all
+            if command.connector != "|":
+                skipped = command.connector == "&&" and status != 0 or command.connector == "||" and status == 0
+            if skipped:
+                continue
+
+            piped = index < len(commands) and commands[index].connector == "|"
+            status = self.run_command(command, piped)
+            if isinstance(status, defer.Deferred):
+                status.addCallbacks(self._command_done, self._command_failed)
+                status.addCallback(lambda status: self._run_commands(commands, index, status, False))
+                return status
+
+    def _command_done(self, result):
+        # Commands running in the background may fire with their exit status
+        return result if isinstance(result, int) else 0
+
+    def _command_failed(self, failure):
+        self.log.err(str(failure.value))
+        return 1
+
+    def run_command(self, command, piped=False):
+        """
+        Runs a simple command in the emulated shell
+        :param command: the parsed command
+        :param piped: True if the output goes into a pipe (it is discarded)
+        :return: the exit status or a Deferred if the command writes its output itself
+                 (it may fire with the exit status)
+        """
+        hidden = piped
+        for operator, target in command.redirects:
+            if operator in ShellParser.OUTPUT_REDIRECTS:
+                hidden = True
+            if target is None or target == "/dev/null":
+                continue
+            if self._parser.valid_directory(target):
+                error = "Is a directory"
+            elif self._parser.valid_file(target) or not operator.endswith("<") and self._parser.touch(target) is None:
+                continue
+            else:
+                error = "No such file or directory"
+            self.print("-bash: {}: {}".format(target, error))
+            return 1
+
+        if not command.argv:
+            return 0
+        cmd = command.argv[0]
+        func = self.getCommandFunc(cmd)
+        if not func:
+            if "/" not in cmd:
+                self.print(cmd + ": command not found")
+                return 127
+            if self._parser.valid_directory(cmd):
+                self.print("-bash: " + cmd + ": Is a directory")
+                return 126
+            if self._parser.valid_file(cmd):
+                self.print("-bash: " + cmd + ": Permission denied")
+                return 126
+            self.print("-bash: " + cmd + ": No such file or directory")
+            return 127
+
+        try:
+            res = func(*command.argv[1:])
+        except Exception as e:
+            self.log.err(str(e))
+            return 1
+        if isinstance(res, defer.Deferred):
+            return res
+        status = 0
+        if isinstance(res, tuple) and len(res) == 3:  # Result of failed()
+            res, status = res[:2], res[2]
+        if res and not hidden:
+            if not isinstance(res, tuple):  # If only response and no log text
+                res = (res, "")
+            self.print(*res)
+        return status
+
+    def run_real_shell(self, line):
+        """
+        Runs a command in the real shell, the output is written to the terminal as it arrives
+        :param line: the command line
+        :return: Deferred that fires when the command is done
+        """
+        output = []
+
+        def write(data):
+            output.append(data)
+            self.terminal.write(data)
+
+        d = self.shell_runner.run(line, self.current_dir, write)
+        stats = self.shell_runner.stats()
+        if stats['queued']:
+            self.log.info("Real shell saturated: {running} running, {queued} queued, "
+                          "{rejected} rejected".format(**stats))
+        d.addCallbacks(self._real_shell_done, self._real_shell_failed, callbackArgs=(output,))
+        return d
+
+    def _real_shell_done(self, result, output):
+        _, cwd, killed = result
+        if cwd:
+            self.current_dir = cwd
+        if killed:
+            self.terminal.nextLine()
+            self.terminal.write(b"Killed")
+            self.terminal.nextLine()
+        self.log.response(self.service_name, self.remote[0], self.remote[1], self.local_ip, self.local_port,
+                          b"".join(output).decode(errors="replace").splitlines(), self.user.username)
+
+    def _real_shell_failed(self, failure):
+        failure.trap(QueueFull)
+        self.print("-bash: fork: retry: Resource temporarily unavailable")
+
     def ssh_help(self, cmd=''):
         """
         Prints the GNU bash help for cmd or the universal help text if cmd is not given
@@ -283,21 +400,13 @@ class SSHProtocol(recvline.HistoricRecvLine):
         """
 
         if cmd:
-            func = self.getCommandFunc(cmd)
-            if func:
-                text = self.get_help(cmd)
-            if not func or not text:
-                text = "help: no help topics match `{}'.  " \
-                       "Try `help help' or `man -k {}' or `info {}'.".format(cmd, cmd, cmd)
-            return text
-
-        gnuhelp = []
+            topic = self.help_texts.topic(cmd) if self.getCommandFunc(cmd) else None
+            if not topic:
+                return failed("help: no help topics match `{}'.  " \
+                       "Try `help help' or `man -k {}' or `info {}'.".format(cmd, cmd, cmd))
+            return topic
 
-        with open(str(Config.ssh.gnuhelp_folder)) as file:
-            for line in file:
-                gnuhelp.append(line)
-
-        return gnuhelp, "Help text"
+        return self.help_texts.general()[0], "Help text"
 
     def ssh_pwd(self):
         """
@@ -336,7 +445,8 @@ class SSHProtocol(recvline.HistoricRecvLine):
         res = None
         if args:
             res = self._parser.cd(args[-1])
-        return res
+        if res:
+            return failed(res)
 
     def ssh_ls(self, *args):
         """
@@ -347,14 +457,15 @@ class SSHProtocol(recvline.HistoricRecvLine):
         path, arguments = self.handle_arguments(args)
 
         try:
-            lines = self._parser.ls(path).split("\n")[:-1]  # Split puts an empty string after the last "/n"
+            if "l" in arguments:
+                lines = self._parser.ls_long(path, "a" in arguments)
+            else:
+                lines = self._parser.names(path)
         except Exception:
-            return "ls: " + path + ": No such file or directory."
+            return failed("ls: " + path + ": No such file or directory.", 2)
 
-        for line in lines:
-            if line and line[0] == "." and "a" not in arguments:
-                lines.remove(line)
-        lines = lines
+        if "l" not in arguments and "a" not in arguments:
+            lines = [line for line in lines if not line.startswith(".")]
 
         return lines, "ls Text"
 
@@ -364,14 +475,18 @@ class SSHProtocol(recvline.HistoricRecvLine):
         :param args: path to be created
         :return:
         """
-        return self._parser.mkdir(args[-1])
+        res = self._parser.mkdir(args[-1])
+        if res:
+            return failed(res)
 
     def ssh_touch(self, *args):
         """
         Creates a file in the fake filesystem
         :param args: path to the new file
         """
-        return self._parser.touch(args[-1])
+        res = self._parser.touch(args[-1])
+        if res:
+            return failed(str(res))
 
     def ssh_rm(self, *args):
         """
@@ -382,13 +497,13 @@ class SSHProtocol(recvline.HistoricRecvLine):
         path, arguments = self.handle_arguments(args)
 
         if "r" in arguments and "f" in arguments and path == "/":
-            time.sleep(4)
-            self.ssh_exit()  # r e a l i s m
-            return
+            return self.rm_tarpit.call(self.ssh_exit)  # r e a l i s m
         if self._parser.valid_directory(path) and "r" not in arguments:
-            return "rm: " + args[-1] + ": is a directory"
+            return failed("rm: " + args[-1] + ": is a directory")
 
-        return self._parser.delete(path)
+        res = self._parser.delete(path)
+        if res:
+            return failed(res)
 
     def ssh_mv(self, *args):
         """
@@ -397,7 +512,7 @@ class SSHProtocol(recvline.HistoricRecvLine):
         """
         res = self._parser.move(args[-2], args[-1])
         if res:
-            return "mv: " + res
+            return failed("mv: " + res)
 
     def ssh_cat(self, *args):
         """
@@ -408,38 +523,49 @@ class SSHProtocol(recvline.HistoricRecvLine):
             response = self._parser.cat(args[-1])
         except Exception as e:
             if str(e) == "File not found":
-                response = "cat: " + args[-1] + ": File or directory not found"
+                return failed("cat: " + args[-1] + ": File or directory not found")
             if str(e) == "Is a directory":
-                response = "cat: " + args[-1] + ": Is a directory"
+                return failed("cat: " + args[-1] + ": Is a directory")
+            raise
 
         return response
 
     def ssh_wget(self, *args):
         """
-        Downloads a file from the internet
-        :param args: url
+        Downloads a file from the internet into the quarantine.
+        The download runs in the background, the prompt returns when it is done.
+        :param args: arguments and url
+        :return: Deferred that fires with the exit status when the download is done
         """
+        url, output_document = wget_arguments(args)
+        if not url:
+            return failed(["wget: missing URL", "Usage: wget [OPTION]... [URL]...", "",
+                           "Try `wget --help' for more options."])
 
         # Handle URL
-        url = args[-1]
         filename = url.split('/')[-1].split('#')[0].split('?')[0]
         if not re.match(r"^https?://", url):
             url = "http://" + url
         if not re.match(r"^https?://.*\..*/", url):  # wenn die URL nichts hinter dem "/" nach der TLD hat
             filename = "index.html"
+        if output_document and output_document != "-":
+            filename = output_document
 
-        # Determine filename
-        i = 1
-        while filename in os.listdir(Config.folder.quarantine):
-            filename = filename + "." + str(i)
-            i += 1
+        if not Config.ssh.accept_files:
+            self.log.file(self.service_name, self.remote[0], filename, user=self.user.username)
+            return
 
-        # Write to disk
-        filepath = ""
-        if Config.ssh.accept_files:
-            request.urlretrieve(url, Config.folder.quarantine / filename)
-            filepath = Config.folder.quarantine / filename
-        self.log.file(self.name, self.userIP, filename, filepath, self.user.username)
+        output = WgetOutput(self.terminal, url, filename)
+        d = self.downloader.download(url, output.started, output.progress)
+        d.addCallbacks(self._wget_done, output.failed, callbackArgs=(filename, output))
+        return d
+
+    def _wget_done(self, download, filename, output):
+        output.done(download)
+        # The file appears in the emulated filesystem, the content is in the quarantine
+        self._parser.touch(filename)
+        self.log.file(self.service_name, self.remote[0], filename, download.path, self.user.username,
+                      download.sha256)
 
     def ssh_ll(self, *args):
         """
@@ -449,33 +575,202 @@ class SSHProtocol(recvline.HistoricRecvLine):
         return self.ssh_ls(*args + ("-l",))
 
 
+# The commands of the emulated shell: the ssh_<command> methods by command name
+SSHProtocol.commands = {name[4:]: func for name, func in vars(SSHProtocol).items() if name.startswith("ssh_")}
+
+
+class WgetOutput:
+    """
+    Renders the output of wget for a download
+    """
+
+    # Minimum seconds between two updates of the progress bar
+    interval = 0.2
+
+    def __init__(self, terminal, url, filename):
+        self.terminal = terminal
+        self.filename = filename
+        self.connected = False
+        self._start = time.monotonic()
+        self._last_update = self._start
+
+        address = urlparse(url)
+        port = address.port or (443 if address.scheme == "https" else 80)
+        self._write("--{}--  {}".format(self._now(), url))
+        self.terminal.nextLine()
+        self._write("Connecting to {}:{}... ".format(address.hostname, port))
+
+    def started(self, download):
+        self.connected = True
+        self._write("connected.")
+        self.terminal.nextLine()
+        self._write("HTTP request sent, awaiting response... {} {}".format(download.code, download.phrase))
+        self.terminal.nextLine()
+        content_type = " [{}]".format(download.content_type) if download.content_type else ""
+        if download.length is None:
+            self._write("Length: unspecified" + content_type)
+        else:
+            human = " ({})".format(_human_size(download.length)) if download.length >= 1024 else ""
+            self._write("Length: {}{}{}".format(download.length, human, content_type))
+        self.terminal.nextLine()
+        self._write("Saving to: ‘{}’".format(self.filename))
+        self.terminal.nextLine()
+        self.terminal.nextLine()
+
+    def progress(self, download):
+        now = time.monotonic()
+        if now - self._last_update >= self.interval:
+            self._last_update = now
+            self._bar(download, now)
+
+    def done(self, download):
+        now = time.monotonic()
+        self._bar(download, now)
+        self.terminal.nextLine()
+        self.terminal.nextLine()
+        self._write("{} ({}) - ‘{}’ saved [{}/{}]".format(
+            self._now(), self._speed(download.received, now), self.filename, download.received,
+            download.length if download.length is not None else download.received))
+        self.terminal.nextLine()
+        self.terminal.nextLine()
+
+    def failed(self, failure):
+        error = failure.value
+        if not isinstance(error, DownloadError):
+            return failure
+        if error.code is not None:
+            # The server responded with an error
+            self._write("connected.")
+            self.terminal.nextLine()
+            self._write("HTTP request sent, awaiting response... {} {}".format(error.code, error.phrase))
+            self.terminal.nextLine()
+            self._write("{} {}".format(self._now(), error))
+        elif self.connected:
+            self.terminal.nextLine()
+            self._write("{} {}".format(self._now(), error))
+        else:
+            self._write("failed: {}".format(error))
+        self.terminal.nextLine()
+        self.terminal.nextLine()
+        return 1
+
+    def _bar(self, download, now):
+        if download.length:
+            percent = min(100, download.received * 100 // download.length)
+            arrow = ("=" * (percent * 18 // 100) + ">").ljust(19)
+            line = "{:<20.20} {:>3}%[{}] {:>7}  {}".format(self.filename, percent, arrow,
+                                                          _human_size(download.received), self._speed(download.received, now))
+        else:
+            line = "{:<20.20}     [ <=>                ] {:>7}  {}".format(self.filename, _human_size(download.received),
+                                                                        self._speed(download.received, now))
+        self._write("\r" + line)
+
+    def _speed(self, received, now):
+        elapsed = now - self._start
+        if elapsed <= 0:
+            return "--.-KB/s"
+        return _human_size(received / elapsed) + "B/s"
+
+    def _write(self, text):
+        # Terminals only accept bytes
+        self.terminal.write(text.encode())
+
+    @staticmethod
+    def _now():
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _human_size(size):
+    """
+    Formats a size like wget, e.g. 512, 1.2K or 3.4M
+    """
+    if size < 1024:
+        return "{:.0f}".format(size)
+    for unit in ("K", "M", "G"):
+        size /= 1024
+        if size < 1024 or unit == "G":
+            return "{:.1f}{}".format(size, unit)
+
+
+class RecordingTransport:
+    """
+    Passes the output of a terminal on to the channel and records it
+    """
+
+    def __init__(self, transport, recorder):
+        self.transport = transport
+        self.recorder = recorder
+
+    def write(self, data):
+        self.recorder.output(data)
+        self.transport.write(data)
+
+    def writeSequence(self, data):
+        self.write(b"".join(data))
+
+    def __getattr__(self, name):
+        return getattr(self.transport, name)
+
+
+class RecordingServerProtocol(insults.insults.ServerProtocol):
+    """
+    Terminal that records its input and output
+    """
+
+    def __init__(self, recorder, protocolFactory, *args, **kwargs):
+        super(RecordingServerProtocol, self).__init__(protocolFactory, *args, **kwargs)
+        self.recorder = recorder
+
+    def makeConnection(self, transport):
+        super(RecordingServerProtocol, self).makeConnection(RecordingTransport(transport, self.recorder))
+
+    def dataReceived(self, data):
+        self.recorder.input(data)
+        super(RecordingServerProtocol, self).dataReceived(data)
+
+    def connectionLost(self, reason):
+        super(RecordingServerProtocol, self).connectionLost(reason)
+        self.recorder.close()
+
+
 class SSHSession(session.SSHSession):
     local_ip = Config.general.address
     local_port = Config.ssh.port
+    # (rows, columns, x pixels, y pixels) as requested by the client
+    window_size = (24, 80, 0, 0)
+    recorder = None
 
     def openShell(self, transport):
         """
         wire the protocol to the transport channel
         :param transport:
         """
-        serverProtocol = insults.insults.ServerProtocol(
-            SSHProtocol)  # neues ServerProtocol mit SSHProtocol als Terminal
+        remote = transport.session.avatar.conn.transport.transport.client
+        if Config.ssh.record_sessions:
+            name = "{}_{}_{}.hgcast".format(datetime.now().strftime("%Y%m%d-%H%M%S-%f"), remote[0], remote[1])
+            self.recorder = SessionRecorder(Config.folder.recordings / name, self.window_size[1], self.window_size[0],
+                                            "{}@{}".format(transport.session.avatar.username, remote[0]),
+                                            compress=Config.ssh.record_compression,
+                                            max_size=Config.ssh.record_max_size, reactor=reactor)
+            serverProtocol = RecordingServerProtocol(self.recorder, SSHProtocol)
+        else:
+            serverProtocol = insults.insults.ServerProtocol(
+                SSHProtocol)  # neues ServerProtocol mit SSHProtocol als Terminal
         serverProtocol.makeConnection(transport)
         transport.makeConnection(session.wrapProtocol(serverProtocol))
 
-        remote = transport.session.avatar.conn.transport.transport.client
         log.request("SSH", remote[0], remote[1], self.local_ip, self.local_port,
                     "<open shell>", transport.session.avatar.username)
 
     def getPty(self, terminal, windowSize, attrs):
         """
-        Ignore Pty requests
+        Pty requests are only used for the size of recordings
         :param terminal:
-        :param windowSize:
+        :param windowSize: (rows, columns, x pixels, y pixels)
         :param attrs:
         :return:
         """
-        pass
+        self.window_size = windowSize
 
     def execCommand(self, pp, cmd):
         """
@@ -490,11 +785,14 @@ class SSHSession(session.SSHSession):
                     "<exec '{}'>".format(cmd.decode()), pp.session.avatar.username)
         pp.session.conn.transport.sendDisconnect(7, b"Command Execution is not supported.")
 
-    def windowChanged(self, *args):
+    def windowChanged(self, windowSize):
         """
-        This method would be used to determine the window size of the client terminal.
+        Records the new window size of the client terminal
+        :param windowSize: (rows, columns, x pixels, y pixels)
         """
-        pass
+        self.window_size = windowSize
+        if self.recorder:
+            self.recorder.resize(windowSize[1], windowSize[0])
 
 
 class SSHRealm(SSHSession):
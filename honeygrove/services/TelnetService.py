@@ -1,12 +1,11 @@
 from honeygrove import log
 from honeygrove.config import Config
+from honeygrove.core.Tarpit import Tarpit
 from honeygrove.services.ServiceBaseModel import Limiter, ServiceBaseModel
 
 from twisted.conch.telnet import TelnetTransport, StatefulTelnetProtocol
 from twisted.internet import protocol
 
-import time
-
 
 class TelnetService(ServiceBaseModel):
     def __init__(self):
@@ -23,6 +22,7 @@ class TelnetService(ServiceBaseModel):
 class TelnetProtocol(StatefulTelnetProtocol):
     # This is required as we are stateful and this gets set to "Password" after on_username returns
     state = "User"
+    tarpit = Tarpit(Config.telnet.login_delay)
 
     def on_new_connection(self):
         response = "Username: "
@@ -40,13 +40,15 @@ class TelnetProtocol(StatefulTelnetProtocol):
 
         log.login(Config.telnet.name, self.peer, Config.telnet.port, False, self.username, self.password, "")
 
-        time.sleep(2.0)
+        # Input is discarded until the failure is reported
+        self.tarpit.call(self.on_login_failed)
+        return "Discard"
 
+    def on_login_failed(self):
         response = "\nAuthentication failed\nUsername: "
         self.transport.write(response.encode("UTF-8"))
 
         self.state = "User"
-        return "Discard"
 
     # Twisted requires these exact method names on the class so we rebind them
     connectionMade = on_new_connection
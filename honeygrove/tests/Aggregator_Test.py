@@ -0,0 +1,105 @@
+from honeygrove import log
+from honeygrove.config import Config
+from honeygrove.core.Aggregator import EventAggregator
+from honeygrove.core.LogSink import EVENT, LogSink
+
+from twisted.internet import task
+
+import json
+import unittest
+from unittest import mock
+
+
+class ListSink(LogSink):
+    """
+    Collects all events in a list
+    """
+
+    def __init__(self):
+        super(ListSink, self).__init__("list", kinds=(EVENT,))
+        self.events = []
+
+    def put(self, message):
+        self.events.append(json.loads(message))
+
+
+class EventAggregatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.aggregator = EventAggregator(window=10, max_keys=2, clock=lambda: self.now)
+
+    def testWindow(self):
+        key = ("scan", "SYN", "192.0.2.1", 22)
+        self.assertFalse(self.aggregator.repeated(key, "t0"))
+        self.assertEqual(self.aggregator.add(key, "event", "t0"), [])
+        for i in range(1, 5):
+            self.now = i
+            self.assertTrue(self.aggregator.repeated(key, "t{}".format(i)))
+
+        self.now = 10
+        self.assertFalse(self.aggregator.repeated(key, "t10"))
+        aggregate, = self.aggregator.expire()
+        self.assertEqual((aggregate.key, aggregate.event, aggregate.count, aggregate.first_seen, aggregate.last_seen),
+                         (key, "event", 5, "t0", "t4"))
+        self.assertEqual(len(self.aggregator), 0)
+
+    def testSingleEventHasNoSummary(self):
+        self.aggregator.add("a", "event", "t0")
+        self.now = 10
+        self.assertEqual(self.aggregator.expire(), [])
+
+    def testMaxKeys(self):
+        for key in "abc":
+            self.aggregator.add(key, "event", "t0")
+            self.aggregator.repeated(key, "t0")
+        self.assertEqual([aggregate.key for aggregate in self.aggregator.expire(force=True)], ["b", "c"])
+
+
+class LogAggregationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = log.AGGREGATOR, log.AGGREGATE_ACTIONS
+        self.now = 0
+        log.AGGREGATOR = EventAggregator(window=60, clock=lambda: self.now)
+        log.AGGREGATE_ACTIONS = frozenset(["request", "scan"])
+        self.sink = ListSink()
+        log.register_sink(self.sink)
+
+    def tearDown(self):
+        log.unregister_sink(self.sink)
+        log.AGGREGATOR, log.AGGREGATE_ACTIONS = self.saved
+
+    def testSweep(self):
+        for port in range(1000, 1100):
+            log.request("LISTEN", "192.0.2.1", port, "0.0.0.0", 23, "GET / HTTP/1.0")
+        log.request("LISTEN", "192.0.2.1", 1100, "0.0.0.0", 23, "HEAD / HTTP/1.0")
+        self.assertEqual(len(self.sink.events), 2)
+
+        self.now = 60
+        log.flush()
+        first, other, summary = self.sink.events
+        self.assertEqual(summary['honeygrove']['request'], first['honeygrove']['request'])
+        self.assertEqual(summary['honeygrove']['aggregate']['count'], 100)
+        self.assertEqual(summary['honeygrove']['aggregate']['first_seen'], first['@timestamp'])
+
+    def testExpiryWithoutEvents(self):
+        clock = task.Clock()
+        with mock.patch.object(Config.logging, 'aggregate_window', 60):
+            loop = log.start_aggregate_expiry(clock)
+        self.addCleanup(loop.stop)
+        for _ in range(3):
+            log.request("LISTEN", "192.0.2.1", 1000, "0.0.0.0", 23, "GET / HTTP/1.0")
+        self.assertEqual(len(self.sink.events), 1)
+
+        # No further events and no heartbeat, the summary is logged on time
+        self.now = 60
+        clock.advance(60)
+        self.assertEqual(len(self.sink.events), 2)
+        self.assertEqual(self.sink.events[1]['honeygrove']['aggregate']['count'], 3)
+
+    def testLoginIsNotAggregated(self):
+        log.AGGREGATE_ACTIONS = frozenset(["request", "scan", "login"])
+        for _ in range(3):
+            log.login("SSH", 22, "192.0.2.1", 4711, "password", False, "root", "root")
+        self.assertEqual(len(self.sink.events), 3)
@@ -0,0 +1,86 @@
+from honeygrove.core.Cache import FileCache, LRUCache
+
+import os
+import tempfile
+import unittest
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.cache = LRUCache(2, ttl=10, clock=lambda: self.now)
+
+    def testEviction(self):
+        self.cache.put("a", 1)
+        self.cache.put("b", 2)
+        self.cache.get("a")
+        self.cache.put("c", 3)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("c"), 3)
+
+    def testExpiry(self):
+        self.cache.put("a", 1)
+        self.cache.put("b", 2, ttl=None)
+        self.now = 10
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.get("b"), 2)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+
+class FileCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = FileCache(10, max_file_size=6, revalidate=1, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'wb') as fp:
+            fp.write(content)
+        return path
+
+    def testInvalidation(self):
+        path = self.write("a", b"old")
+        self.assertEqual(self.cache.read(path), b"old")
+        self.write("a", b"newer")
+        # Not checked again within the revalidation interval
+        self.assertEqual(self.cache.read(path), b"old")
+        self.now = 1
+        self.assertEqual(self.cache.read(path), b"newer")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+        os.remove(path)
+        self.now = 2
+        with self.assertRaises(FileNotFoundError):
+            self.cache.read(path)
+        self.assertEqual(len(self.cache), 0)
+
+    def testMemoryCap(self):
+        a = self.write("a", b"aaaaa")
+        b = self.write("b", b"bbbbb")
+        c = self.write("c", b"c")
+        big = self.write("big", b"x" * 7)
+        for path in [a, b, c, big]:
+            self.cache.read(path)
+        self.assertEqual(self.cache.size, 6)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.read(big), b"x" * 7)
+        self.assertEqual(self.cache.size, 6)
+
+    def testOpen(self):
+        small = self.write("small", b"abc")
+        big = self.write("big", b"x" * 7)
+        with self.cache.open(small) as fp:
+            self.assertEqual(fp.read(), b"abc")
+        with self.cache.open(big) as fp:
+            # Streamed from disk, not read into the cache
+            self.assertEqual(fp.name, big)
+            self.assertEqual(fp.read(), b"x" * 7)
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.misses, 1)
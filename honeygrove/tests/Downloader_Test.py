@@ -0,0 +1,138 @@
+from honeygrove.core.Downloader import Downloader, DownloadError
+
+from twisted.internet import defer, task
+from twisted.python.failure import Failure
+from twisted.web.client import ResponseDone
+from twisted.web.http_headers import Headers
+from twisted.web.iweb import UNKNOWN_LENGTH
+
+import hashlib
+import os
+import tempfile
+import unittest
+
+
+class StubTransport:
+    def __init__(self):
+        self.stopped = False
+
+    def stopProducing(self):
+        self.stopped = True
+
+
+class StubResponse:
+    """
+    Response of the local HTTP stand-in, the body is delivered right away (or never, if hang is set)
+    """
+
+    def __init__(self, body=b'', code=200, phrase=b'OK', send_length=True, hang=False):
+        self.code = code
+        self.phrase = phrase
+        self.length = len(body) if send_length else UNKNOWN_LENGTH
+        self.headers = Headers({b'content-type': [b'application/octet-stream']})
+        self.body = body
+        self.hang = hang
+        self.transport = StubTransport()
+
+    def deliverBody(self, receiver):
+        receiver.makeConnection(self.transport)
+        for i in range(0, len(self.body), 1000):
+            if self.transport.stopped:
+                return
+            receiver.dataReceived(self.body[i:i + 1000])
+        if not self.hang and not self.transport.stopped:
+            receiver.connectionLost(Failure(ResponseDone()))
+
+
+class StubAgent:
+    """
+    Local HTTP stand-in: answers requests with prepared responses
+    """
+
+    def __init__(self):
+        self.responses = {}
+        self.requests = []
+
+    def request(self, method, uri, headers=None, bodyProducer=None):
+        self.requests.append(uri.decode())
+        response = self.responses[uri.decode()]
+        if isinstance(response, defer.Deferred):
+            return response
+        return defer.succeed(response)
+
+
+class DownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.agent = StubAgent()
+        self.clock = task.Clock()
+        self.downloader = Downloader(self.dir.name, max_size=10000, timeout=30, max_concurrent=1,
+                                     reactor=self.clock, agent=self.agent)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def result(self, d):
+        results = []
+        d.addBoth(results.append)
+        self.assertEqual(len(results), 1)
+        return results[0]
+
+    def test_download(self):
+        body = os.urandom(5000)
+        self.agent.responses["http://example.com/a.sh"] = StubResponse(body)
+        self.agent.responses["http://example.com/b.sh"] = StubResponse(body, send_length=False)
+        progress = []
+
+        download = self.result(self.downloader.download("http://example.com/a.sh", progress=progress.append))
+        digest = hashlib.sha256(body).hexdigest()
+        self.assertEqual(download.sha256, digest)
+        self.assertEqual(download.path, os.path.join(self.dir.name, digest))
+        with open(download.path, 'rb') as fp:
+            self.assertEqual(fp.read(), body)
+        self.assertEqual(len(progress), 5)
+
+        # Same content, same file
+        self.assertEqual(self.result(self.downloader.download("http://example.com/b.sh")).path, download.path)
+        self.assertEqual(os.listdir(self.dir.name), [digest])
+
+    def test_http_error(self):
+        self.agent.responses["http://example.com/missing"] = StubResponse(code=404, phrase=b'Not Found')
+        failure = self.result(self.downloader.download("http://example.com/missing"))
+        self.assertIsInstance(failure.value, DownloadError)
+        self.assertEqual(str(failure.value), "ERROR 404: Not Found.")
+        self.assertEqual(failure.value.code, 404)
+
+    def test_too_large(self):
+        self.agent.responses["http://example.com/big"] = StubResponse(b'x' * 20000)
+        response = StubResponse(b'x' * 20000, send_length=False)
+        self.agent.responses["http://example.com/stream"] = response
+
+        self.assertEqual(str(self.result(self.downloader.download("http://example.com/big")).value),
+                         "File too large.")
+        self.assertEqual(str(self.result(self.downloader.download("http://example.com/stream")).value),
+                         "File too large.")
+        self.assertTrue(response.transport.stopped)
+        self.assertEqual(os.listdir(self.dir.name), [])
+
+    def test_timeout(self):
+        response = StubResponse(b'x' * 100, send_length=False, hang=True)
+        self.agent.responses["http://example.com/slow"] = response
+        d = self.downloader.download("http://example.com/slow")
+        self.clock.advance(30)
+        self.assertEqual(str(self.result(d).value), "Read error (Connection timed out).")
+        self.assertTrue(response.transport.stopped)
+        self.assertEqual(os.listdir(self.dir.name), [])
+
+    def test_concurrency_limit(self):
+        connecting = defer.Deferred()
+        self.agent.responses["http://example.com/first"] = connecting
+        self.agent.responses["http://example.com/second"] = StubResponse(b'data')
+
+        first = self.downloader.download("http://example.com/first")
+        second = self.downloader.download("http://example.com/second")
+        self.assertEqual(self.agent.requests, ["http://example.com/first"])
+
+        connecting.callback(StubResponse(b'other data'))
+        self.result(first)
+        self.assertEqual(self.result(second).received, 4)
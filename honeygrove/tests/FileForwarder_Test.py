@@ -0,0 +1,105 @@
+from honeygrove.broker.FileForwarder import FileForwarder
+
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+
+
+class LocalBroker:
+    """
+    In-process stand-in for the broker: records published messages and reassembles files
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.threads = set()
+
+    def publish(self, topic, data):
+        self.threads.add(threading.current_thread().name)
+        self.messages.append((topic, data))
+
+    def files(self):
+        chunks = {}
+        result = {}
+        for _, data in self.messages:
+            if data['type'] == 'chunk':
+                chunks.setdefault(data['id'], {})[data['seq']] = base64.b64decode(data['data'])
+            elif data['type'] == 'manifest':
+                received = chunks.pop(data['id'], {})
+                assert sorted(received) == list(range(data['chunks']))
+                content = b''.join(received[seq] for seq in range(data['chunks']))
+                assert hashlib.sha256(content).hexdigest() == data['sha256']
+                result[data['name']] = content
+        return result
+
+
+class FileForwarderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.broker = LocalBroker()
+        self.forwarder = FileForwarder(self.broker.publish, chunk_size=1000)
+
+    def tearDown(self):
+        self.forwarder.close()
+        self.dir.cleanup()
+
+    def create(self, name, content):
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'wb') as fp:
+            fp.write(content)
+        return path
+
+    def testChunks(self):
+        content = os.urandom(2500)
+        digest = self.forwarder.forward(self.create("sample.bin", content))
+
+        self.assertEqual(digest, hashlib.sha256(content).hexdigest())
+        self.assertEqual([data['seq'] for _, data in self.broker.messages[:-1]], [0, 1, 2])
+        manifest = self.broker.messages[-1][1]
+        self.assertEqual((manifest['type'], manifest['size'], manifest['chunks']), ('manifest', 2500, 3))
+        self.assertEqual(self.broker.files(), {"sample.bin": content})
+
+    def testChangedWhileForwarding(self):
+        """
+        Tests if the manifest matches the sent chunks if the file changes after it was hashed
+        """
+        path = self.create("growing.log", b"a" * 1500)
+        hash_file = self.forwarder._hash
+
+        def hash_and_append(path):
+            result = hash_file(path)
+            with open(path, 'ab') as fp:
+                fp.write(b"b" * 1000)
+            return result
+
+        self.forwarder._hash = hash_and_append
+        digest = self.forwarder.forward(path)
+
+        content = b"a" * 1500 + b"b" * 1000
+        self.assertEqual(digest, hashlib.sha256(content).hexdigest())
+        self.assertEqual(self.broker.messages[-1][1]['size'], 2500)
+        self.assertEqual(self.broker.files(), {"growing.log": content})
+
+    def testDeduplication(self):
+        content = b"malware" * 1000
+        self.forwarder.forward(self.create("a", content))
+        count = len(self.broker.messages)
+        self.forwarder.forward(self.create("b", content))
+
+        self.assertEqual(len(self.broker.messages), count + 1)
+        self.assertEqual(self.broker.messages[-1][1],
+                         {'type': 'known', 'sha256': hashlib.sha256(content).hexdigest(), 'name': 'b', 'size': 7000})
+        self.assertEqual((self.forwarder.forwarded, self.forwarder.deduplicated), (1, 1))
+
+    def testSubmit(self):
+        """
+        Tests if files are forwarded by the worker thread
+        """
+        future = self.forwarder.submit(self.create("empty", b""))
+        self.assertEqual(future.result(5), hashlib.sha256(b"").hexdigest())
+        self.assertEqual(self.broker.files(), {"empty": b""})
+        self.assertNotIn(threading.current_thread().name, self.broker.threads)
@@ -0,0 +1,93 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+import xml.etree.ElementTree as ET
+
+from honeygrove.core.FilesystemImage import FilesystemImage, compile_image
+from honeygrove.core.FilesystemNode import FilesystemNode
+from honeygrove.tests.testresources import __path__ as resources
+
+
+def flatten(node, path=""):
+    """
+    Returns (path, tag, size, mtime, mode) of a node and all nodes below it in document order
+    """
+    path = path + "/" + node.name
+    result = [(path, node.tag, node.size, node.mtime, node.mode)]
+    for child in node.children:
+        result.extend(flatten(child, path))
+    return result
+
+
+class FilesystemImageTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.xml = resources._path[0] + '/test_unix.xml'
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_round_trip(self):
+        image = FilesystemImage.load(self.xml, self.dir.name)
+        expected = FilesystemNode.from_element(ET.parse(self.xml).getroot())
+        self.assertEqual(flatten(image.root), flatten(expected))
+        self.assertEqual(image.start_path, [4, 0])
+
+    def test_metadata(self):
+        xml = os.path.join(self.dir.name, 'meta.xml')
+        with open(xml, 'w') as fp:
+            fp.write('<!--0-->\n<dir name="/"><dir name="home" mode="755" mtime="1500000000">'
+                     '<file name="a.txt" size="42" mode="600"/><file name="b"/></dir></dir>\n')
+        image_path = os.path.join(self.dir.name, 'meta.img')
+        compile_image(xml, image_path)
+        image = FilesystemImage(image_path)
+
+        home = image.root.children[0]
+        self.assertEqual((home.tag, home.mode, home.mtime, home.size), ('dir', 0o755, 1500000000, None))
+        self.assertEqual(home.child_index("b"), 1)
+        self.assertIsNone(home.child_index("c"))
+        a, b = home.children
+        self.assertEqual((a.name, a.size, a.mode), ("a.txt", 42, 0o600))
+        self.assertEqual((b.size, b.mtime, b.mode), (None, None, None))
+
+        # Views are stable, copies are changeable FilesystemNodes
+        self.assertIs(home.children[0], a)
+        copy = home.copy(object())
+        copy.remove("a.txt")
+        self.assertEqual([c.name for c in copy.children], ["b"])
+        self.assertEqual(len(home), 2)
+
+    def test_recompile_if_changed(self):
+        xml = os.path.join(self.dir.name, 'fs.xml')
+        with open(xml, 'w') as fp:
+            fp.write('<dir name="/"><dir name="old"/></dir>\n')
+        os.utime(xml, (1, 1))
+        self.assertEqual(FilesystemImage.load(xml, self.dir.name).root.children[0].name, "old")
+
+        with open(xml, 'w') as fp:
+            fp.write('<dir name="/"><dir name="new"/></dir>\n')
+        self.assertEqual(FilesystemImage.load(xml, self.dir.name).root.children[0].name, "new")
+
+    def test_invalid_image(self):
+        path = os.path.join(self.dir.name, 'invalid.img')
+        with open(path, 'wb') as fp:
+            fp.write(b'\0' * 64)
+        self.assertRaises(ValueError, FilesystemImage, path)
+        # Shorter than the header
+        with open(path, 'wb') as fp:
+            fp.write(b'HGFSI')
+        self.assertRaises(ValueError, FilesystemImage, path)
+
+    def test_recompile_if_invalid(self):
+        xml = os.path.join(self.dir.name, 'fs.xml')
+        with open(xml, 'w') as fp:
+            fp.write('<dir name="/"><dir name="home"/></dir>\n')
+        image_path = FilesystemImage.image_path(xml, self.dir.name)
+        with open(image_path, 'wb') as fp:
+            fp.write(b'\0' * 5)
+        with mock.patch('sys.stderr', io.StringIO()):
+            self.assertEqual(FilesystemImage.load(xml, self.dir.name).root.children[0].name, "home")
+        # The image was replaced
+        self.assertEqual(FilesystemImage(image_path).root.children[0].name, "home")
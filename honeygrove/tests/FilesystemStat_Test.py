@@ -0,0 +1,70 @@
+import time
+import unittest
+
+from honeygrove.core.FilesystemNode import FilesystemNode
+from honeygrove.core.FilesystemParser import FilesystemParser
+from honeygrove.core.FilesystemStat import Stat, StatGenerator, format_mode
+from honeygrove.tests.testresources import __path__ as resources
+from honeygrove.tests.testresources import testconfig as config
+
+NOW = 1700000000  # 2023-11-14T22:13:20
+
+
+class StatGeneratorTest(unittest.TestCase):
+    def setUp(self):
+        self.stats = StatGenerator("seed", anchor=NOW, clock=lambda: NOW, localtime=time.gmtime)
+
+    def test_deterministic(self):
+        node = FilesystemNode("file", "notes.txt")
+        stat = self.stats.stat("/home/alice/notes.txt", node)
+        self.assertEqual(stat, StatGenerator("seed", anchor=NOW).stat("/home/alice/notes.txt", node))
+        self.assertNotEqual(stat, StatGenerator("other", anchor=NOW).stat("/home/alice/notes.txt", node))
+        self.assertEqual((stat.owner, stat.group, stat.mode, stat.nlink), ("alice", "alice", 0o100644, 1))
+        self.assertTrue(NOW - self.stats.max_age < stat.mtime <= NOW)
+
+    def test_modes(self):
+        self.assertEqual(self.stats.stat("/usr/bin/ls", FilesystemNode("file", "ls")).mode, 0o100755)
+        self.assertEqual(self.stats.stat("/home/bob/.ssh/id_rsa", FilesystemNode("file", "id_rsa")).mode, 0o100600)
+        self.assertEqual(self.stats.stat("/home/bob/.ssh", FilesystemNode("dir", ".ssh")).mode, 0o40700)
+        self.assertEqual(self.stats.stat("/tmp", FilesystemNode("dir", "tmp")).mode, 0o41777)
+
+    def test_explicit_metadata(self):
+        node = FilesystemNode("file", "data", size=42, mtime=NOW - 100, mode=0o640)
+        self.assertEqual(self.stats.stat("/data", node), Stat(0o100640, 1, "root", "root", 42, NOW - 100))
+
+    def test_render(self):
+        lines = self.stats.render([("dir", Stat(0o40755, 3, "root", "root", 4096, NOW - 3600)),
+                                   ("old", Stat(0o100644, 1, "alice", "alice", 5, 1500000000))])
+        self.assertEqual(lines, ["total 8",
+                                 "drwxr-xr-x 3 root  root  4096 Nov 14 21:13 dir",
+                                 "-rw-r--r-- 1 alice alice    5 Jul 14  2017 old"])
+        self.assertEqual(self.stats.render([]), ["total 0"])
+
+    def test_format_mode(self):
+        self.assertEqual(format_mode(0o40755), "drwxr-xr-x")
+        self.assertEqual(format_mode(0o100600), "-rw-------")
+        self.assertEqual(format_mode(0o41777), "drwxrwxrwt")
+
+
+class LongListingTest(unittest.TestCase):
+    def setUp(self):
+        FilesystemParser.honeytoken_directory = config.tokendir
+        self.fp = FilesystemParser(resources._path[0] + '/test_unix.xml')
+
+    def test_ls_long(self):
+        lines = self.fp.ls_long("~", all=True)
+        self.assertEqual([line.split()[-1] for line in lines[1:]], [".", "..", ".ssh", "suspicious_data.txt"])
+        self.assertEqual([line.split()[-1] for line in self.fp.ls_long("~")[1:]], ["suspicious_data.txt"])
+        # Same listing in another session
+        self.assertEqual(lines, FilesystemParser(resources._path[0] + '/test_unix.xml').ls_long("~", all=True))
+
+    def test_honeytoken_size(self):
+        entries = dict(self.fp.entries("~"))
+        self.assertEqual(entries["suspicious_data.txt"].size, len(self.fp.cat("~/suspicious_data.txt")))
+
+    def test_listing_cache(self):
+        self.assertIs(self.fp.ls_long("/var"), self.fp.ls_long("/var"))
+        self.fp.touch("/var/new_file")
+        lines = self.fp.ls_long("/var")
+        self.assertEqual(lines[-1].split()[-1], "new_file")
+        self.assertEqual(lines[-1].split()[4], "0")
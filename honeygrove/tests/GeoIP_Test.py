@@ -0,0 +1,57 @@
+from honeygrove import log
+from honeygrove.config import Config
+from honeygrove.core.Cache import LRUCache
+
+import unittest
+from unittest import mock
+
+
+class AddressNotFound(Exception):
+    pass
+
+
+class StubReader:
+    """
+    Stands in for the GeoIP database: answers from a dict and counts the queries
+    """
+
+    def __init__(self, locations):
+        self.locations = locations
+        self.queries = []
+
+    def city(self, ip):
+        self.queries.append(ip)
+        if ip not in self.locations:
+            raise AddressNotFound(ip)
+        latitude, longitude = self.locations[ip]
+        return mock.Mock(location=mock.Mock(latitude=latitude, longitude=longitude))
+
+
+class GeoIPCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.reader = StubReader({"192.0.2.1": (53.5, 10.0)})
+        patches = [mock.patch.object(Config.general, 'use_geoip', True),
+                   mock.patch.object(log, 'GEO_READER', self.reader, create=True),
+                   mock.patch.object(log, 'AddressNotFoundError', AddressNotFound, create=True),
+                   mock.patch.object(log, 'GEO_CACHE', LRUCache(10))]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def testHit(self):
+        self.assertEqual(log.get_coordinates("192.0.2.1"), (53.5, 10.0))
+        self.assertEqual(log.get_coordinates("192.0.2.1"), (53.5, 10.0))
+        self.assertEqual(self.reader.queries, ["192.0.2.1"])
+        self.assertEqual(log.get_geoip_stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+    def testUnknownAddressIsCached(self):
+        self.assertIsNone(log.get_coordinates("198.51.100.1"))
+        self.assertIsNone(log.get_coordinates("198.51.100.1"))
+        self.assertEqual(self.reader.queries, ["198.51.100.1"])
+        self.assertEqual(log.get_geoip_stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+    def testLocation(self):
+        self.assertEqual(log._get_location("192.0.2.1"), ('53.5000', '10.0000', '53.5000,10.0000'))
+        self.assertEqual(log._get_location("198.51.100.1"), ('--', '--', None))
+        self.assertEqual(log.get_geoip_stats()['misses'], 2)
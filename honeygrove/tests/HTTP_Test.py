@@ -1,11 +1,15 @@
 from honeygrove.config import Config
-from honeygrove.services.HTTPService import HTTPService
+from honeygrove.services.HTTPService import HTTPProtocol, HTTPService, ResponseCache
 
-from twisted.internet import reactor
+from twisted.internet import protocol, reactor
+from twisted.test import proto_helpers
 
+from pathlib import Path
 import requests
+import tempfile
 import threading
 import unittest
+from unittest import mock
 
 
 class HTTPTest(unittest.TestCase):
@@ -34,3 +38,57 @@ class HTTPTest(unittest.TestCase):
         """
         response = requests.post("http://localhost:9914", data={"pwd": 123})
         self.assertIn(response.status_code, [200, 403])
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        folder = Path(self.dir.name)
+        for name, content in (("404_login.html", "not found"), ("admin_login.html", "login"),
+                              ("admin_content.html", "dashboard"), ("router_login.html", "router")):
+            with open(str(folder / name), "w") as fp:
+                fp.write(content)
+        self.pages = {'404': ['404_login.html'], '/admin': ['admin_login.html', 'admin_content.html'],
+                      '/router': ['router_login.html']}
+        self.cache = ResponseCache(folder, self.pages)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_load(self):
+        stats = self.cache.load()
+        self.assertEqual(stats['pages'], 3)
+
+        headers = "".join(k + ": " + v + "\n" for k, v in HTTPService.responseHeadersOkStatus.items())
+        self.assertEqual(self.cache.login['/admin'], ("HTTP/1.1 200 OK\n" + headers + "\nlogin").encode())
+        self.assertTrue(self.cache.success['/admin'].endswith(b"\n\ndashboard"))
+        # Without a content page the 404 page is shown after a login
+        self.assertTrue(self.cache.success['/router'].endswith(b"\n\nnot found"))
+        self.assertTrue(self.cache.forbidden['/router'].startswith(b"HTTP/1.1 403 Forbidden\n"))
+        self.assertTrue(self.cache.not_found.startswith(b"HTTP/1.1 404 Not Found\n"))
+        self.assertTrue(self.cache.not_found.endswith(b"\n\nnot found"))
+
+    def test_reload(self):
+        self.cache.load()
+        del self.pages['/router']
+        self.pages['/missing'] = ['missing_login.html']
+        with mock.patch('honeygrove.services.HTTPService.log'):
+            self.assertEqual(self.cache.load()['pages'], 2)
+        self.assertNotIn('/router', self.cache.login)
+        self.assertNotIn('/missing', self.cache.login)
+
+    def test_single_write(self):
+        self.cache.load()
+        factory = protocol.Factory()
+        factory.clients = {}
+        proto = HTTPProtocol()
+        proto.factory = factory
+        transport = proto_helpers.StringTransport()
+        proto.makeConnection(transport)
+        transport.write = mock.Mock()
+
+        with mock.patch.object(HTTPService, 'responses', self.cache), \
+                mock.patch('honeygrove.services.HTTPService.log'):
+            proto.dataReceived(b"GET /admin HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        transport.write.assert_called_once_with(self.cache.login['/admin'])
@@ -0,0 +1,40 @@
+from honeygrove.core.HelpTexts import HelpTexts
+
+import os
+import tempfile
+import unittest
+
+
+class HelpTextsTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.helptexts = os.path.join(self.dir.name, 'helptexts')
+        self.gnuhelp = os.path.join(self.dir.name, 'gnuhelp')
+        self.write(self.helptexts, "cd: cd [dir]\n    Change the shell working directory.\n\n"
+                                   "echo: echo [arg ...]\n    Write arguments to the standard output.\n")
+        self.write(self.gnuhelp, "GNU bash\n\n cd [dir]\n")
+        self.texts = HelpTexts(self.helptexts, self.gnuhelp)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, path, text):
+        with open(path, 'w') as fp:
+            fp.write(text)
+
+    def test_topics(self):
+        self.assertEqual(self.texts.load()['topics'], 2)
+        self.assertEqual(self.texts.topic("cd"), (b"cd: cd [dir]\n    Change the shell working directory.",
+                                                  "cd: cd [dir]\n    Change the shell working directory."))
+        self.assertEqual(self.texts.topic("echo")[1], "echo: echo [arg ...]\n    Write arguments to the standard output.")
+        self.assertIsNone(self.texts.topic("c"))
+        self.assertEqual(self.texts.general(), (b"GNU bash\n\n cd [dir]", "GNU bash\n\n cd [dir]"))
+
+    def test_reload(self):
+        self.assertTrue(self.texts.reload())
+        self.assertFalse(self.texts.reload())
+        self.write(self.helptexts, "pwd: pwd [-LP]\n    Print the name of the current working directory.\n")
+        os.utime(self.helptexts, ns=(0, 0))
+        self.assertTrue(self.texts.reload())
+        self.assertIsNone(self.texts.topic("cd"))
+        self.assertEqual(self.texts.topic("pwd")[1], "pwd: pwd [-LP]\n    Print the name of the current working directory.")
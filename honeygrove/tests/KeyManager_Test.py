@@ -0,0 +1,73 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from honeygrove.core.KeyManager import KeyManager
+
+
+class StubReactor:
+    """
+    Collects the calls from other threads until they are run
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def callFromThread(self, f, *args):
+        self.calls.append((f, args))
+
+    def run_calls(self):
+        for f, args in self.calls:
+            f(*args)
+        self.calls = []
+
+
+class KeyManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.reactor = StubReactor()
+        self.paths = {'ssh-ed25519': os.path.join(self.dir.name, 'ed25519'),
+                      'ecdsa-sha2-nistp256': os.path.join(self.dir.name, 'ecdsa'),
+                      'ssh-rsa': os.path.join(self.dir.name, 'rsa')}
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_generate(self):
+        manager = KeyManager(self.paths, rsa_key_size=1024, reactor=self.reactor)
+        stats = manager.load()
+        self.assertEqual(stats['generated'], "ssh-ed25519, ecdsa-sha2-nistp256")
+        self.assertEqual(stats['pending'], "ssh-rsa")
+        # The fast types are offered right away
+        self.assertIn(b'ssh-ed25519', manager.private_keys)
+        self.assertIn(b'ecdsa-sha2-nistp256', manager.public_keys)
+
+        manager.pending.result(timeout=30)
+        # The generated key is added on the reactor thread
+        self.assertNotIn(b'ssh-rsa', manager.private_keys)
+        self.reactor.run_calls()
+        self.assertEqual(manager.private_keys[b'ssh-rsa'].size(), 1024)
+        self.assertTrue(manager.public_keys[b'ssh-rsa'].isPublic())
+        for path in self.paths.values():
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+            self.assertTrue(os.path.exists(path + ".pub"))
+
+        # Saved keys are loaded (and parsed only once)
+        other = KeyManager(self.paths)
+        self.assertEqual(other.load()['generated'], "none")
+        self.assertIsNone(other.pending)
+        self.assertIs(other.private_keys[b'ssh-rsa'], manager.private_keys[b'ssh-rsa'])
+        self.assertIs(other.load(), other.load())
+
+    def test_provisional_rsa_key(self):
+        manager = KeyManager({'ssh-rsa': self.paths['ssh-rsa']}, rsa_key_size=1536, provisional_rsa_key_size=1024,
+                             reactor=self.reactor)
+        manager.load()
+        self.assertIn(b'ssh-rsa', manager.private_keys)
+        manager.pending.result(timeout=30)
+        self.reactor.run_calls()
+        self.assertEqual(manager.private_keys[b'ssh-rsa'].size(), 1536)
+
+    def test_unsupported_type(self):
+        self.assertRaises(ValueError, KeyManager({'ssh-dss': self.paths['ssh-rsa']}).load)
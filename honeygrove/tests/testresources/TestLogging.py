@@ -6,7 +6,7 @@
 def attack(service, ip, request, response, user=None, key=None):
     pass
 
-def file(service, ip, filename, file, user=None):
+def file(service, ip, filename, file=None, user=None, file_hash=None):
     pass
 
 def login(service, ip, port, successful, user, key=None, actual=None):